@@ -1,6 +1,10 @@
 from django.db import models
+from django.db.models import Q
 from users.models import UserProfile, ProviderProfile
 
+# Statuses that hold a doctor's time slot; cancelled/completed ones free it up
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -21,6 +25,15 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        constraints = [
+            # One active booking per doctor slot, enforced by the database so that
+            # concurrent bookings cannot both pass a check-then-insert race.
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name='unique_active_appointment_slot',
+            ),
+        ]
 
     def __str__(self):
         return f"Appointment between {self.patient.user.username} and Dr. {self.doctor.user.user.username} on {self.date} at {self.time}"
@@ -25,6 +25,9 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['status', 'created_at', 'updated_at']
+        # Skip DRF's query-based UniqueTogetherValidator for the slot constraint;
+        # the database enforces it and the views translate violations into a 409.
+        validators = []
 
     def validate(self, data):
         # Check if the appointment time is in the future
@@ -35,14 +38,20 @@ class AppointmentSerializer(serializers.ModelSerializer):
         if data['date'] == date.today() and data['time'] < datetime.now().time():
             raise serializers.ValidationError("Appointment time cannot be in the past")
 
-        # Check for overlapping appointments
-        existing_appointments = Appointment.objects.filter(
-            doctor=data['doctor'],
-            date=data['date'],
-            time=data['time'],
-            status__in=['pending', 'confirmed']
-        )
-        if existing_appointments.exists():
-            raise serializers.ValidationError("This time slot is already booked")
+        # Overlapping bookings are rejected by the 'unique_active_appointment_slot'
+        # constraint at insert time (see AppointmentListView.perform_create);
+        # a pre-check query here would race with concurrent bookings anyway.
+        return data
 
-        return data 
\ No newline at end of file
+class AppointmentBulkStatusSerializer(serializers.Serializer):
+    """ Validates a bulk status change: a list of appointment ids and the target status. """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=500,
+    )
+    status = serializers.ChoiceField(choices=Appointment.STATUS_CHOICES)
+
+    def validate_ids(self, value):
+        # Drop duplicates while keeping the caller's order for the per-id report
+        return list(dict.fromkeys(value))
@@ -1,3 +1,190 @@
-from django.test import TestCase
+import threading
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import UserProfile, ProviderProfile
+from .models import Appointment
+from .views import is_slot_conflict, save_appointment
+
+
+def make_patient(username):
+    user = User.objects.create_user(username=username, password='pass12345')
+    return UserProfile.objects.create(user=user, user_type='patient')
+
+def make_provider(username):
+    user = User.objects.create_user(username=username, password='pass12345')
+    profile = UserProfile.objects.create(user=user, user_type='provider')
+    return ProviderProfile.objects.create(profile=profile, specialization='General Physician', address='1 Main St')
+
+
+class AppointmentBookingTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient('patient')
+        self.doctor = make_provider('doctor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient.user)
+        self.payload = {
+            'patient_id': self.patient.id,
+            'doctor_id': self.doctor.id,
+            'date': (date.today() + timedelta(days=1)).isoformat(),
+            'time': '10:00',
+        }
+
+    def test_booking_taken_slot_returns_conflict(self):
+        self.assertEqual(self.client.post('/api/appointments/', self.payload).status_code, 201)
+        response = self.client.post('/api/appointments/', self.payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_cancelled_appointment_frees_slot(self):
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, status='cancelled',
+            date=date.today() + timedelta(days=1), time=time(10, 0),
+        )
+        self.assertEqual(self.client.post('/api/appointments/', self.payload).status_code, 201)
+
+    def test_only_slot_violations_become_conflicts(self):
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=date.today(), time=time(10, 0))
+        with self.assertRaises(IntegrityError) as slot:
+            with transaction.atomic():
+                Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=date.today(), time=time(10, 0))
+        self.assertTrue(is_slot_conflict(slot.exception))
+
+        serializer = mock.Mock()
+        serializer.save.side_effect = IntegrityError('NOT NULL constraint failed: appointments_appointment.date')
+        with self.assertRaises(IntegrityError):
+            save_appointment(serializer)
+
+
+class AppointmentBulkStatusTests(TestCase):
+    def setUp(self):
+        self.patient = make_patient('patient')
+        self.doctor = make_provider('doctor')
+        self.other_doctor = make_provider('other')
+        slot_date = date.today() + timedelta(days=1)
+        self.mine = [
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=slot_date, time=time(9 + i, 0))
+            for i in range(3)
+        ]
+        self.theirs = Appointment.objects.create(patient=self.patient, doctor=self.other_doctor, date=slot_date, time=time(9, 0))
+        self.client = APIClient()
+
+    def post(self, user, ids, new_status):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/appointments/bulk-status/', {'ids': ids, 'status': new_status}, format='json')
+
+    def test_provider_confirms_own_appointments(self):
+        self.mine[2].status = 'confirmed'
+        self.mine[2].save()
+        ids = [a.id for a in self.mine] + [self.theirs.id]
+        response = self.post(self.doctor.profile.user, ids, 'confirmed')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(
+            [r['outcome'] for r in response.data['results']],
+            ['updated', 'updated', 'unchanged', 'not_found'],
+        )
+        self.theirs.refresh_from_db()
+        self.assertEqual(self.theirs.status, 'pending')
+
+    def test_patient_may_only_cancel(self):
+        ids = [a.id for a in self.mine]
+        self.assertEqual(self.post(self.patient.user, ids, 'confirmed').status_code, 403)
+        response = self.post(self.patient.user, ids, 'cancelled')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertFalse(Appointment.objects.filter(id__in=ids).exclude(status='cancelled').exists())
+
+    def test_reactivating_into_taken_slot_is_rolled_back(self):
+        self.mine[0].status = 'cancelled'
+        self.mine[0].save()
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=self.mine[0].date, time=self.mine[0].time)
+        response = self.post(self.doctor.profile.user, [self.mine[0].id, self.mine[1].id], 'confirmed')
+        self.assertEqual(response.status_code, 409)
+        self.mine[1].refresh_from_db()
+        self.assertEqual(self.mine[1].status, 'pending')
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    serialized_rollback = True  # Keep the seeded specialty taxonomy across flushes
+    WORKERS = 8
+
+    def test_parallel_bookings_for_one_slot(self):
+        doctor = make_provider('doctor')
+        patients = [make_patient(f'patient{i}') for i in range(self.WORKERS)]
+        slot_date = (date.today() + timedelta(days=1)).isoformat()
+        barrier = threading.Barrier(self.WORKERS)
+        statuses = []
+
+        def book(patient):
+            client = APIClient()
+            client.force_authenticate(patient.user)
+            try:
+                barrier.wait()
+                response = client.post('/api/appointments/', {
+                    'patient_id': patient.id, 'doctor_id': doctor.id,
+                    'date': slot_date, 'time': '09:30',
+                })
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(p,)) for p in patients]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(409), self.WORKERS - 1)
+        self.assertEqual(Appointment.objects.filter(doctor=doctor).count(), 1)
+
+
+def mirror(*objs):
+    """ Copies rows to the replica database, as replication would. """
+    for obj in objs:
+        obj.save(using='replica', force_insert=True)
+
+
+@override_settings(DATABASE_READ_REPLICA='replica')
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.patient = make_patient('patient')
+        self.other = make_patient('other')
+        self.doctor = make_provider('doctor')
+        mirror(self.patient.user, self.patient, self.other.user, self.other,
+               self.doctor.profile.user, self.doctor.profile, self.doctor)
+        self.slot = date.today() + timedelta(days=1)
+        # Only on the replica, so reads that return it were served by the replica
+        mirror(Appointment(id=1000, patient=self.patient, doctor=self.doctor, date=self.slot, time=time(8, 0)))
+
+    def list_ids(self, profile):
+        client = APIClient()
+        client.force_authenticate(profile.user)
+        return [a['id'] for a in client.get('/api/appointments/').data]
+
+    def test_reads_go_to_replica_until_user_writes(self):
+        self.assertEqual(self.list_ids(self.patient), [1000])
+
+        client = APIClient()
+        client.force_authenticate(self.patient.user)
+        response = client.post('/api/appointments/', {
+            'patient_id': self.patient.id, 'doctor_id': self.doctor.id,
+            'date': self.slot.isoformat(), 'time': '10:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Appointment.objects.using('replica').filter(pk=response.data['id']).exists())
+
+        # The writer now reads its own booking from the primary; others stay on the lagging
+        # replica, so the doctor does not see the new booking yet
+        self.assertEqual(self.list_ids(self.patient), [response.data['id']])
+        self.assertEqual(self.list_ids(self.other), [])
+        self.assertEqual(self.list_ids(self.doctor.profile), [1000])
+        cache.clear()  # Pin expired
+        self.assertEqual(self.list_ids(self.patient), [1000])
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     AppointmentListView,
     AppointmentDetailView,
+    AppointmentBulkStatusView,
     DoctorAppointmentsView,
     PatientAppointmentsView
 )
@@ -12,6 +13,9 @@ urlpatterns = [
     # List and create appointments
     path('appointments/', AppointmentListView.as_view(), name='appointment_list'),
     
+    # Set one status on many appointments at once
+    path('appointments/bulk-status/', AppointmentBulkStatusView.as_view(), name='appointment_bulk_status'),
+
     # Get, update, or delete specific appointment
     path('appointments/<int:pk>/', AppointmentDetailView.as_view(), name='appointment_detail'),
     
@@ -1,65 +1,153 @@
 from django.shortcuts import render
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException, PermissionDenied
+from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from .models import Appointment
-from .serializers import AppointmentSerializer
+from .serializers import AppointmentSerializer, AppointmentBulkStatusSerializer
+from users.authentication import role_claims
 from users.models import UserProfile, ProviderProfile
+from docnearby_project.replica import ReplicaReadMixin
 
 # Create your views here.
 
-class AppointmentListView(generics.ListCreateAPIView):
+class SlotAlreadyBooked(APIException):
+    """ Raised when the doctor's slot is taken by another active appointment (HTTP 409). """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This time slot is already booked'
+    default_code = 'slot_already_booked'
+
+SLOT_CONSTRAINT = 'unique_active_appointment_slot'
+
+def is_slot_conflict(error):
+    """ Whether an IntegrityError comes from the active-slot constraint. """
+    message = str(error)
+    # PostgreSQL names the constraint; SQLite lists the columns of the violated index
+    table = Appointment._meta.db_table
+    columns = ', '.join(f"{table}.{Appointment._meta.get_field(name).column}" for name in ('doctor', 'date', 'time'))
+    return SLOT_CONSTRAINT in message or columns in message
+
+def save_appointment(serializer, **kwargs):
+    """ Saves inside a savepoint, mapping a slot-constraint violation to a 409. """
+    try:
+        with transaction.atomic():
+            return serializer.save(**kwargs)
+    except IntegrityError as e:
+        if not is_slot_conflict(e):
+            raise
+        raise SlotAlreadyBooked()
+
+# Status values each role may set on an appointment it can see
+PROVIDER_STATUS_UPDATES = ['confirmed', 'cancelled', 'completed']
+PATIENT_STATUS_UPDATES = ['cancelled']
+
+def appointments_for(user):
+    """ Appointments visible to a user: their own bookings, or their practice's. """
+    role, profile_id, provider_id = role_claims(user)
+    if role == 'patient':
+        return Appointment.objects.filter(patient_id=profile_id)
+    elif role == 'provider' and provider_id is not None:
+        return Appointment.objects.filter(doctor_id=provider_id)
+    return Appointment.objects.none()
+
+class AppointmentListView(ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user_profile = self.request.user.userprofile
-        if user_profile.user_type == 'patient':
-            return Appointment.objects.filter(patient=user_profile)
-        elif user_profile.user_type == 'provider':
-            return Appointment.objects.filter(doctor=user_profile.providerprofile)
-        return Appointment.objects.none()
+        return appointments_for(self.request.user)
 
     def perform_create(self, serializer):
-        user_profile = self.request.user.userprofile
-        if user_profile.user_type == 'patient':
-            serializer.save(patient=user_profile)
+        role, _, _ = role_claims(self.request.user)
+        if role == 'patient':
+            # The response nests the patient's profile, so load it here
+            save_appointment(serializer, patient=self.request.user.profile)
         else:
-            raise permissions.PermissionDenied("Only patients can create appointments")
+            raise PermissionDenied("Only patients can create appointments")
 
-class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AppointmentDetailView(ReplicaReadMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user_profile = self.request.user.userprofile
-        if user_profile.user_type == 'patient':
-            return Appointment.objects.filter(patient=user_profile)
-        elif user_profile.user_type == 'provider':
-            return Appointment.objects.filter(doctor=user_profile.providerprofile)
-        return Appointment.objects.none()
+        return appointments_for(self.request.user)
 
     def perform_update(self, serializer):
-        user_profile = self.request.user.userprofile
-        appointment = self.get_object()
+        role, _, _ = role_claims(self.request.user)
 
         # Only allow status updates for doctors
-        if user_profile.user_type == 'provider':
+        if role == 'provider':
             if 'status' in serializer.validated_data:
                 new_status = serializer.validated_data['status']
-                if new_status not in ['confirmed', 'cancelled', 'completed']:
-                    raise permissions.PermissionDenied("Invalid status update")
-                serializer.save()
+                if new_status not in PROVIDER_STATUS_UPDATES:
+                    raise PermissionDenied("Invalid status update")
+                save_appointment(serializer)
             else:
-                raise permissions.PermissionDenied("Doctors can only update appointment status")
+                raise PermissionDenied("Doctors can only update appointment status")
         else:
             # Patients can only cancel their appointments
             if 'status' in serializer.validated_data:
-                if serializer.validated_data['status'] != 'cancelled':
-                    raise permissions.PermissionDenied("Patients can only cancel appointments")
-            serializer.save()
+                if serializer.validated_data['status'] not in PATIENT_STATUS_UPDATES:
+                    raise PermissionDenied("Patients can only cancel appointments")
+            save_appointment(serializer)
+
+class AppointmentBulkStatusView(APIView):
+    """
+    Applies one status to many appointments in a single transaction.
+    Uses the same role rules as AppointmentDetailView and reports an outcome per id:
+    'updated', 'unchanged' (already in that status) or 'not_found' (missing or not visible).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = AppointmentBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        new_status = serializer.validated_data['status']
+
+        role, _, _ = role_claims(request.user)
+        if role == 'provider':
+            allowed = PROVIDER_STATUS_UPDATES
+        else:
+            allowed = PATIENT_STATUS_UPDATES
+        if new_status not in allowed:
+            raise PermissionDenied("Invalid status update")
+
+        try:
+            with transaction.atomic():
+                current = dict(
+                    appointments_for(request.user)
+                    .select_for_update()
+                    .filter(id__in=ids)
+                    .values_list('id', 'status')
+                )
+                to_update = [pk for pk, old_status in current.items() if old_status != new_status]
+                updated = 0
+                if to_update:
+                    updated = Appointment.objects.filter(id__in=to_update).update(
+                        status=new_status, updated_at=timezone.now()
+                    )
+        except IntegrityError as e:
+            if not is_slot_conflict(e):
+                raise
+            raise SlotAlreadyBooked("One or more time slots are already booked; no appointments were updated")
+
+        results = []
+        for pk in ids:
+            if pk not in current:
+                outcome = 'not_found'
+            elif current[pk] == new_status:
+                outcome = 'unchanged'
+            else:
+                outcome = 'updated'
+            results.append({'id': pk, 'outcome': outcome})
+
+        return Response({'status': new_status, 'updated': updated, 'results': results}, status=status.HTTP_200_OK)
 
-class DoctorAppointmentsView(generics.ListAPIView):
+class DoctorAppointmentsView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -68,7 +156,7 @@ class DoctorAppointmentsView(generics.ListAPIView):
         doctor = get_object_or_404(ProviderProfile, id=doctor_id)
         return Appointment.objects.filter(doctor=doctor)
 
-class PatientAppointmentsView(generics.ListAPIView):
+class PatientAppointmentsView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
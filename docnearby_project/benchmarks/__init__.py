@@ -0,0 +1,28 @@
+# benchmarks/__init__.py
+"""
+Standalone performance benchmarks for the DocNearby API.
+Run them from the docnearby_project/ directory, e.g.:
+    python -m benchmarks.nearby_serialization
+"""
+import os
+import timeit
+
+
+def setup_django():
+    """ Configures Django so benchmark modules can import models and serializers. """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'docnearby_project.settings')
+    import django
+    django.setup()
+
+
+def best_of(func, number, repeat=5):
+    """ Returns the fastest per-call time (seconds) over `repeat` runs of `number` calls. """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def percentile(sorted_values, pct):
+    """ Nearest-rank percentile of an already sorted list (0 for an empty one). """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil(n * pct / 100)
+    return sorted_values[int(rank) - 1]
@@ -0,0 +1,147 @@
+# benchmarks/database_concurrency.py
+"""
+Concurrent booking writes and appointment-list reads against SQLite, comparing the old
+bare configuration (rollback journal, deferred transactions, 5 s busy timeout, a new
+connection per request) with the tuned profile from settings.SQLITE_OPTIONS
+(WAL + pragmas, immediate transactions, persistent connections).
+Each profile gets a fresh, migrated database file in a temporary directory.
+    python -m benchmarks.database_concurrency [--seconds 5] [--writers 4] [--readers 8]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date, time as dt_time, timedelta
+
+from benchmarks import percentile, setup_django
+
+PROFILES = ('baseline', 'tuned')
+
+_tmpdir = tempfile.TemporaryDirectory()
+
+
+def configure_databases():
+    """ Adds one database alias per profile; must run before Django sets up its connections. """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'docnearby_project.settings')
+    from django.conf import settings
+    settings.DATABASES['baseline'] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(_tmpdir.name, 'baseline.sqlite3'),
+        'CONN_MAX_AGE': 0,
+    }
+    settings.DATABASES['tuned'] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(_tmpdir.name, 'tuned.sqlite3'),
+        'CONN_MAX_AGE': settings.DB_CONN_MAX_AGE, 'OPTIONS': settings.SQLITE_OPTIONS,
+    }
+
+
+configure_databases()
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connections, transaction  # noqa: E402
+
+from appointments.models import Appointment  # noqa: E402
+from users.models import ProviderProfile, UserProfile  # noqa: E402
+
+
+def seed(alias, doctors=20, patients=50):
+    """ Migrates the profile's database and adds providers/patients with bulk_create (no signals). """
+    call_command('migrate', database=alias, verbosity=0)
+    users = User.objects.using(alias).bulk_create(
+        [User(username=f'user{i}', password='!') for i in range(doctors + patients)]
+    )
+    profiles = UserProfile.objects.using(alias).bulk_create([
+        UserProfile(user=user, user_type='provider' if i < doctors else 'patient') for i, user in enumerate(users)
+    ])
+    providers = ProviderProfile.objects.using(alias).bulk_create([
+        ProviderProfile(profile=profile, specialization='General Physician') for profile in profiles[:doctors]
+    ])
+    return [p.pk for p in providers], [p.pk for p in profiles[doctors:]]
+
+
+def end_request(alias):
+    # What Django does after each request: close the connection unless CONN_MAX_AGE keeps it
+    connections[alias].close_if_unusable_or_obsolete()
+
+
+def run(alias, seconds, writers, readers):
+    doctor_ids, patient_ids = seed(alias)
+    connections[alias].close()
+    deadline = time.monotonic() + seconds
+    lock = threading.Lock()
+    totals = {'writes': 0, 'reads': 0, 'locked': 0}
+    latencies = []
+
+    def record(kind, started):
+        with lock:
+            totals[kind] += 1
+            latencies.append(time.perf_counter() - started)
+
+    def writer(n):
+        slot = 0
+        try:
+            while time.monotonic() < deadline:
+                slot += 1
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic(using=alias):
+                        # Unique per writer/slot, so only lock contention (not the constraint) can fail
+                        Appointment.objects.using(alias).create(
+                            patient_id=patient_ids[n % len(patient_ids)], doctor_id=doctor_ids[slot % len(doctor_ids)],
+                            date=date(2030, 1, 1) + timedelta(days=n * 10000 + slot), time=dt_time(9, 0),
+                        )
+                    record('writes', started)
+                except OperationalError:
+                    with lock:
+                        totals['locked'] += 1
+                end_request(alias)
+        finally:
+            connections[alias].close()
+
+    def reader(n):
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    list(Appointment.objects.using(alias).filter(doctor_id=doctor_ids[n % len(doctor_ids)])
+                         .values('id', 'date', 'time', 'status')[:50])
+                    record('reads', started)
+                except OperationalError:
+                    with lock:
+                        totals['locked'] += 1
+                end_request(alias)
+        finally:
+            connections[alias].close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    latencies.sort()
+    p95 = percentile(latencies, 95) * 1000
+    return {
+        'writes/s': totals['writes'] / seconds, 'reads/s': totals['reads'] / seconds,
+        'locked errors': totals['locked'], 'p95 ms': p95,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers + {args.readers} readers for {args.seconds:g}s per profile\n")
+    print(f"{'profile':<10}{'writes/s':>12}{'reads/s':>12}{'locked errors':>16}{'p95 ms':>10}")
+    for alias in PROFILES:
+        result = run(alias, args.seconds, args.writers, args.readers)
+        print(f"{alias:<10}{result['writes/s']:>12.0f}{result['reads/s']:>12.0f}"
+              f"{result['locked errors']:>16}{result['p95 ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
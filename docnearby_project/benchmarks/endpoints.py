@@ -0,0 +1,291 @@
+# benchmarks/endpoints.py
+"""
+End-to-end latency of the main API endpoints at growing data sizes, driven through
+Django's test client against a seeded temporary SQLite database. Gemini and Google
+Places are served by the upstream replay layer, without injected latency by default,
+so only our own code is measured.
+Reports p50/p95/p99 latency, throughput and SQL queries per request, and can write
+the results as JSON and compare them with an earlier run:
+    python -m benchmarks.endpoints [--sizes 1000,10000,100000] [--requests 100]
+                                   [--output run.json] [--compare baseline.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+from benchmarks import percentile
+
+_tmpdir = tempfile.TemporaryDirectory()
+
+
+def configure_database():
+    """ Points 'default' at a fresh file; must run before Django sets up its connections. """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'docnearby_project.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = os.path.join(_tmpdir.name, 'endpoints.sqlite3')
+    settings.DATABASES['replica']['NAME'] = settings.DATABASES['default']['NAME']
+
+
+configure_database()
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from appointments.models import Appointment  # noqa: E402
+from doctors.models import Doctor, DoctorOpeningInterval  # noqa: E402
+from doctors.projection import rebuild_search_projection  # noqa: E402
+from doctors.schedule import operating_hours_to_intervals  # noqa: E402
+from doctors.search import rebuild_search_index  # noqa: E402
+from doctors.specialties import resolve_specialty  # noqa: E402
+from users.models import ProviderProfile, UserProfile  # noqa: E402
+
+CENTER = (18.5204, 73.8567)  # Pune
+SPREAD = 0.3  # Degrees (~30 km) around CENTER
+SPECIALTIES = ['General Physician', 'Dermatologist', 'Cardiologist', 'Pediatrician', 'Dentist',
+               'Orthopedic Surgeon', 'ENT Specialist', 'Gynecologist', 'Psychiatrist', 'Skin doctor']
+HOURS = ['Mon-Fri 9am-5pm', 'Mon-Sat 10am-1pm, 5pm-9pm', '24/7', 'Daily 8am-8pm', None]
+PROVIDER_RATIO = 10  # One registered provider (and one patient) per this many doctors
+BATCH = 5000
+
+
+# --- Upstreams ---
+
+def use_replay_upstreams(latency_scale):
+    """ Serves Gemini and Google Places from the recorded fixtures (see docnearby_project/upstreams.py). """
+    from django.conf import settings
+    settings.UPSTREAM_MODE = 'replay'
+    settings.UPSTREAM_REPLAY = {**settings.UPSTREAM_REPLAY, 'latency_scale': latency_scale,
+                                'error_rate': 0, 'rate_limit_rate': 0}
+    # One benchmark client would soon spend the upstream budgets and measure only the fallbacks
+    settings.UPSTREAM_BUDGETS = {}
+
+
+# --- Seeding ---
+
+def _bulk_create(model, objs):
+    for start in range(0, len(objs), BATCH):
+        model.objects.bulk_create(objs[start:start + BATCH])
+    return objs
+
+
+def seed(target, rng, state):
+    """
+    Grows the database to `target` doctors and appointments (sizes only increase, so
+    each size reuses the previous one's rows). Bulk inserts skip the model signals, so
+    the derived tables are rebuilt afterwards.
+    """
+    first = state['doctors']
+    specialty_codes = {name: resolve_specialty(name) for name in SPECIALTIES}
+    doctors = []
+    for i in range(first, target):
+        specialty, hours = rng.choice(SPECIALTIES), rng.choice(HOURS)
+        doctors.append(Doctor(
+            name=f'Dr. Bench {i}', specialty=specialty, canonical_specialty_id=specialty_codes[specialty],
+            experience=rng.randint(0, 40), rating=round(rng.uniform(2.5, 5), 1), reviews=rng.randint(0, 400),
+            address=f'{i} Bench Street, Pune', phone_number='+91 90000 00000', email=f'bench{i}@example.com',
+            latitude=CENTER[0] + rng.uniform(-SPREAD, SPREAD), longitude=CENTER[1] + rng.uniform(-SPREAD, SPREAD),
+            is_verified=rng.random() < 0.9, clinic_name=f'Bench Clinic {i}', operating_hours=hours,
+            qualifications='MBBS, MD', bio='Experienced physician. ' * 20,
+        ))
+    _bulk_create(Doctor, doctors)
+    _bulk_create(DoctorOpeningInterval, [
+        DoctorOpeningInterval(doctor_id=doctor.pk, start_minute=start, end_minute=end)
+        for doctor in doctors for start, end in operating_hours_to_intervals(doctor.operating_hours)
+    ])
+
+    # Registered providers and patients, each with a User and UserProfile
+    people = target // PROVIDER_RATIO - state['providers']
+    users = _bulk_create(User, [
+        User(username=f'bench-{kind}-{state["providers"] + i}', password='!', first_name='Bench', last_name=str(i))
+        for kind in ('provider', 'patient') for i in range(people)
+    ])
+    profiles = _bulk_create(UserProfile, [
+        UserProfile(user=user, user_type='provider' if i < people else 'patient') for i, user in enumerate(users)
+    ])
+    providers = _bulk_create(ProviderProfile, [
+        ProviderProfile(profile=profile, specialization=rng.choice(SPECIALTIES), clinic_name='Bench Care',
+                        address='1 Bench Lane, Pune', latitude=CENTER[0] + rng.uniform(-SPREAD, SPREAD),
+                        longitude=CENTER[1] + rng.uniform(-SPREAD, SPREAD), is_verified=True)
+        for profile in profiles[:people]
+    ])
+    state['provider_ids'] += [p.pk for p in providers]
+    state['patient_ids'] += [p.pk for p in profiles[people:]]
+    state['providers'] += people
+
+    # Appointments: consecutive slots per provider, so the active-slot constraint holds
+    # (a fresh date range per seeding round, since the provider count changes between rounds)
+    provider_ids, patient_ids = state['provider_ids'], state['patient_ids']
+    base = date(2030, 1, 1) + timedelta(days=1000 * state['rounds'])
+    _bulk_create(Appointment, [
+        Appointment(
+            doctor_id=provider_ids[i % len(provider_ids)], patient_id=rng.choice(patient_ids),
+            date=base + timedelta(days=i // len(provider_ids) // 8), time=dt_time(9 + i // len(provider_ids) % 8, 0),
+            status=rng.choice(['pending', 'confirmed', 'completed']),
+        ) for i in range(state['appointments'], target)
+    ])
+    state['appointments'] = state['doctors'] = target
+    state['rounds'] += 1
+
+    rebuild_search_projection()
+    rebuild_search_index()
+
+
+# --- Scenarios ---
+
+def scenarios(rng, state):
+    """ name -> callable(client) issuing one request; clients are authenticated as needed. """
+    doctor_ids = list(Doctor.objects.values_list('pk', flat=True))
+    patients = list(UserProfile.objects.filter(pk__in=state['patient_ids']).select_related('user'))
+    providers = list(ProviderProfile.objects.filter(pk__in=state['provider_ids']).select_related('profile__user'))
+    slots = state['booking_slots']
+    fresh_symptoms = state['symptom_sets']
+
+    def point():
+        return CENTER[0] + rng.uniform(-SPREAD, SPREAD) / 3, CENTER[1] + rng.uniform(-SPREAD, SPREAD) / 3
+
+    def nearby(client):
+        lat, lng = point()
+        return client.get('/api/doctors/nearby/', {'latitude': lat, 'longitude': lng})
+
+    def nearby_specialty(client):
+        lat, lng = point()
+        return client.get('/api/doctors/nearby/', {
+            'latitude': lat, 'longitude': lng, 'specialty': 'skin doctor', 'include_web_results': 'false',
+        })
+
+    def profile(client):
+        return client.get(f'/api/doctors/{rng.choice(doctor_ids)}/')
+
+    def symptom_analysis_cached(client):
+        # The same symptom set every time, so after the warmup each request is a cache hit
+        client.force_authenticate(rng.choice(patients).user)
+        return client.post('/api/symptoms/analyze/', {'symptoms': ['sneezing', 'runny nose']}, format='json')
+
+    def symptom_analysis_uncached(client):
+        # A symptom set never seen before, so each request misses the cache and calls Gemini
+        client.force_authenticate(rng.choice(patients).user)
+        symptoms = ['sneezing', 'runny nose', f'bench symptom {next(fresh_symptoms)}']
+        return client.post('/api/symptoms/analyze/', {'symptoms': symptoms}, format='json')
+
+    def appointment_list(client):
+        client.force_authenticate(rng.choice(providers).profile.user)
+        return client.get('/api/appointments/')
+
+    def appointment_book(client):
+        patient, slot = rng.choice(patients), next(slots)
+        client.force_authenticate(patient.user)
+        return client.post('/api/appointments/', {
+            'patient_id': patient.pk, 'doctor_id': rng.choice(providers).pk,
+            'date': (date(2100, 1, 1) + timedelta(days=slot // 8)).isoformat(), 'time': f'{9 + slot % 8}:00',
+        }, format='json')
+
+    return {
+        'nearby': nearby, 'nearby_specialty': nearby_specialty, 'profile': profile,
+        'symptom_analysis_cached': symptom_analysis_cached, 'symptom_analysis_uncached': symptom_analysis_uncached,
+        'appointment_list': appointment_list,
+        'appointment_book': appointment_book,
+    }
+
+
+def measure(request, count, warmup=5):
+    client = APIClient()
+    latencies, queries, errors = [], [], 0
+    for _ in range(warmup):
+        request(client)
+    started = time.perf_counter()
+    for _ in range(count):
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            response = request(client)
+            latencies.append(time.perf_counter() - t0)
+        queries.append(len(captured))
+        errors += response.status_code >= 400
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': count, 'errors': errors,
+        'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000, 'throughput_rps': count / elapsed,
+        'queries_mean': sum(queries) / count, 'queries_max': max(queries),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['size'], r['endpoint']): r for r in json.load(f)['results']}
+    print(f"\nChange vs. {baseline_path} (p95 / queries per request)")
+    for result in results:
+        before = baseline.get((result['size'], result['endpoint']))
+        if before:
+            change = (result['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0.0
+            print(f"  {result['size']:>7} {result['endpoint']:<26} p95 {before['p95_ms']:8.2f} -> "
+                  f"{result['p95_ms']:8.2f} ms ({change:+.0f}%)  queries {before['queries_mean']:.1f} -> "
+                  f"{result['queries_mean']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Comma-separated doctor/appointment counts")
+    parser.add_argument('--requests', type=int, default=100, help="Timed requests per endpoint and size")
+    parser.add_argument('--endpoints', help="Comma-separated subset of endpoints to run")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="JSON file from an earlier run to compare against")
+    parser.add_argument('--upstream-latency-scale', type=float, default=0,
+                        help="Scale for the replayed upstreams' recorded latency (0 measures only our own code)")
+    args = parser.parse_args()
+
+    setup_test_environment()  # Allows the 'testserver' host
+    call_command('migrate', verbosity=0)
+    use_replay_upstreams(args.upstream_latency_scale)
+    rng = random.Random(args.seed)
+    state = {
+        'doctors': 0, 'appointments': 0, 'providers': 0, 'rounds': 0, 'provider_ids': [], 'patient_ids': [],
+        'booking_slots': itertools.count(),  # Shared across sizes so bookings never collide
+        'symptom_sets': itertools.count(),  # Likewise, so uncached analyses stay uncached
+    }
+
+    results = []
+    print(f"{'size':>7} {'endpoint':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'errors':>8}")
+    for size in sorted(int(s) for s in args.sizes.split(',')):
+        seed(size, rng, state)
+        cache.clear()
+        selected = scenarios(rng, state)
+        if args.endpoints:
+            selected = {name: selected[name] for name in args.endpoints.split(',')}
+        for name, request in selected.items():
+            result = {'size': size, 'endpoint': name, **measure(request, args.requests)}
+            results.append(result)
+            print(f"{size:>7} {name:<26}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                  f"{result['throughput_rps']:>9.0f}{result['queries_mean']:>9.1f}{result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now(timezone.utc).isoformat(), 'python': platform.python_version(),
+                    'django': django.get_version(), 'requests_per_endpoint': args.requests, 'seed': args.seed,
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
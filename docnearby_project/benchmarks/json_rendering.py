@@ -0,0 +1,85 @@
+# benchmarks/json_rendering.py
+"""
+Render throughput of DRF's stock JSONRenderer vs. FastJSONRenderer on
+representative nearby-doctor, doctor-profile and appointment-list payloads.
+    python -m benchmarks.json_rendering [--rows 500]
+"""
+import argparse
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks import setup_django, best_of
+
+setup_django()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from docnearby_project.renderers import FastJSONRenderer  # noqa: E402
+from doctors.serializers import (  # noqa: E402
+    DoctorDetailSerializer, DOCTOR_LIST_COLUMNS, doctor_list_row_to_dict,
+)
+from benchmarks.nearby_serialization import build_doctors  # noqa: E402
+
+
+def nearby_payload(doctors):
+    rows = [tuple(getattr(d, col) for col in DOCTOR_LIST_COLUMNS) for d in doctors]
+    results = [doctor_list_row_to_dict(row, i / 100) for i, row in enumerate(rows)]
+    return {'results': results, 'count': len(results), 'verified_count': len(results),
+            'google_count': 0, 'message': f'Found {len(results)} healthcare providers near you'}
+
+
+def profiles_payload(doctors):
+    now = datetime.now(timezone.utc)
+    data = []
+    for doctor in doctors:
+        doctor.created_at = doctor.updated_at = now
+        data.append(DoctorDetailSerializer(doctor).data)
+    return data
+
+
+def appointments_payload(count):
+    # Raw values (Decimal, date/time/datetime) exercise the encoder fallbacks
+    now = datetime.now(timezone.utc)
+    provider = {'specialization': 'Dermatologist', 'clinic_name': 'Skin First', 'address': '12 MG Road',
+                'latitude': 18.52, 'longitude': 73.85, 'operating_hours': 'Mon-Fri 9am-5pm',
+                'is_verified': True, 'qualifications': 'MBBS, MD', 'bio': 'Experienced. ' * 20}
+    return [{
+        'id': i,
+        'patient': {'id': i, 'phone_number': '+91 90000 00000', 'role': 'patient', 'provider_details': None},
+        'doctor': provider,
+        'date': date.today() + timedelta(days=i % 30),
+        'time': time(9 + i % 8, 30),
+        'status': 'pending',
+        'fee': Decimal('500.00'),
+        'symptoms': 'fever, headache',
+        'notes': None,
+        'created_at': now,
+        'updated_at': now,
+    } for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    doctors = build_doctors(args.rows)
+    payloads = {
+        'nearby results': nearby_payload(doctors),
+        'doctor profiles': profiles_payload(doctors),
+        'appointments': appointments_payload(args.rows),
+    }
+    stock, fast = JSONRenderer(), FastJSONRenderer()
+    print(f"JSON render throughput, {args.rows} rows per payload")
+    for name, payload in payloads.items():
+        body = stock.render(payload)
+        assert fast.render(payload) == body
+        slow_t = best_of(lambda: stock.render(payload), number=10)
+        fast_t = best_of(lambda: fast.render(payload), number=10)
+        mb = len(body) / 1e6
+        print(f"  {name:16s} {len(body) / 1024:7.1f} KiB  stock {mb / slow_t:7.1f} MB/s  "
+              f"fast {mb / fast_t:7.1f} MB/s  ({slow_t / fast_t:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
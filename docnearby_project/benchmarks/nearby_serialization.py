@@ -0,0 +1,63 @@
+# benchmarks/nearby_serialization.py
+"""
+Per-row serialization cost of a 500-result nearby response:
+DoctorListSerializer over full Doctor instances vs. the tuple -> dict fast path.
+    python -m benchmarks.nearby_serialization [--rows 500]
+"""
+import argparse
+from decimal import Decimal
+
+from benchmarks import setup_django, best_of
+
+setup_django()
+
+from doctors.models import Doctor  # noqa: E402
+from doctors.serializers import (  # noqa: E402
+    DoctorListSerializer, DOCTOR_LIST_COLUMNS, doctor_list_row_to_dict,
+)
+
+
+def build_doctors(count):
+    doctors = []
+    for i in range(count):
+        doctor = Doctor(
+            id=i + 1, name=f'Dr. Bench {i}', specialty='General Physician', experience=i % 30,
+            rating=3.5 + (i % 15) / 10, reviews=i * 3, address=f'{i} Bench Street, Pune',
+            phone_number='+91 90000 00000', email=f'bench{i}@example.com',
+            latitude=18.5 + i / 10000, longitude=73.8 + i / 10000, consultation_fee=Decimal('400.00'),
+            is_available=True, is_verified=True, clinic_name=f'Clinic {i}',
+            qualifications='MBBS, MD ' * 10, bio='Experienced physician. ' * 40,
+            operating_hours='Mon-Sat 9am-6pm',
+        )
+        doctor.distance = i / 100
+        doctor.source = 'platform'
+        doctors.append(doctor)
+    return doctors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    doctors = build_doctors(args.rows)
+    rows = [tuple(getattr(d, col) for col in DOCTOR_LIST_COLUMNS) for d in doctors]
+
+    def serializer_path():
+        return DoctorListSerializer(doctors, many=True).data
+
+    def fast_path():
+        return [doctor_list_row_to_dict(row, i / 100) for i, row in enumerate(rows)]
+
+    assert [dict(d) for d in serializer_path()] == fast_path()
+
+    slow = best_of(serializer_path, number=5)
+    fast = best_of(fast_path, number=50)
+    print(f"Nearby response serialization, {args.rows} rows")
+    print(f"  DoctorListSerializer : {slow * 1e3:8.2f} ms/response  {slow / args.rows * 1e6:8.2f} us/row")
+    print(f"  tuple -> dict        : {fast * 1e3:8.2f} ms/response  {fast / args.rows * 1e6:8.2f} us/row")
+    print(f"  speedup              : {slow / fast:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/registration.py
+"""
+Registration and login lookups against a large auth_user table (1,000,000 users by
+default) in a temporary SQLite database. Compares the old `__iexact` uniqueness checks,
+which scan the table, with the LOWER(username)/LOWER(email) index lookups in
+users/uniqueness.py. Then times the register and login endpoints end to end. A fast
+password hasher (MD5) is used, so the timings show the database cost rather than the
+hashing cost.
+    python -m benchmarks.registration [--users 1000000] [--lookups 200] [--requests 100]
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import percentile
+
+_tmpdir = tempfile.TemporaryDirectory()
+
+
+def configure_database():
+    """ Points 'default' at a fresh file and uses a fast hasher; must run before Django sets up. """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'docnearby_project.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = os.path.join(_tmpdir.name, 'registration.sqlite3')
+    settings.DATABASES['replica']['NAME'] = settings.DATABASES['default']['NAME']
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+configure_database()
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from users.uniqueness import email_taken, username_taken  # noqa: E402
+
+BATCH = 20000
+BLANK_EMAIL_EVERY = 10  # Some accounts have no email, as users created by admins may
+PASSWORD = 'pass12345'
+
+
+# --- Seeding ---
+
+def seed(count):
+    """
+    Inserts `count` users with raw executemany, which is much faster than bulk_create at
+    this size. The unique indexes are already in place, so they are built as rows arrive.
+    """
+    password = make_password(PASSWORD)
+    joined = datetime.now(timezone.utc).isoformat()
+    sql = (
+        'INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, '
+        'is_staff, is_active, date_joined) VALUES (%s, 0, %s, %s, %s, %s, 0, 1, %s)'
+    )
+    started = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, count, BATCH):
+            cursor.executemany(sql, [
+                (password, f'User{i}', 'Bench', str(i), '' if i % BLANK_EMAIL_EVERY == 0 else f'User{i}@Example.com', joined)
+                for i in range(start, min(start + BATCH, count))
+            ])
+    print(f"Seeded {count:,} users in {time.perf_counter() - started:.1f}s\n")
+
+
+# --- Measurements ---
+
+def timed(func, count):
+    latencies, queries = [], []
+    for i in range(count):
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            func(i)
+            latencies.append(time.perf_counter() - t0)
+        queries.append(len(captured))
+    latencies.sort()
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+        'queries': sum(queries) / count,
+    }
+
+
+def lookups(users, count=1000):
+    """ Ids of existing users spread evenly over the table, in random order. """
+    ids = [i * users // count for i in range(count)]
+    random.Random(42).shuffle(ids)
+    return ids
+
+
+def scenarios(users, fresh):
+    existing = lookups(users)
+
+    def pick(i):
+        return existing[i % len(existing)]
+
+    def register(client):
+        n = next(fresh)
+        return client.post('/api/users/register/', {
+            'username': f'new{n}', 'email': f'new{n}@example.com', 'password': PASSWORD, 'user_type': 'patient',
+        }, format='json')
+
+    def login(client):
+        return client.post('/api/users/login/', {'username': f'user{pick(next(fresh))}', 'password': PASSWORD}, format='json')
+
+    checks = {
+        'username iexact': lambda i: User.objects.filter(username__iexact=f'user{pick(i)}').exists(),
+        'username lower': lambda i: username_taken(User, f'user{pick(i)}'),
+        'email iexact': lambda i: User.objects.filter(email__iexact=f'USER{pick(i) | 1}@example.com').exists(),
+        'email lower': lambda i: email_taken(User, f'USER{pick(i) | 1}@example.com'),
+    }
+    return checks, {'register': register, 'login': login}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200, help="Timed calls per uniqueness check")
+    parser.add_argument('--requests', type=int, default=100, help="Timed requests per endpoint")
+    args = parser.parse_args()
+
+    setup_test_environment()  # Allows the 'testserver' host
+    call_command('migrate', verbosity=0)
+    seed(args.users)
+    checks, endpoints = scenarios(args.users, itertools.count())
+
+    print(f"{'check':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}")
+    for name, check in checks.items():
+        check(0)  # Warm the page cache
+        result = timed(check, args.lookups)
+        print(f"{name:<22}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['queries']:>9.1f}")
+
+    client = APIClient()
+    print(f"\n{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}")
+    for name, request in endpoints.items():
+        statuses = set()
+        result = timed(lambda i: statuses.add(request(client).status_code), args.requests)
+        print(f"{name:<22}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['queries']:>9.1f}"
+              f"  status {sorted(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# docnearby_project/log.py
+"""
+Logging pipeline (wired up in settings.LOGGING). Request threads never write to stdout
+themselves:
+
+- BackgroundHandler puts records on a bounded in-memory queue. A background thread
+  formats them and writes them out. When the queue is full, records are dropped rather
+  than blocking the request.
+- JsonFormatter writes one JSON object per line, including any `extra={...}` fields.
+- SamplingFilter applies per-logger rules from settings.LOG_SAMPLING before anything is
+  queued. DEBUG/INFO records are kept with probability `sample_rate`. All levels are
+  capped at `max_per_second`.
+
+Hot paths should log with %-style arguments (logger.debug("x=%s", x)), not f-strings,
+so nothing is formatted when the level is disabled.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    'docnearby_log_records_dropped_total', 'Log records dropped by reason (sampled, rate_limited, queue_full).',
+    ('reason',),
+)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    rules: {logger name: {'sample_rate': 0.1, 'max_per_second': 20}}. A rule covers its
+    logger and that logger's children; the most specific rule wins.
+    """
+    def __init__(self, rules=None):
+        super().__init__()
+        self.rules = rules or {}
+        self._lock = threading.Lock()
+        self._buckets = {}  # rule name -> (tokens, last refill)
+        self._resolved = {}  # logger name -> rule name or None
+
+    def _rule_name(self, logger_name):
+        if logger_name not in self._resolved:
+            matches = [name for name in self.rules if logger_name == name or logger_name.startswith(name + '.')]
+            self._resolved[logger_name] = max(matches, key=len) if matches else None
+        return self._resolved[logger_name]
+
+    def filter(self, record):
+        name = self._rule_name(record.name)
+        if name is None:
+            return True
+        rule = self.rules[name]
+        if record.levelno < logging.WARNING and random.random() >= rule.get('sample_rate', 1.0):
+            LOG_RECORDS_DROPPED.inc(reason='sampled')
+            return False
+        limit = rule.get('max_per_second')
+        if limit is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(name, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+            allowed = tokens >= 1
+            self._buckets[name] = (tokens - 1 if allowed else tokens, now)
+        if not allowed:
+            LOG_RECORDS_DROPPED.inc(reason='rate_limited')
+        return allowed
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Blocking, so stopping works even with a full queue
+
+
+class BackgroundHandler(QueueHandler):
+    """ Queues records for a writer thread that formats them onto `stream` (stdout by default). """
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = _Listener(self.queue, self.target)
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self.listener.start()
+        atexit.register(self.close)  # Drain the queue on shutdown
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)  # Formatting happens on the writer thread
+
+    def prepare(self, record):
+        # Only merge the arguments now (they may be mutated later); the rest waits for the writer
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason='queue_full')
+
+    def close(self):
+        """ Writes out what is still queued and stops the writer thread. Safe to call twice. """
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self.listener.stop()
+                self.target.close()
+        super().close()
@@ -0,0 +1,235 @@
+# docnearby_project/metrics.py
+"""
+Counters and histograms for the API's hot paths, served at /metrics in the Prometheus
+text exposition format.
+
+Each worker process counts in memory. With settings.METRICS_DIR set, every process also
+writes a snapshot of its values to `<METRICS_DIR>/metrics-<id>.json`, at most every
+METRICS_FLUSH_INTERVAL seconds and at exit. /metrics then adds up the snapshots of all
+processes, including ones that have exited, so counters never go backwards. The
+directory should be emptied when the service is (re)deployed. Without METRICS_DIR,
+/metrics only shows the process that answers it.
+"""
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Forked workers must not report (and later re-add) their parent's values
+        self.pid = os.getpid()
+        self.process_id = f'{self.pid}-{uuid.uuid4().hex[:8]}'
+        self.values = {}  # (metric name, label values) -> number, or [bucket counts..., sum, count]
+        self.last_flush = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, key, update):
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            self.values[key] = update(self.values.get(key))
+
+    def snapshot(self):
+        with self.lock:
+            if os.getpid() != self.pid:
+                self._reset()
+            return {key: list(value) if isinstance(value, list) else value for key, value in self.values.items()}
+
+    # --- Multi-process snapshots ---
+
+    def flush(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        values = self.snapshot()
+        path = os.path.join(directory, f'metrics-{self.process_id}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([[name, list(labels), value] for (name, labels), value in values.items()], f)
+        os.replace(tmp_path, path)  # Readers never see a half-written file
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            self.flush()
+
+    def collect(self):
+        """ Values summed over all processes (just this one without METRICS_DIR). """
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return self.snapshot()
+        self.flush()
+        totals = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in entries:
+                key = (name, tuple(labels))
+                if key not in totals:
+                    totals[key] = value
+                elif isinstance(value, list):
+                    totals[key] = [a + b for a, b in zip(totals[key], value)]
+                else:
+                    totals[key] += value
+        return totals
+
+    def exposition(self):
+        values = self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for (name, labels), value in sorted(values.items()):
+                if name == metric.name:
+                    lines.extend(metric.samples(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        self.registry.update(key, lambda value: (value or 0) + amount)
+
+    def samples(self, labels, value):
+        yield f'{self.name}{_format_labels(zip(self.labelnames, labels))} {_format_value(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.registry = registry
+        registry.register(self)
+
+    def observe(self, amount, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        # Counts per bucket (not cumulative), then sum and count
+        index = next((i for i, bound in enumerate(self.buckets) if amount <= bound), len(self.buckets))
+
+        def update(value):
+            value = value or [0] * (len(self.buckets) + 3)
+            value[index] += 1
+            value[-2] += amount
+            value[-1] += 1
+            return value
+        self.registry.update(key, update)
+
+    def samples(self, labels, value):
+        pairs = list(zip(self.labelnames, labels))
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), value[:-2]):
+            cumulative += count
+            yield f'{self.name}_bucket{_format_labels(pairs + [("le", _format_value(bound))])} {cumulative}'
+        yield f'{self.name}_sum{_format_labels(pairs)} {_format_value(float(value[-2]))}'
+        yield f'{self.name}_count{_format_labels(pairs)} {value[-1]}'
+
+
+# --- Metrics ---
+
+REQUEST_DURATION = Histogram(
+    'docnearby_http_request_duration_seconds', 'API request latency by URL name.', ('view', 'method', 'status'),
+)
+UPSTREAM_REQUESTS = Counter(
+    'docnearby_upstream_requests_total', 'Outbound calls by upstream and outcome (ok, error, rate_limited).',
+    ('upstream', 'outcome'),
+)
+UPSTREAM_DURATION = Histogram(
+    'docnearby_upstream_request_duration_seconds', 'Outbound call latency by upstream.', ('upstream',),
+)
+CACHE_REQUESTS = Counter(
+    'docnearby_cache_requests_total', 'Cache lookups by cache and result (hit, miss).', ('cache', 'result'),
+)
+NEARBY_RESULTS = Counter(
+    'docnearby_nearby_results_total', 'Results returned by the nearby search, by source.', ('source',),
+)
+UPSTREAM_BUDGET = Counter(
+    'docnearby_upstream_budget_total',
+    'Upstream budget checks by result (granted, client_exhausted, global_exhausted).', ('upstream', 'result'),
+)
+
+
+def upstream_outcome(status_code):
+    if status_code == 429:
+        return 'rate_limited'
+    return 'ok' if status_code < 400 else 'error'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            view=(match.view_name if match else '<unmatched>'), method=request.method, status=response.status_code,
+        )
+        if getattr(settings, 'METRICS_DIR', None):
+            REGISTRY.maybe_flush()
+        return response
+
+
+def metrics_view(request):
+    """ Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>` when that is set. """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+# docnearby_project/renderers.py
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to DRF's stdlib json renderer
+    orjson = None
+
+# orjson hands datetimes to `default` so they are formatted exactly like DRF's
+# encoder (millisecond precision, 'Z' suffix for UTC).
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that serializes with orjson.
+    Types orjson doesn't know natively (Decimal, lazy translation strings, datetimes,
+    querysets...) go through DRF's JSONEncoder.default, so output matches the
+    stock renderer. Indented output (browsable API, `; indent=N`), non-compact
+    settings, or anything orjson rejects fall back to the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (orjson is None or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the stock renderer's escaping of U+2028/U+2029 (strict JS subset)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
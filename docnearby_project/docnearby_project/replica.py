@@ -0,0 +1,108 @@
+# docnearby_project/replica.py
+"""
+Read-replica routing. Views that opt in with ReplicaReadMixin send their safe-method
+(GET/HEAD/OPTIONS) reads to settings.DATABASE_READ_REPLICA. Everything else,
+including all writes, uses the primary ('default').
+
+Read-your-writes: once a request writes to the primary, ReplicaPinningMiddleware pins
+that user to the primary for REPLICA_PIN_SECONDS, which should exceed the replication lag.
+The pin is kept in the shared cache so it holds across worker processes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class _RoutingState:
+    """ Per-request routing flags. """
+    def __init__(self):
+        self.replica_reads = False
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing_state', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_READ_REPLICA', None)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), 1, REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+
+@contextmanager
+def read_from_primary():
+    """ Forces reads inside the block to the primary, e.g. before caching what was read. """
+    state = _state.get()
+    previous = state.replica_reads if state else False
+    if state:
+        state.replica_reads = False
+    try:
+        yield
+    finally:
+        if state:
+            state.replica_reads = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        alias = replica_alias()
+        if alias and state and state.replica_reads and not state.wrote:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state:
+            state.wrote = True  # The rest of this request reads its own writes from the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data, so rows from either side may be related
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """ Sets up per-request routing state and pins users who wrote to the primary. """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        # DRF copies the token-authenticated user onto the Django request
+        user = getattr(request, 'user', None)
+        if state.wrote and replica_alias() and user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
+        return response
+
+
+class ReplicaReadMixin:
+    """ For read-heavy APIViews: safe-method requests read from the replica unless the user is pinned. """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)  # Authenticates, so request.user is known
+        state = _state.get()
+        if state is None or not replica_alias() or request.method not in SAFE_METHODS:
+            return
+        user = request.user
+        state.replica_reads = not (user.is_authenticated and is_pinned(user.pk))
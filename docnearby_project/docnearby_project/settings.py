@@ -62,12 +62,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'docnearby_project.timing.RequestTimingMiddleware', # First, so its total covers everything below
+    'docnearby_project.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware', # High up
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'docnearby_project.replica.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,13 +82,178 @@ TEMPLATES = [ { 'BACKEND': 'django.template.backends.django.DjangoTemplates', 'D
 WSGI_APPLICATION = 'docnearby_project.wsgi.application'
 
 # Database
-DATABASES = { 'default': { 'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3', } }
+# DATABASE_ENGINE=postgresql switches to PostgreSQL (requires 'psycopg'; DB_POOL=True also needs
+# 'psycopg[pool]'). Otherwise SQLite runs in WAL mode so reads continue during a write, and
+# writers queue for up to SQLITE_BUSY_TIMEOUT seconds instead of failing with "database is locked".
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))  # Seconds to keep a connection open between requests
+SQLITE_PRAGMAS = [
+    'journal_mode=WAL',
+    'synchronous=NORMAL',  # Durable across app crashes in WAL mode; fsyncs only at checkpoints
+    'mmap_size=134217728',  # 128 MB
+    'cache_size=-20000',  # 20 MB per connection
+    'temp_store=MEMORY',
+]
+SQLITE_OPTIONS = {
+    'init_command': ';'.join(f'PRAGMA {pragma}' for pragma in SQLITE_PRAGMAS),
+    # Take the write lock when a transaction starts, so concurrent writers wait on the busy
+    # timeout instead of deadlocking when a read transaction upgrades to a write
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+}
+if DATABASE_ENGINE == 'postgresql':
+    DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+    DATABASES = { 'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB', 'docnearby'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Pooled connections are returned to the pool per request, so persistent connections must be off
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': { 'pool': { 'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')), 'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')), } } if DB_POOL else {},
+    } }
+    POSTGRES_REPLICA_HOST = os.getenv('POSTGRES_REPLICA_HOST')
+    if POSTGRES_REPLICA_HOST:
+        DATABASES['replica'] = {
+            **DATABASES['default'], 'HOST': POSTGRES_REPLICA_HOST,
+            'PORT': os.getenv('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': { 'MIRROR': 'default' },
+        }
+    DATABASE_READ_REPLICA = 'replica' if POSTGRES_REPLICA_HOST else None
+else:
+    DATABASES = { 'default': {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': SQLITE_OPTIONS,
+        # A file rather than in-memory, so threaded tests (concurrent bookings) share one
+        # database and busy-wait on its lock instead of failing with shared-cache
+        # "database table is locked" errors
+        'TEST': { 'NAME': BASE_DIR / 'test_db.sqlite3' },
+    } }
+    # Replica file kept in sync by an external replicator (e.g. LiteFS); without
+    # SQLITE_REPLICA_NAME the alias reads the primary file and routing stays off
+    SQLITE_REPLICA_NAME = os.getenv('SQLITE_REPLICA_NAME')
+    DATABASES['replica'] = {
+        **DATABASES['default'], 'NAME': SQLITE_REPLICA_NAME or DATABASES['default']['NAME'],
+        'TEST': { 'NAME': BASE_DIR / 'test_replica.sqlite3' },
+    }
+    DATABASE_READ_REPLICA = 'replica' if SQLITE_REPLICA_NAME else None
+
+# Read-heavy views (ReplicaReadMixin) send GET reads to DATABASE_READ_REPLICA; a user who
+# writes is pinned to the primary for REPLICA_PIN_SECONDS (see docnearby_project/replica.py)
+DATABASE_ROUTERS = ['docnearby_project.replica.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Cache
+# Set REDIS_URL to share the cache between worker processes (requires the 'redis'
+# package); otherwise each process uses its own in-memory cache.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = { 'default': { 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL, } }
+else:
+    CACHES = { 'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', } }
+
+# Seconds a serialized doctor profile stays cached (entries are also dropped on save/delete)
+DOCTOR_PROFILE_CACHE_TIMEOUT = int(os.getenv('DOCTOR_PROFILE_CACHE_TIMEOUT', '300'))
+# Seconds Google Places results (per ~1 km area and keyword) and Gemini symptom analyses
+# (per set of symptoms) are reused before the upstream is asked again
+PLACES_CACHE_TIMEOUT = int(os.getenv('PLACES_CACHE_TIMEOUT', '900'))
+SYMPTOM_ANALYSIS_CACHE_TIMEOUT = int(os.getenv('SYMPTOM_ANALYSIS_CACHE_TIMEOUT', '86400'))
+
+# Asynchronous symptom analysis (?async=true, symptoms/jobs.py): jobs run on SYMPTOM_JOB_WORKERS
+# threads per web process (0 runs them in the request, after it commits). Jobs expire
+# SYMPTOM_JOB_TTL seconds after creation; unfinished ones fail after SYMPTOM_JOB_TIMEOUT seconds.
+SYMPTOM_JOB_WORKERS = int(os.getenv('SYMPTOM_JOB_WORKERS', '4'))
+SYMPTOM_JOB_TTL = int(os.getenv('SYMPTOM_JOB_TTL', '3600'))
+SYMPTOM_JOB_TIMEOUT = int(os.getenv('SYMPTOM_JOB_TIMEOUT', '120'))
+
+# Upstream quota budgets (docnearby_project/throttling.py): token buckets in the cache above,
+# one token per upstream call, per client (user, or IP when anonymous) and global. 'rate' is
+# the refill rate ('<n>/<s|min|hour|day>'), 'burst' the bucket size. A nearby search with web
+# results costs 1 + one Places details call per result (up to 20). Once a bucket is empty,
+# requests get cached or platform-only results instead.
+UPSTREAM_BUDGETS = {
+    'gemini': {
+        'client': {'rate': os.getenv('GEMINI_CLIENT_RATE', '30/hour'), 'burst': int(os.getenv('GEMINI_CLIENT_BURST', '10'))},
+        'global': {'rate': os.getenv('GEMINI_GLOBAL_RATE', '60/min'), 'burst': int(os.getenv('GEMINI_GLOBAL_BURST', '120'))},
+    },
+    'places': {
+        'client': {'rate': os.getenv('PLACES_CLIENT_RATE', '300/hour'), 'burst': int(os.getenv('PLACES_CLIENT_BURST', '100'))},
+        'global': {'rate': os.getenv('PLACES_GLOBAL_RATE', '600/min'), 'burst': int(os.getenv('PLACES_GLOBAL_BURST', '1000'))},
+    },
+}
+
+# External services: 'live' calls Google/Gemini/directory sites; 'replay' serves recorded
+# responses from upstream_fixtures/ with injected latency and faults (docnearby_project/upstreams.py)
+UPSTREAM_MODE = os.getenv('UPSTREAM_MODE', 'live')
+UPSTREAM_REPLAY = {
+    'fixtures_dir': os.getenv('UPSTREAM_FIXTURES_DIR', str(BASE_DIR / 'docnearby_project' / 'upstream_fixtures')),
+    'latency_scale': float(os.getenv('UPSTREAM_LATENCY_SCALE', '1.0')),  # 0 disables injected latency
+    'error_rate': float(os.getenv('UPSTREAM_ERROR_RATE', '0')),  # Fraction of calls failing with 503
+    'rate_limit_rate': float(os.getenv('UPSTREAM_RATE_LIMIT_RATE', '0')),  # Fraction answered as rate-limited
+    # Per-upstream overrides ('places', 'geocoding', 'directory', 'gemini'), e.g. {'gemini': {'latency_ms': 2000}}
+    'upstreams': {},
+}
+
+# Per-request timing (docnearby_project/timing.py): the Server-Timing header exposes
+# internal timings, so it defaults to DEBUG. Requests slower than REQUEST_TIMING_SLOW_MS
+# are always logged, others with probability REQUEST_TIMING_SAMPLE_RATE.
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', str(DEBUG)) == 'True'
+REQUEST_TIMING_SLOW_MS = float(os.getenv('REQUEST_TIMING_SLOW_MS', '1000'))
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0.01'))
+
+# Logging (docnearby_project/log.py): JSON lines written by a background thread from a
+# bounded queue (records are dropped, never waited on, when it is full). LOG_SAMPLING maps
+# logger names to a sample rate for DEBUG/INFO records and a per-second cap for all levels.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_SAMPLING = {
+    'doctors.views': {'sample_rate': 0.1, 'max_per_second': 50},  # Per-result parsing/scraping noise
+    'symptoms.analysis': {'sample_rate': 0.1, 'max_per_second': 20},  # Raw and parsed Gemini output at DEBUG
+}
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': { 'json': { '()': 'docnearby_project.log.JsonFormatter', }, },
+    'filters': { 'sampling': { '()': 'docnearby_project.log.SamplingFilter', 'rules': LOG_SAMPLING, }, },
+    'handlers': {
+        'background': {
+            'class': 'docnearby_project.log.BackgroundHandler', 'queue_size': LOG_QUEUE_SIZE,
+            'formatter': 'json', 'filters': ['sampling'],
+        },
+    },
+    'root': { 'handlers': ['background'], 'level': LOG_LEVEL, },
+    'loggers': { 'django': { 'handlers': ['background'], 'level': 'INFO', 'propagate': False, }, },
+}
+
+# Processes that hash passwords for bulk provider registration (users/onboarding.py);
+# 0 hashes in the request thread
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Prometheus metrics at /metrics (docnearby_project/metrics.py). With several worker
+# processes, set METRICS_DIR to a directory they share (emptied on deploy) so the
+# endpoint reports all of them. METRICS_TOKEN, if set, is required as a bearer token.
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Geocoder used by `manage.py geocode_addresses` to fill missing coordinates
+# (doctors.geocoding.LocalGeocoder is an offline stand-in for development and tests)
+GEOCODER_CLASS = os.getenv('GEOCODER_CLASS', 'doctors.geocoding.GoogleGeocoder')
+
+# Login matches usernames case-insensitively, like registration (users/backends.py)
+AUTHENTICATION_BACKENDS = ['users.backends.CaseInsensitiveModelBackend']
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [ { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', }, { 'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator', }, { 'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator', }, { 'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator', }, ]
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'; TIME_ZONE = 'UTC'; USE_I18N = True; USE_TZ = True
+# Zone that operating hours are written in; open_now and time-zone-aware open_at
+# values are converted to it before matching opening intervals (doctors/schedule.py)
+CLINIC_TIME_ZONE = os.getenv('CLINIC_TIME_ZONE', 'Asia/Kolkata')
 
 # Static files
 STATIC_URL = 'static/'
@@ -96,8 +264,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # DRF Settings
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
-    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticatedOrReadOnly',)
+    # JWTAuthentication that also exposes the token's role claims on request.user
+    'DEFAULT_AUTHENTICATION_CLASSES': ('users.authentication.RoleClaimsJWTAuthentication',),
+    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticatedOrReadOnly',),
+    # orjson-backed JSON (falls back to stdlib json if orjson isn't installed)
+    'DEFAULT_RENDERER_CLASSES': (
+        'docnearby_project.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'docnearby_project.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # Simple JWT Settings
@@ -106,6 +285,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
     'SIGNING_KEY': SECRET_KEY,
+    # Refreshed access tokens get the user's current role claims
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.RoleClaimsTokenRefreshSerializer',
     # Add other settings if needed
 }
 
@@ -0,0 +1,111 @@
+# docnearby_project/throttling.py
+"""
+Budgets for paid upstream calls (Gemini, Google Places), as token buckets in the default
+cache. Set REDIS_URL so all worker processes share them. One token pays for one upstream
+call. Each upstream has a bucket per client (the user, or the IP address for anonymous
+requests) and a global bucket; settings.UPSTREAM_BUDGETS sets their sizes and refill
+rates. Views that find a bucket empty serve cached or platform-only results instead
+of calling the upstream.
+
+The buckets use only atomic cache operations (add/incr/decr), with no read-modify-write.
+A bucket's value is the number of tokens it has paid out, less its refill so far
+(stored as `rate * time.time()` worth of tokens). So a take is a single incr, undone
+with decr if it overdraws the bucket.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import UPSTREAM_BUDGET
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SCALE = 1000  # Cache values are integers, so tokens are counted in thousandths
+# Idle buckets refill completely after burst / rate seconds; their keys live a few times longer.
+# An expired key reads as a full bucket, so at worst a client gets one extra burst per expiry.
+KEY_LIFETIMES = 10
+
+
+def parse_rate(rate):
+    """ '<tokens>/<s|sec|min|hour|day>' -> tokens per second. """
+    tokens, period = rate.split('/')
+    return int(tokens) / PERIODS[period[0]]
+
+
+class TokenBucket:
+    def __init__(self, key, rate, burst):
+        self.key = key
+        self.rate = parse_rate(rate)
+        self.burst = burst
+        self.timeout = max(1, math.ceil(burst / self.rate * KEY_LIFETIMES))
+
+    def take(self, cost=1):
+        """ Takes `cost` tokens. Returns 0 when granted, else the seconds until they would be. """
+        cost_units = int(cost * SCALE)
+        if cost_units > self.burst * SCALE:
+            return math.inf
+        refilled = int(time.time() * self.rate * SCALE)
+        # A new (or expired) bucket starts full
+        if cache.add(self.key, refilled + cost_units, self.timeout):
+            return 0
+        try:
+            paid = cache.incr(self.key, cost_units)
+        except ValueError:  # Expired since the add
+            cache.set(self.key, refilled + cost_units, self.timeout)
+            return 0
+        if paid - cost_units < refilled:
+            # The bucket was already full; its refill since then has nowhere to go. Not atomic,
+            # but a take racing with this set can only be forgotten (let through), never overcharged.
+            cache.set(self.key, refilled + cost_units, self.timeout)
+            return 0
+        overdraft = paid - refilled - self.burst * SCALE
+        if overdraft <= 0:
+            return 0
+        self.refund(cost)
+        return overdraft / SCALE / self.rate
+
+    def refund(self, cost=1):
+        try:
+            cache.decr(self.key, int(cost * SCALE))
+        except ValueError:
+            pass
+
+
+class UpstreamBudget:
+    """
+    The per-client and global buckets of one upstream, for one request. take() spends
+    from both or neither. After a refusal, `retry_after` is the wait in seconds.
+    """
+    def __init__(self, upstream, request):
+        self.upstream = upstream
+        self.retry_after = 0
+        config = getattr(settings, 'UPSTREAM_BUDGETS', {}).get(upstream)
+        self.buckets = []
+        if config:
+            user = getattr(request, 'user', None)
+            client = f'user-{user.pk}' if user is not None and user.is_authenticated else BaseThrottle().get_ident(request)
+            self.buckets = [
+                ('client', TokenBucket(f'upstream-budget:{upstream}:{client}', **config['client'])),
+                ('global', TokenBucket(f'upstream-budget:{upstream}', **config['global'])),
+            ]
+
+    def take(self, cost=1):
+        taken = []
+        for scope, bucket in self.buckets:
+            wait = bucket.take(cost)
+            if wait:
+                for _, earlier in taken:
+                    earlier.refund(cost)
+                self.retry_after = max(1, math.ceil(min(wait, 86400)))
+                UPSTREAM_BUDGET.inc(upstream=self.upstream, result=f'{scope}_exhausted')
+                return False
+            taken.append((scope, bucket))
+        UPSTREAM_BUDGET.inc(upstream=self.upstream, result='granted')
+        return True
+
+    def refund(self, cost=1):
+        """ Gives back a granted take() whose upstream call was not made after all. """
+        for _, bucket in self.buckets:
+            bucket.refund(cost)
@@ -0,0 +1,137 @@
+# docnearby_project/timing.py
+"""
+Per-request timing breakdown. RequestTimingMiddleware collects how long each request
+spent in the database, in outbound HTTP calls (per host), in Gemini and in rendering
+the response. It reports the totals in a `Server-Timing` header (SERVER_TIMING_HEADER)
+and in a sampled structured log record.
+
+Code adds its own spans with `span(name)` or `record(name, seconds)`. Both do nothing
+outside a request. Spans run in worker threads only count if the thread runs in a copy
+of the request's context (contextvars.copy_context().run). Those spans overlap, so the
+parts can add up to more than the total.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """ name -> [seconds, count] for one request; safe to add to from several threads. """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, count=1):
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += count
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+_timings = ContextVar('request_timings', default=None)
+
+
+def current_timings():
+    return _timings.get()
+
+
+def record(name, seconds, count=1):
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds, count)
+
+
+@contextmanager
+def span(name):
+    """ Adds the time spent inside the block to `name` for the current request. """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('db', time.perf_counter() - started)
+
+
+def server_timing_header(timings, total):
+    """ e.g. 'db;dur=3.1;desc="4 calls", http.maps.googleapis.com;dur=152.0;desc="6 calls", total;dur=160.2' """
+    parts = [
+        f'{name};dur={seconds * 1000:.1f};desc="{count} call{"" if count == 1 else "s"}"'
+        for name, (seconds, count) in sorted(timings.spans.items())
+    ]
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class RequestTimingMiddleware:
+    """ Should come first in MIDDLEWARE so the total covers the other middleware too. """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        total = timings.elapsed()
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = server_timing_header(timings, total)
+        self.log(request, response, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before DRF's Response is rendered; the callback runs right after
+        timings = _timings.get()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda r: timings.add('render', time.perf_counter() - started))
+        return response
+
+    def log(self, request, response, timings, total):
+        """ Logs every slow request, plus a random sample of the rest. """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        slow = total * 1000 >= getattr(settings, 'REQUEST_TIMING_SLOW_MS', 1000)
+        if not slow and random.random() >= getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 0.01):
+            return
+        match = getattr(request, 'resolver_match', None)
+        logger.info('request_timing', extra={
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'slow': slow,
+            'spans': {
+                name: {'ms': round(seconds * 1000, 1), 'count': count}
+                for name, (seconds, count) in timings.spans.items()
+            },
+        })
@@ -0,0 +1,262 @@
+# docnearby_project/upstreams.py
+"""
+Clients for the external services the API calls: Google Maps (Places, Geocoding),
+directory sites (Practo, Lybrate) and Gemini.
+
+`http` is one shared requests.Session, so connections to each host are pooled and kept
+alive. GeminiModel wraps google.generativeai.GenerativeModel.
+
+With settings.UPSTREAM_MODE = 'replay', both serve recorded responses from
+UPSTREAM_REPLAY['fixtures_dir'] instead of touching the network. Injected latency, errors
+and rate limiting (UPSTREAM_REPLAY) let the real request and parsing code be load-tested
+offline. The mode is read on every call, so override_settings works in tests.
+"""
+import io
+import json
+import math
+import os
+import random
+import threading
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import google.generativeai as genai
+import requests
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+from requests.adapters import BaseAdapter
+
+from .metrics import UPSTREAM_DURATION, UPSTREAM_REQUESTS, upstream_outcome
+from .timing import span
+
+# Per-upstream replay behaviour; UPSTREAM_REPLAY['upstreams'] overrides individual keys.
+# Latency is log-normal: median `latency_ms`, spread `latency_sigma`.
+DEFAULT_UPSTREAM_PROFILES = {
+    'places': {'latency_ms': 150, 'latency_sigma': 0.4},
+    'geocoding': {'latency_ms': 120, 'latency_sigma': 0.4},
+    'directory': {'latency_ms': 400, 'latency_sigma': 0.6},
+    'gemini': {'latency_ms': 900, 'latency_sigma': 0.5},
+}
+
+_random = random.Random()
+_random_lock = threading.Lock()
+
+
+def replay_enabled():
+    return getattr(settings, 'UPSTREAM_MODE', 'live') == 'replay'
+
+
+def replay_config():
+    return getattr(settings, 'UPSTREAM_REPLAY', {})
+
+
+def upstream_profile(upstream):
+    config = replay_config()
+    profile = {'latency_ms': 0, 'latency_sigma': 0, 'error_rate': 0.0, 'rate_limit_rate': 0.0}
+    profile.update(DEFAULT_UPSTREAM_PROFILES.get(upstream, {}))
+    profile.update({key: config[key] for key in ('error_rate', 'rate_limit_rate') if key in config})
+    profile.update(config.get('upstreams', {}).get(upstream, {}))
+    profile['latency_ms'] *= config.get('latency_scale', 1.0)
+    return profile
+
+
+def inject_fault(upstream):
+    """ Sleeps for a sampled latency, then returns None, 'error' or 'rate_limited'. """
+    profile = upstream_profile(upstream)
+    with _random_lock:
+        latency = profile['latency_ms'] * math.exp(profile['latency_sigma'] * _random.gauss(0, 1))
+        roll = _random.random()
+    if latency > 0:
+        time.sleep(latency / 1000)
+    if roll < profile['rate_limit_rate']:
+        return 'rate_limited'
+    if roll < profile['rate_limit_rate'] + profile['error_rate']:
+        return 'error'
+    return None
+
+
+def load_fixture(name):
+    path = os.path.join(replay_config().get('fixtures_dir', ''), name)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f) if name.endswith('.json') else f.read()
+
+
+# --- HTTP replay ---
+
+def _places_nearby(query):
+    return load_fixture('places_nearbysearch.json')
+
+
+def _places_details(query):
+    details = load_fixture('places_details.json')
+    place_id = query.get('place_id', [''])[0]
+    if place_id not in details:
+        return {'status': 'NOT_FOUND'}
+    return {'status': 'OK', 'result': details[place_id]}
+
+
+def _geocode(query):
+    return load_fixture('geocode.json')
+
+
+# (host, path prefix) -> (upstream, handler returning a JSON body, or an .html fixture name)
+REPLAY_ROUTES = {
+    ('maps.googleapis.com', '/maps/api/place/nearbysearch/'): ('places', _places_nearby),
+    ('maps.googleapis.com', '/maps/api/place/details/'): ('places', _places_details),
+    ('maps.googleapis.com', '/maps/api/geocode/'): ('geocoding', _geocode),
+    ('www.practo.com', '/'): ('directory', 'practo.html'),
+    ('www.lybrate.com', '/'): ('directory', 'lybrate.html'),
+}
+
+
+# (host, path prefix) -> upstream label for metrics
+UPSTREAM_NAMES = {
+    ('maps.googleapis.com', '/maps/api/place/nearbysearch/'): 'places_nearbysearch',
+    ('maps.googleapis.com', '/maps/api/place/details/'): 'places_details',
+    ('maps.googleapis.com', '/maps/api/geocode/'): 'geocoding',
+    ('www.practo.com', '/'): 'practo',
+    ('www.lybrate.com', '/'): 'lybrate',
+}
+
+
+def match_route(routes, url):
+    """ The value of the first (host, path prefix) key in `routes` matching the split `url`. """
+    return next((
+        target for (host, prefix), target in routes.items()
+        if url.hostname == host and url.path.startswith(prefix)
+    ), None)
+
+
+class ReplayAdapter(BaseAdapter):
+    """ requests transport adapter that answers from fixtures instead of the network. """
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        route = match_route(REPLAY_ROUTES, url)
+        if route is None:
+            raise requests.ConnectionError(f"No replay fixture for {request.url}", request=request)
+        upstream, handler = route
+
+        fault = inject_fault(upstream)
+        is_google = url.hostname == 'maps.googleapis.com'
+        if fault == 'rate_limited':
+            # Google Maps reports quota errors in the body of a 200 response
+            return self._response(request, 200, {'status': 'OVER_QUERY_LIMIT', 'results': []}) if is_google \
+                else self._response(request, 429, 'Too Many Requests', {'Retry-After': '1'})
+        if fault == 'error':
+            return self._response(request, 503, 'Service Unavailable')
+        body = handler(parse_qs(url.query)) if callable(handler) else load_fixture(handler)
+        return self._response(request, 200, body)
+
+    def _response(self, request, status_code, body, headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.request = request
+        response.url = request.url
+        if isinstance(body, (dict, list)):
+            content, content_type = json.dumps(body).encode(), 'application/json; charset=UTF-8'
+        else:
+            content, content_type = body.encode(), 'text/html; charset=utf-8'
+        response.headers.update({'Content-Type': content_type, **(headers or {})})
+        response.raw = io.BytesIO(content)
+        response.encoding = 'utf-8'
+        response.reason = HTTPStatus(status_code).phrase
+        return response
+
+    def close(self):
+        pass
+
+
+class UpstreamSession(requests.Session):
+    """
+    Shared session whose transport switches to ReplayAdapter in replay mode.
+    Each call's time is added to the request's `http.<host>` timing span and to the
+    upstream call metrics.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.replay_adapter = ReplayAdapter()
+
+    def get_adapter(self, url):
+        if replay_enabled():
+            return self.replay_adapter
+        return super().get_adapter(url)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        upstream = match_route(UPSTREAM_NAMES, url) or url.hostname
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with span(f'http.{url.hostname}'):
+                response = super().send(request, **kwargs)
+            outcome = upstream_outcome(response.status_code)
+            return response
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream=upstream)
+            UPSTREAM_REQUESTS.inc(upstream=upstream, outcome=outcome)
+
+
+http = UpstreamSession()
+
+
+# --- Gemini ---
+
+class _ReplayGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = [text]
+        self.prompt_feedback = None
+
+
+class GeminiModel:
+    """
+    Lazily created genai.GenerativeModel, or replayed responses from gemini.json in
+    replay mode: the first fixture key (other than 'default') found in the prompt's
+    symptom list, or else the whole prompt, picks the response.
+    Falsy when neither replay mode nor GOOGLE_API_KEY is available.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+
+    def __bool__(self):
+        return replay_enabled() or bool(getattr(settings, 'GOOGLE_API_KEY', None))
+
+    def generate_content(self, prompt, **kwargs):
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with span('ai'):
+                if replay_enabled():
+                    response = self._replay(prompt)
+                else:
+                    if self._model is None:
+                        self._model = genai.GenerativeModel(self.model_name)
+                    response = self._model.generate_content(prompt, **kwargs)
+            outcome = 'ok'
+            return response
+        except google_exceptions.TooManyRequests:  # ResourceExhausted (quota) is a 429
+            outcome = 'rate_limited'
+            raise
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream='gemini')
+            UPSTREAM_REQUESTS.inc(upstream='gemini', outcome=outcome)
+
+    def _replay(self, prompt):
+        fault = inject_fault('gemini')
+        if fault == 'rate_limited':
+            raise google_exceptions.ResourceExhausted('Resource has been exhausted (e.g. check quota).')
+        if fault == 'error':
+            raise google_exceptions.ServiceUnavailable('The service is currently unavailable.')
+        responses = load_fixture('gemini.json')
+        # The symptom prompt's own example mentions a rash, so match on the symptom list only
+        subject = prompt.split('Symptoms List:', 1)[-1].split('Instructions:', 1)[0].lower()
+        text = next(
+            (text for key, text in responses.items() if key != 'default' and key in subject),
+            responses['default'],
+        )
+        return _ReplayGeminiResponse(text)
@@ -2,9 +2,14 @@
 from django.contrib import admin
 from django.urls import path, include # Ensure include is imported
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
     # Include Users URLs
     path('api/users/', include('users.urls', namespace='users_api')),
 
@@ -17,6 +22,6 @@ urlpatterns = [
     # Include Appointments URLs
     path('api/', include('appointments.urls', namespace='appointments_api')),
 
-    # Include Feedback URLs (Make sure feedback/urls.py exists if uncommented)
-    # path('api/', include('feedback.urls', namespace='feedback_api')),
+    # Include Feedback URLs
+    path('api/', include('feedback.urls', namespace='feedback_api')),
 ]
\ No newline at end of file
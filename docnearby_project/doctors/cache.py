@@ -0,0 +1,113 @@
+# doctors/cache.py
+"""
+Cache-aside storage for serialized doctor profiles (DoctorDetailSerializer output).
+Entries are (updated_at, data) pairs keyed by doctor id in the default cache and
+are dropped by the post_save/post_delete receivers in doctors/signals.py.
+Google Places results are cached here too, so nearby searches in the same area
+share one set of upstream calls.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from docnearby_project.metrics import CACHE_REQUESTS
+from docnearby_project.replica import read_from_primary
+from .models import Doctor
+from .serializers import DoctorDetailSerializer
+
+PROFILE_CACHE_TIMEOUT = getattr(settings, 'DOCTOR_PROFILE_CACHE_TIMEOUT', 300)
+PLACES_CACHE_TIMEOUT = getattr(settings, 'PLACES_CACHE_TIMEOUT', 900)
+# How long a miss holds the load lock, and how long other misses wait on it
+PROFILE_LOCK_TIMEOUT = 10
+PROFILE_LOCK_WAIT = 2.0
+PROFILE_LOCK_POLL = 0.05
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'loads': 0, 'lock_waits': 0}
+
+
+def profile_cache_key(pk):
+    return f'doctor-profile:{pk}'
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_cached_profile(pk):
+    """ Returns the cached (updated_at, data) entry for a doctor, or None on a miss. """
+    entry = cache.get(profile_cache_key(pk))
+    _count('hits' if entry is not None else 'misses')
+    CACHE_REQUESTS.inc(cache='doctor_profile', result='hit' if entry is not None else 'miss')
+    return entry
+
+
+def load_profile(pk):
+    """
+    Loads, serializes and caches a doctor's profile, returning the (updated_at, data) entry.
+    Concurrent misses for the same doctor are collapsed: the first caller takes a
+    short-lived lock in the cache and the others poll for its result instead of
+    all hitting the database. Raises Doctor.DoesNotExist for unknown ids.
+    """
+    key = profile_cache_key(pk)
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, PROFILE_LOCK_TIMEOUT):
+        _count('lock_waits')
+        deadline = time.monotonic() + PROFILE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(PROFILE_LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        # The loader is slow or died; serve from the database without caching
+        doctor = Doctor.objects.get(pk=pk)
+        return (doctor.updated_at, dict(DoctorDetailSerializer(doctor).data))
+
+    try:
+        # Another loader may have filled the entry just before we took the lock
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        # Read what gets cached from the primary, so a lagging replica can't be cached
+        with read_from_primary():
+            doctor = Doctor.objects.get(pk=pk)
+            entry = (doctor.updated_at, dict(DoctorDetailSerializer(doctor).data))
+        cache.set(key, entry, PROFILE_CACHE_TIMEOUT)
+        _count('loads')
+        return entry
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_profile(pk):
+    cache.delete(profile_cache_key(pk))
+
+
+def profile_cache_stats():
+    """ Hit/miss counters for this worker process since start-up. """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+# --- Google Places results ---
+
+def places_cache_key(latitude, longitude, keyword):
+    # Two decimals is about 1 km, against the search's 10 km radius
+    return f"places:{latitude:.2f}:{longitude:.2f}:{' '.join(keyword.lower().split())}"
+
+
+def get_cached_places(latitude, longitude, keyword):
+    """ Cached Places results for the area as response dicts (distances still to be set), or None. """
+    places = cache.get(places_cache_key(latitude, longitude, keyword))
+    CACHE_REQUESTS.inc(cache='places', result='hit' if places is not None else 'miss')
+    return places
+
+
+def cache_places(latitude, longitude, keyword, places):
+    cache.set(places_cache_key(latitude, longitude, keyword), places, PLACES_CACHE_TIMEOUT)
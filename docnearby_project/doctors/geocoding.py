@@ -0,0 +1,186 @@
+# doctors/geocoding.py
+"""
+Offline geocoding of Doctor and ProviderProfile addresses that have no coordinates
+(run by `manage.py geocode_addresses`, e.g. from cron). Addresses are normalized and
+looked up in the GeocodedAddress table first, so each distinct address is only ever sent
+to the geocoder once. Results, including "not found", are stored there.
+
+The geocoder is pluggable through settings.GEOCODER_CLASS: any class with a `name`
+attribute and a geocode(address) -> (latitude, longitude) | None method.
+"""
+import json
+import logging
+import re
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from docnearby_project.upstreams import http as upstream_http, replay_enabled
+from users.models import ProviderProfile
+from .cache import invalidate_profile
+from .models import Doctor, GeocodedAddress
+from .projection import sync_doctors, sync_providers
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodingError(Exception):
+    """ Transient geocoder failure (network, quota...); the address is retried on the next run. """
+
+
+def normalize_address(text):
+    """ Lower-cases and strips punctuation/extra spaces: "12, M.G. Road,  Pune" -> "12 m g road pune". """
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+
+
+class GoogleGeocoder:
+    """ Google Maps Geocoding API, using GOOGLE_MAPS_API_KEY. """
+    name = 'google'
+    URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+    def __init__(self, api_key=None, timeout=10):
+        self.api_key = api_key or settings.GOOGLE_MAPS_API_KEY
+        self.timeout = timeout
+
+    def geocode(self, address):
+        if not self.api_key and not replay_enabled():
+            raise GeocodingError("GOOGLE_MAPS_API_KEY is not set")
+        try:
+            response = upstream_http.get(self.URL, params={'address': address, 'key': self.api_key}, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GeocodingError(str(e))
+
+        if data.get('status') == 'ZERO_RESULTS':
+            return None
+        if data.get('status') != 'OK':
+            raise GeocodingError(f"Geocoding API error: {data.get('status')}")
+        location = data['results'][0]['geometry']['location']
+        return location['lat'], location['lng']
+
+
+class LocalGeocoder:
+    """
+    Offline stand-in for development and tests: resolves addresses from a fixed
+    {address: (latitude, longitude)} mapping, or from the JSON file named by
+    settings.GEOCODER_LOCAL_FILE. Unknown addresses are "not found".
+    """
+    name = 'local'
+
+    def __init__(self, known=None):
+        if known is None:
+            path = getattr(settings, 'GEOCODER_LOCAL_FILE', None)
+            known = {}
+            if path:
+                with open(path, encoding='utf-8') as f:
+                    known = json.load(f)
+        self.known = {normalize_address(address): tuple(coords) for address, coords in known.items()}
+        self.calls = 0
+
+    def geocode(self, address):
+        self.calls += 1
+        return self.known.get(normalize_address(address))
+
+
+def get_geocoder(path=None):
+    return import_string(path or settings.GEOCODER_CLASS)()
+
+
+def _missing_coordinates(queryset):
+    return queryset.filter(latitude__isnull=True).exclude(address__isnull=True).exclude(address='')
+
+
+def _resolve(addresses, geocoder, stats, retry_not_found=False):
+    """
+    Takes {normalized address: address as written} and returns {normalized address: (lat, lng)
+    or None}, geocoding only addresses not cached yet. The geocoder gets the address as written;
+    the normalized form is only the cache key.
+    """
+    cached = {
+        entry.normalized_address: entry
+        for entry in GeocodedAddress.objects.filter(normalized_address__in=list(addresses))
+    }
+    resolved = {}
+    for address, text in addresses.items():
+        entry = cached.get(address)
+        if entry is not None and (entry.latitude is not None or not retry_not_found):
+            stats['cache_hits'] += 1
+            resolved[address] = (entry.latitude, entry.longitude) if entry.latitude is not None else None
+            continue
+        try:
+            coords = geocoder.geocode(text)
+        except GeocodingError as e:
+            logger.warning("Geocoding failed for '%s': %s", address, e)
+            stats['errors'] += 1
+            continue
+        stats['geocoded'] += 1
+        resolved[address] = coords
+        GeocodedAddress.objects.update_or_create(
+            normalized_address=address,
+            defaults={'latitude': coords[0] if coords else None, 'longitude': coords[1] if coords else None,
+                      'geocoder': geocoder.name},
+        )
+    return resolved
+
+
+def _geocode_model(model, geocoder, stats, batch_size, limit, retry_not_found, after_update):
+    last_pk = 0
+    while limit is None or stats['rows_seen'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats['rows_seen'])
+        rows = list(
+            _missing_coordinates(model.objects.filter(pk__gt=last_pk)).order_by('pk').values_list('pk', 'address')[:size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        stats['rows_seen'] += len(rows)
+
+        by_address, texts = {}, {}
+        for pk, address in rows:
+            normalized = normalize_address(address)
+            if normalized:
+                by_address.setdefault(normalized, []).append(pk)
+                texts.setdefault(normalized, ' '.join(address.split()))
+        resolved = _resolve(texts, geocoder, stats, retry_not_found)
+
+        with transaction.atomic():
+            updated_ids = []
+            for address, coords in resolved.items():
+                if coords is None:
+                    stats['not_found'] += len(by_address[address])
+                    continue
+                fields = {'latitude': coords[0], 'longitude': coords[1]}
+                if model is Doctor:
+                    fields['updated_at'] = timezone.now()
+                # One UPDATE per distinct address; isnull guard keeps coordinates set meanwhile
+                model.objects.filter(pk__in=by_address[address], latitude__isnull=True).update(**fields)
+                updated_ids.extend(by_address[address])
+            if updated_ids:
+                stats['rows_updated'] += len(updated_ids)
+                after_update(updated_ids)
+
+
+def _after_doctor_update(ids):
+    # update() skips post_save, so refresh the search projection and cached profiles here
+    sync_doctors(ids)
+    transaction.on_commit(lambda: [invalidate_profile(pk) for pk in ids])
+
+
+def geocode_missing(geocoder=None, batch_size=200, limit=None, retry_not_found=False):
+    """
+    Fills latitude/longitude on Doctor and ProviderProfile rows that have an address but no
+    coordinates. `limit` caps the rows examined per model. Returns counts:
+    rows_seen, rows_updated, geocoded, cache_hits, not_found, errors.
+    """
+    geocoder = geocoder or get_geocoder()
+    stats = {'rows_seen': 0, 'rows_updated': 0, 'geocoded': 0, 'cache_hits': 0, 'not_found': 0, 'errors': 0}
+    for model, after_update in ((Doctor, _after_doctor_update), (ProviderProfile, sync_providers)):
+        model_stats = dict.fromkeys(stats, 0)
+        _geocode_model(model, geocoder, model_stats, batch_size, limit, retry_not_found, after_update)
+        for key, value in model_stats.items():
+            stats[key] += value
+    return stats
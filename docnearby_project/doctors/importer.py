@@ -0,0 +1,186 @@
+# doctors/importer.py
+"""
+Streaming bulk import of Doctor rows from CSV or JSONL files (see `manage.py import_doctors`).
+Rows are read one at a time, validated with DoctorSerializer, and written in batches of
+bulk_create/bulk_update, one transaction per batch, so memory stays flat however big the file is.
+
+Bulk writes skip the Doctor signal receivers, so each batch redoes their work itself:
+canonical specialty, opening intervals, FTS index, search projection and profile cache.
+"""
+import csv
+import json
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_profile
+from .models import Doctor, DoctorOpeningInterval
+from .projection import sync_doctors
+from .schedule import operating_hours_to_intervals
+from .search import index_doctor
+from .serializers import DoctorSerializer
+from .specialties import resolve_specialty
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Fields that identify an existing doctor for upserts
+MATCH_FIELDS = ('email', 'license_number')
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if extension in ('jsonl', 'ndjson') else 'csv'
+
+
+def read_rows(path, file_format):
+    """
+    Yields (row, error) per record: row is a dict of the non-empty fields, or None with an
+    error message for lines that can't be decoded. Only the current line is held in memory.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if file_format == 'csv':
+            for record in csv.DictReader(f):
+                # Blank CSV cells mean "not provided", like a key missing from a JSON object
+                yield {key.strip(): value.strip() for key, value in record.items()
+                       if key and isinstance(value, str) and value.strip()}, None
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield None, f'Invalid JSON: {e}'
+                    continue
+                if isinstance(row, dict):
+                    yield row, None
+                else:
+                    yield None, 'Expected a JSON object'
+
+
+# --- Checkpoints ---
+# {"source": <absolute path>, "rows": <records consumed>, "stats": {...}} written after every
+# committed batch, so a re-run skips exactly the rows that are already in the database.
+
+def load_checkpoint(path, source):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != os.path.abspath(source):
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint.get('source')}, not {source}")
+    return checkpoint
+
+
+def save_checkpoint(path, source, rows, stats):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(source), 'rows': rows, 'stats': stats}, f)
+    os.replace(temp_path, path)  # Atomic, so a crash mid-write never leaves a torn checkpoint
+
+
+# --- Import ---
+
+def _rating_sum(data):
+    """ Seeds a new doctor's rating_sum from the imported rating and reviews. """
+    return round((data.get('rating') or 0) * (data.get('reviews') or 0))
+
+
+def _write_batch(batch, match_on):
+    """ Upserts a batch of validated rows in one transaction; returns (created, updated). """
+    with transaction.atomic():
+        # Later rows win when the same key appears twice in a batch
+        keyed, unkeyed = {}, []
+        for data in batch:
+            if data.get(match_on):
+                keyed[data[match_on]] = data
+            else:
+                unkeyed.append(data)
+        existing = {
+            getattr(doctor, match_on): doctor
+            for doctor in Doctor.objects.filter(**{f'{match_on}__in': list(keyed)})
+        }
+
+        now = timezone.now()
+        to_create, to_update, update_fields = [], [], {'canonical_specialty', 'updated_at'}
+        for key, data in list(keyed.items()):
+            doctor = existing.get(key)
+            if doctor is None:
+                unkeyed.append(data)
+                continue
+            # The review aggregates of existing doctors belong to feedback/aggregates.py
+            data = {field: value for field, value in data.items() if field not in Doctor.AGGREGATE_FIELDS}
+            for field, value in data.items():
+                setattr(doctor, field, value)
+            update_fields.update(data)
+            doctor.canonical_specialty_id = resolve_specialty(doctor.specialty)
+            doctor.updated_at = now
+            to_update.append(doctor)
+        for data in unkeyed:
+            to_create.append(Doctor(
+                **data, rating_sum=_rating_sum(data), canonical_specialty_id=resolve_specialty(data.get('specialty')),
+            ))
+
+        Doctor.objects.bulk_create(to_create)
+        if to_update:
+            Doctor.objects.bulk_update(to_update, sorted(update_fields))
+
+        doctors = to_create + to_update
+        ids = [doctor.pk for doctor in doctors]
+        DoctorOpeningInterval.objects.filter(doctor_id__in=ids).delete()
+        DoctorOpeningInterval.objects.bulk_create([
+            DoctorOpeningInterval(doctor=doctor, start_minute=start, end_minute=end)
+            for doctor in doctors
+            for start, end in operating_hours_to_intervals(doctor.operating_hours)
+        ])
+        for doctor in doctors:
+            index_doctor(doctor)
+        sync_doctors(ids)
+
+        updated_ids = [doctor.pk for doctor in to_update]
+        transaction.on_commit(lambda: [invalidate_profile(pk) for pk in updated_ids])
+    return len(to_create), len(to_update)
+
+
+def import_doctors(rows, batch_size=500, match_on='email', skip=0, on_batch=None, on_error=None):
+    """
+    Validates and upserts doctors from an iterable of (row, error) pairs (see read_rows).
+    The first `skip` records are passed over, for resuming from a checkpoint.
+    on_batch(rows_consumed, stats) runs after each committed batch, and
+    on_error(record_number, errors) for each row that fails validation.
+    Returns stats: {'created', 'updated', 'invalid'}.
+    """
+    stats = {'created': 0, 'updated': 0, 'invalid': 0}
+    batch = []
+    consumed = 0
+
+    def flush():
+        created, updated = _write_batch(batch, match_on)
+        stats['created'] += created
+        stats['updated'] += updated
+        batch.clear()
+        if on_batch:
+            on_batch(consumed, dict(stats))
+
+    for row, error in rows:
+        consumed += 1
+        if consumed <= skip:
+            continue
+        if error is None:
+            serializer = DoctorSerializer(data=row)
+            if serializer.is_valid():
+                batch.append(serializer.validated_data)
+            else:
+                error = serializer.errors
+        if error is not None:
+            stats['invalid'] += 1
+            if on_error:
+                on_error(consumed, error)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    elif on_batch and consumed > skip:
+        on_batch(consumed, dict(stats))  # Trailing invalid rows still move the checkpoint
+    return stats
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from doctors.geocoding import geocode_missing, get_geocoder
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills missing latitude/longitude on doctors and providers from their addresses, "
+        "using the GeocodedAddress cache so no address is geocoded twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--limit', type=int, help="Maximum rows to examine per model")
+        parser.add_argument('--geocoder', help="Dotted path of a geocoder class (default: settings.GEOCODER_CLASS)")
+        parser.add_argument('--retry-not-found', action='store_true',
+                            help="Geocode again addresses previously cached as not found")
+
+    def handle(self, *args, **options):
+        stats = geocode_missing(
+            geocoder=get_geocoder(options['geocoder']), batch_size=options['batch_size'],
+            limit=options['limit'], retry_not_found=options['retry_not_found'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {stats['rows_updated']} of {stats['rows_seen']} rows: {stats['geocoded']} addresses geocoded, "
+            f"{stats['cache_hits']} cache hits, {stats['not_found']} rows not found, {stats['errors']} errors."
+        ))
@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doctors.importer import (
+    IMPORT_FORMATS, MATCH_FIELDS, detect_format, import_doctors, load_checkpoint, read_rows, save_checkpoint,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams doctors from a CSV or JSONL file into the database in batches, upserting on --match-on. "
+        "Progress is checkpointed after every batch; re-running the same command resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or JSONL file of DoctorSerializer fields")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--match-on', choices=MATCH_FIELDS, default='email',
+                            help="Field identifying an existing doctor to update instead of creating a new one")
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.checkpoint)")
+        parser.add_argument('--restart', action='store_true', help="Ignore any existing checkpoint")
+        parser.add_argument('--max-errors', type=int, default=20, help="How many invalid rows to print")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        checkpoint = None
+        if not options['restart']:
+            try:
+                checkpoint = load_checkpoint(checkpoint_path, path)
+            except ValueError as e:
+                raise CommandError(str(e))
+        skip = checkpoint['rows'] if checkpoint else 0
+        previous = checkpoint['stats'] if checkpoint else {'created': 0, 'updated': 0, 'invalid': 0}
+        if skip:
+            self.stdout.write(f"Resuming from checkpoint: skipping {skip} rows already processed.")
+
+        started = time.monotonic()
+        errors_shown = 0
+
+        def totals(stats):
+            return {key: previous[key] + stats[key] for key in previous}
+
+        def on_batch(rows, stats):
+            save_checkpoint(checkpoint_path, path, rows, totals(stats))
+            elapsed = time.monotonic() - started
+            rate = (rows - skip) / elapsed if elapsed else 0
+            done = totals(stats)
+            self.stdout.write(
+                f"{rows} rows: {done['created']} created, {done['updated']} updated, "
+                f"{done['invalid']} invalid ({rate:.0f} rows/s)"
+            )
+
+        def on_error(row_number, errors):
+            nonlocal errors_shown
+            if errors_shown < options['max_errors']:
+                self.stderr.write(f"Row {row_number}: {errors}")
+            errors_shown += 1
+
+        rows = read_rows(path, options['format'] or detect_format(path))
+        stats = totals(import_doctors(
+            rows, batch_size=options['batch_size'], match_on=options['match_on'],
+            skip=skip, on_batch=on_batch, on_error=on_error,
+        ))
+
+        # Finished cleanly, so the next run of this file starts from the top
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Import complete: {stats['created']} created, {stats['updated']} updated, "
+            f"{stats['invalid']} invalid in {time.monotonic() - started:.1f}s."
+        ))
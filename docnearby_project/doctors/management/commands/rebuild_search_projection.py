@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from doctors.projection import rebuild_search_projection
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the ProviderSearchEntry read-model from Doctor and ProviderProfile rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_search_projection(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search projection with {count} entries."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_opening_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Specialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name_plural': 'specialties',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='canonical_specialty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doctors', to='doctors.specialty', to_field='code'),
+        ),
+        migrations.CreateModel(
+            name='SpecialtyAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('specialty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='doctors.specialty', to_field='code')),
+            ],
+            options={
+                'verbose_name_plural': 'specialty aliases',
+                'ordering': ['alias'],
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.db import migrations
+
+from doctors.specialties import build_alias_map, normalize_specialty, resolve_term
+
+# code: (display name, [aliases])
+SPECIALTIES = {
+    'general_physician': ('General Physician', [
+        'general practitioner', 'gp', 'family doctor', 'family physician', 'family medicine',
+        'primary care doctor', 'primary care physician', 'primary care', 'internal medicine', 'general medicine',
+    ]),
+    'dermatology': ('Dermatologist', [
+        'dermatologist', 'dermatology', 'skin doctor', 'skin specialist', 'skin care',
+    ]),
+    'cardiology': ('Cardiologist', [
+        'cardiologist', 'heart doctor', 'heart specialist',
+    ]),
+    'pediatrics': ('Pediatrician', [
+        'pediatrician', 'paediatrician', 'paediatrics', 'child specialist', 'child doctor', 'childrens doctor',
+    ]),
+    'gynecology': ('Gynecologist', [
+        'gynecologist', 'gynaecologist', 'gynaecology', 'obstetrician', 'obstetrics', 'ob gyn', 'obgyn',
+        'womens health', 'women doctor',
+    ]),
+    'orthopedics': ('Orthopedic Surgeon', [
+        'orthopedic', 'orthopaedic', 'orthopedist', 'orthopaedics', 'orthopaedic surgeon', 'bone doctor',
+        'bone specialist', 'joint specialist',
+    ]),
+    'ent': ('ENT Specialist', [
+        'ent specialist', 'ear nose throat', 'ear nose and throat', 'otolaryngologist', 'otorhinolaryngologist',
+    ]),
+    'ophthalmology': ('Ophthalmologist', [
+        'ophthalmologist', 'eye doctor', 'eye specialist', 'optometrist',
+    ]),
+    'dentistry': ('Dentist', [
+        'dentist', 'dental', 'dental surgeon', 'tooth doctor',
+    ]),
+    'orthodontics': ('Orthodontist', ['orthodontist', 'orthodontics']),
+    'psychiatry': ('Psychiatrist', [
+        'psychiatrist', 'mental health', 'mental health specialist',
+    ]),
+    'psychology': ('Psychologist', ['psychologist', 'clinical psychologist', 'counselling psychologist']),
+    'neurology': ('Neurologist', [
+        'neurologist', 'nerve specialist', 'brain doctor',
+    ]),
+    'gastroenterology': ('Gastroenterologist', [
+        'gastroenterologist', 'stomach doctor', 'stomach specialist', 'digestive specialist',
+    ]),
+    'pulmonology': ('Pulmonologist', [
+        'pulmonologist', 'chest specialist', 'lung doctor', 'lung specialist', 'chest physician',
+    ]),
+    'endocrinology': ('Endocrinologist', [
+        'endocrinologist', 'diabetologist', 'diabetes specialist', 'thyroid specialist', 'hormone specialist',
+    ]),
+    'urology': ('Urologist', ['urologist']),
+    'nephrology': ('Nephrologist', ['nephrologist', 'kidney specialist', 'kidney doctor']),
+    'oncology': ('Oncologist', ['oncologist', 'cancer specialist', 'cancer doctor']),
+    'allergy_immunology': ('Allergist', [
+        'allergist', 'allergy specialist', 'allergy', 'immunologist',
+    ]),
+    'rheumatology': ('Rheumatologist', ['rheumatologist', 'arthritis specialist']),
+    'general_surgery': ('General Surgeon', ['general surgeon', 'surgeon', 'surgery']),
+    'emergency_medicine': ('Emergency Medicine', [
+        'emergency', 'emergency doctor', 'emergency room', 'er', 'urgent care', 'casualty',
+    ]),
+}
+
+
+def seed_specialties(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Specialty = apps.get_model('doctors', 'Specialty')
+    SpecialtyAlias = apps.get_model('doctors', 'SpecialtyAlias')
+    Doctor = apps.get_model('doctors', 'Doctor')
+
+    for code, (name, aliases) in SPECIALTIES.items():
+        Specialty.objects.using(db).update_or_create(code=code, defaults={'name': name})
+        for alias in aliases:
+            SpecialtyAlias.objects.using(db).update_or_create(alias=normalize_specialty(alias), defaults={'specialty_id': code})
+    alias_map = build_alias_map(
+        ((code, name) for code, (name, _) in SPECIALTIES.items()),
+        ((alias, code) for code, (_, aliases) in SPECIALTIES.items() for alias in aliases),
+    )
+
+    # Backfill existing doctors from their free-text specialty
+    for doctor in Doctor.objects.using(db).only('pk', 'specialty').iterator():
+        code = resolve_term(doctor.specialty, alias_map)
+        if code:
+            Doctor.objects.using(db).filter(pk=doctor.pk).update(canonical_specialty_id=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_specialty_taxonomy'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_specialties, migrations.RunPython.noop),
+    ]
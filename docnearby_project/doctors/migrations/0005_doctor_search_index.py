@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """ Creates the FTS5 doctor search table and indexes existing doctors (SQLite only). """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS doctors_doctor_fts USING fts5("
+        "name, clinic_name, qualifications, bio, specialty, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO doctors_doctor_fts(rowid, name, clinic_name, qualifications, bio, specialty) "
+        "SELECT id, COALESCE(name, ''), COALESCE(clinic_name, ''), COALESCE(qualifications, ''), "
+        "COALESCE(bio, ''), COALESCE(specialty, '') FROM doctors_doctor"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS doctors_doctor_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0004_seed_specialties'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
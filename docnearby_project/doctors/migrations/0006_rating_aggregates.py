@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-19 16:06
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+
+def backfill_rating_sum(apps, schema_editor):
+    """ Seeds rating_sum from the legacy static rating/reviews so averages carry over.
+    The star histogram only counts reviews submitted from now on. """
+    db = schema_editor.connection.alias
+    Doctor = apps.get_model('doctors', 'Doctor')
+    Doctor.objects.using(db).filter(reviews__gt=0).update(rating_sum=Round(F('rating') * F('reviews')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0005_doctor_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doctor',
+            name='rating',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='doctor',
+            name='reviews',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stars_1',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stars_2',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stars_3',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stars_4',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stars_5',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 16:08
+
+from django.db import migrations, models
+
+from doctors.projection import rebuild_search_projection
+
+
+def build_projection(apps, schema_editor):
+    rebuild_search_projection(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0006_rating_aggregates'),
+        ('users', '0004_backfill_canonical_specialty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('doctor', 'Doctor'), ('provider', 'Provider')], max_length=10)),
+                ('source_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('specialty', models.CharField(blank=True, max_length=255)),
+                ('canonical_specialty', models.CharField(blank=True, max_length=50, null=True)),
+                ('experience', models.IntegerField(default=0)),
+                ('rating', models.FloatField(default=0.0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('address', models.TextField(blank=True)),
+                ('phone_number', models.CharField(blank=True, max_length=20, null=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('clinic_name', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['canonical_specialty', 'is_verified'], name='search_entry_specialty_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_id'), name='unique_search_entry_source')],
+            },
+        ),
+        migrations.RunPython(build_projection, migrations.RunPython.noop),
+    ]
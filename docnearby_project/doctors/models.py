@@ -1,13 +1,66 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+class Specialty(models.Model):
+    """ Canonical medical specialty, e.g. code 'dermatology' / name 'Dermatologist'. """
+    code = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'specialties'
+
+    def __str__(self):
+        return self.name
+
+class SpecialtyAlias(models.Model):
+    """ Normalized search term (see doctors/specialties.py) that maps to a Specialty, e.g. 'skin doctor'. """
+    alias = models.CharField(max_length=100, unique=True)
+    specialty = models.ForeignKey(Specialty, to_field='code', on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = 'specialty aliases'
+
+    def save(self, *args, **kwargs):
+        from .specialties import normalize_specialty
+        self.alias = normalize_specialty(self.alias)  # Stored the way lookups normalize search terms
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.specialty_id}"
+
+class GeocodedAddress(models.Model):
+    """ Geocoder result for a normalized address (see doctors/geocoding.py), so no address is geocoded twice.
+    Null coordinates record that the geocoder found nothing for the address. """
+    normalized_address = models.TextField(unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geocoder = models.CharField(max_length=50)  # Which geocoder produced the result
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.normalized_address} -> {self.latitude}, {self.longitude}"
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='doctor_profile', null=True, blank=True)
     name = models.CharField(max_length=255)
     specialty = models.CharField(max_length=255)
+    # Resolved from `specialty` on save; stores the Specialty code, indexed for equality filtering
+    canonical_specialty = models.ForeignKey(
+        Specialty, to_field='code', on_delete=models.SET_NULL, null=True, blank=True, related_name='doctors'
+    )
     experience = models.IntegerField(default=0)
-    rating = models.FloatField(default=0.0)
-    reviews = models.IntegerField(default=0)
+    # Running review aggregates, maintained by feedback/aggregates.py:
+    # rating = rating_sum / reviews, stars_N = number of N-star reviews
+    rating = models.FloatField(default=0.0, editable=False)
+    reviews = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    stars_1 = models.IntegerField(default=0, editable=False)
+    stars_2 = models.IntegerField(default=0, editable=False)
+    stars_3 = models.IntegerField(default=0, editable=False)
+    stars_4 = models.IntegerField(default=0, editable=False)
+    stars_5 = models.IntegerField(default=0, editable=False)
     address = models.TextField()
     phone_number = models.CharField(max_length=20)
     email = models.EmailField()
@@ -25,8 +78,73 @@ class Doctor(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    AGGREGATE_FIELDS = ('rating', 'reviews', 'rating_sum', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5')
+
     class Meta:
         ordering = ['-rating', '-experience']
 
+    def save(self, *args, **kwargs):
+        # A full save of an existing row leaves the review aggregates alone, so a stale
+        # instance (admin, importer, profile edits) cannot overwrite concurrent feedback updates
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} - {self.specialty}"
+
+class DoctorOpeningInterval(models.Model):
+    """ One open period of a doctor's week, in minutes since Monday 00:00 (see doctors/schedule.py).
+    Rebuilt from Doctor.operating_hours whenever the doctor is saved. """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='opening_intervals')
+    start_minute = models.PositiveIntegerField()
+    end_minute = models.PositiveIntegerField()
+
+    class Meta:
+        # Led by the owner, which the per-owner EXISTS in open_at filters correlates on
+        indexes = [models.Index(fields=['doctor', 'start_minute', 'end_minute'], name='doctor_open_interval_idx')]
+
+    def __str__(self):
+        return f"{self.doctor_id}: {self.start_minute}-{self.end_minute}"
+
+class ProviderSearchEntry(models.Model):
+    """
+    Flat, denormalized copy of what nearby/list endpoints show for a Doctor or a
+    registered ProviderProfile, so those reads are a single-table scan with no joins.
+    Maintained by doctors/projection.py (signals + `manage.py rebuild_search_projection`).
+    """
+    KIND_CHOICES = [
+        ('doctor', 'Doctor'),
+        ('provider', 'Provider'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    source_id = models.BigIntegerField()  # Doctor.id or ProviderProfile.id
+    name = models.CharField(max_length=255)
+    specialty = models.CharField(max_length=255, blank=True)
+    canonical_specialty = models.CharField(max_length=50, null=True, blank=True)  # Specialty code
+    experience = models.IntegerField(default=0)
+    rating = models.FloatField(default=0.0)
+    reviews = models.IntegerField(default=0)
+    address = models.TextField(blank=True)
+    phone_number = models.CharField(max_length=20, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_available = models.BooleanField(default=True)
+    is_verified = models.BooleanField(default=False)
+    clinic_name = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source_id'], name='unique_search_entry_source'),
+        ]
+        indexes = [
+            # Led by the code: the is_verified filter compiles to a bare column test, which can't seek an index
+            models.Index(fields=['canonical_specialty', 'is_verified'], name='search_entry_specialty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.source_id}: {self.name}"
@@ -0,0 +1,134 @@
+# doctors/projection.py
+"""
+Maintains ProviderSearchEntry, the flat search read-model fed by both doctors.Doctor and
+users.ProviderProfile (+ its UserProfile/User for name and phone number).
+Signal receivers call sync_doctor/sync_provider on every relevant write;
+rebuild_search_projection() regenerates the whole table in batches.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from users.models import ProviderProfile
+from .models import Doctor, ProviderSearchEntry
+
+# ProviderSearchEntry columns in DOCTOR_LIST_COLUMNS order (source_id stands in for id),
+# so rows can go straight through doctor_list_row_to_dict
+SEARCH_ENTRY_COLUMNS = (
+    'source_id', 'name', 'specialty', 'experience', 'rating', 'reviews', 'address',
+    'phone_number', 'latitude', 'longitude', 'is_available', 'is_verified', 'clinic_name',
+)
+
+DOCTOR_SOURCE_FIELDS = (
+    'id', 'name', 'specialty', 'canonical_specialty_id', 'experience', 'rating', 'reviews', 'address',
+    'phone_number', 'latitude', 'longitude', 'is_available', 'is_verified', 'clinic_name',
+)
+PROVIDER_SOURCE_FIELDS = (
+    'id', 'specialization', 'canonical_specialty_id', 'address', 'latitude', 'longitude', 'is_verified',
+    'clinic_name', 'profile__phone_number', 'profile__user__first_name', 'profile__user__last_name',
+    'profile__user__username',
+)
+
+
+def _doctor_entry(values):
+    return dict(
+        kind='doctor', source_id=values['id'], name=values['name'], specialty=values['specialty'] or '',
+        canonical_specialty=values['canonical_specialty_id'], experience=values['experience'],
+        rating=values['rating'], reviews=values['reviews'], address=values['address'] or '',
+        phone_number=values['phone_number'], latitude=values['latitude'], longitude=values['longitude'],
+        is_available=values['is_available'], is_verified=values['is_verified'], clinic_name=values['clinic_name'],
+    )
+
+
+def _provider_entry(values):
+    name = f"{values['profile__user__first_name']} {values['profile__user__last_name']}".strip()
+    return dict(
+        kind='provider', source_id=values['id'], name=name or values['profile__user__username'],
+        specialty=values['specialization'] or '', canonical_specialty=values['canonical_specialty_id'],
+        address=values['address'] or '', phone_number=values['profile__phone_number'],
+        latitude=values['latitude'], longitude=values['longitude'],
+        is_verified=values['is_verified'], clinic_name=values['clinic_name'],
+    )
+
+
+def _upsert(entry):
+    kind, source_id = entry.pop('kind'), entry.pop('source_id')
+    ProviderSearchEntry.objects.update_or_create(kind=kind, source_id=source_id, defaults=entry)
+
+
+def sync_doctor(doctor_id):
+    values = Doctor.objects.filter(pk=doctor_id).values(*DOCTOR_SOURCE_FIELDS).first()
+    if values is None:
+        remove_entry('doctor', doctor_id)
+    else:
+        _upsert(_doctor_entry(values))
+
+
+def sync_doctors(doctor_ids):
+    """ Batch form of sync_doctor for bulk writes that skip post_save (e.g. import_doctors). """
+    ProviderSearchEntry.objects.filter(kind='doctor', source_id__in=doctor_ids).delete()
+    ProviderSearchEntry.objects.bulk_create([
+        ProviderSearchEntry(**_doctor_entry(values))
+        for values in Doctor.objects.filter(pk__in=doctor_ids).values(*DOCTOR_SOURCE_FIELDS)
+    ])
+
+
+def sync_provider(provider_id):
+    values = ProviderProfile.objects.filter(pk=provider_id).values(*PROVIDER_SOURCE_FIELDS).first()
+    if values is None:
+        remove_entry('provider', provider_id)
+    else:
+        _upsert(_provider_entry(values))
+
+
+def sync_providers(provider_ids):
+    """ Batch form of sync_provider for bulk writes that skip post_save (e.g. geocode_addresses). """
+    ProviderSearchEntry.objects.filter(kind='provider', source_id__in=provider_ids).delete()
+    ProviderSearchEntry.objects.bulk_create([
+        ProviderSearchEntry(**_provider_entry(values))
+        for values in ProviderProfile.objects.filter(pk__in=provider_ids).values(*PROVIDER_SOURCE_FIELDS)
+    ])
+
+
+def sync_doctor_ratings(doctor_id):
+    """ Copies rating/reviews after F()-expression updates that skip post_save (feedback aggregates). """
+    doctor = Doctor.objects.filter(pk=OuterRef('source_id'))
+    ProviderSearchEntry.objects.filter(kind='doctor', source_id=doctor_id).update(
+        rating=Subquery(doctor.values('rating')[:1]),
+        reviews=Subquery(doctor.values('reviews')[:1]),
+    )
+
+
+def remove_entry(kind, source_id):
+    ProviderSearchEntry.objects.filter(kind=kind, source_id=source_id).delete()
+
+
+def rebuild_search_projection(batch_size=1000, apps=None, using='default'):
+    """
+    Regenerates every ProviderSearchEntry from its sources and returns the number of rows
+    written. Pass a migration's `apps` registry and alias to run against historical models.
+    """
+    if apps is None:
+        doctor_model, provider_model, entry_model = Doctor, ProviderProfile, ProviderSearchEntry
+    else:
+        doctor_model = apps.get_model('doctors', 'Doctor')
+        provider_model = apps.get_model('users', 'ProviderProfile')
+        entry_model = apps.get_model('doctors', 'ProviderSearchEntry')
+
+    total = 0
+    with transaction.atomic(using=using):
+        entry_model.objects.using(using).all().delete()
+        sources = [
+            (doctor_model.objects.using(using).values(*DOCTOR_SOURCE_FIELDS), _doctor_entry),
+            (provider_model.objects.using(using).values(*PROVIDER_SOURCE_FIELDS), _provider_entry),
+        ]
+        for queryset, build in sources:
+            batch = []
+            for values in queryset.order_by('id').iterator(chunk_size=batch_size):
+                batch.append(entry_model(**build(values)))
+                if len(batch) >= batch_size:
+                    entry_model.objects.using(using).bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            entry_model.objects.using(using).bulk_create(batch)
+            total += len(batch)
+    return total
@@ -0,0 +1,209 @@
+# doctors/schedule.py
+"""
+Parses free-text operating hours ("Mon-Fri 9am-5pm, Sat 10am-1pm", "24/7", ...)
+into a structured weekly schedule, and flattens that into minute-of-week
+intervals that can be stored in an indexed table and filtered in SQL.
+
+Days are numbered 0 (Monday) to 6 (Sunday); minutes run 0-1440 within a day and
+0-10080 (MINUTES_PER_WEEK) within a week. Text that can't be understood yields
+an empty schedule rather than an error; the parts that were skipped are logged.
+"""
+import logging
+import re
+import zoneinfo
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_NAMES = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1,
+    'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+DAY_GROUPS = {
+    'daily': range(7), 'everyday': range(7), 'all days': range(7), 'all week': range(7),
+    'weekdays': range(5), 'weekends': (5, 6), 'weekend': (5, 6),
+}
+
+_DAY = r'(?:' + '|'.join(sorted(DAY_NAMES, key=len, reverse=True)) + r')'
+_TIME = r'(\d{1,2})(?:[:.](\d{2}))?(?:\s*([ap])\.?\s?m\b\.?)?'
+_RANGE_SEP = r'\s*(?:-|–|—|to|till|until)\s*'
+
+ALWAYS_OPEN_RE = re.compile(r'24\s*[/x×]\s*7|24\s*hours|24\s*hrs|round the clock', re.IGNORECASE)
+TOKEN_RE = re.compile(
+    r'(?P<time>\b' + _TIME + _RANGE_SEP + _TIME + r')'
+    r'|(?P<dayrange>\b' + _DAY + r'\.?' + _RANGE_SEP + _DAY + r'\b)'
+    r'|(?P<group>\b(?:' + '|'.join(DAY_GROUPS) + r')\b)'
+    r'|(?P<day>\b' + _DAY + r'\b)'
+    r'|(?P<closed>\bclosed\b)',
+    re.IGNORECASE,
+)
+# Separators and filler words that may sit between tokens without changing their meaning
+FILLER_RE = re.compile(r'[\s,&:.()/+]+|\b(?:and|open|from|hours|hrs|timings?)\b', re.IGNORECASE)
+
+
+def _to_minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    return hour * 60 + minute
+
+
+def _parse_time_range(match):
+    """ Returns (start, end) minutes for a TOKEN_RE 'time' match; end may be <= start (overnight). """
+    h1, m1, ap1, h2, m2, ap2 = match.group(2, 3, 4, 5, 6, 7)
+    if int(h1) > 24 or int(h2) > 24 or int(m1 or 0) > 59 or int(m2 or 0) > 59:
+        return None
+    end = _to_minutes(h2, m2, ap2)
+    if ap1 is None and ap2 is not None:
+        # "9-5pm" / "1-5pm": the start shares the end's meridiem unless that puts it after the end
+        start = _to_minutes(h1, m1, ap2)
+        if start >= end:
+            start = _to_minutes(h1, m1, 'a')
+    else:
+        start = _to_minutes(h1, m1, ap1)
+        if ap1 is None and ap2 is None and end <= start and end < 12 * 60:
+            end += 12 * 60  # Bare "9-5" means 9:00-17:00
+    if end == 0:
+        end = MINUTES_PER_DAY  # "...-12am" / "...-0:00" closes at midnight
+    return start, end
+
+
+def _day_range(first, last):
+    first, last = DAY_NAMES[first.lower().rstrip('.')], DAY_NAMES[last.lower()]
+    return [(first + i) % 7 for i in range((last - first) % 7 + 1)]
+
+
+def parse_operating_hours(text):
+    """
+    Parses free-text operating hours into {day: [(start_minute, end_minute), ...]}.
+    An end minute <= start means the range runs past midnight into the next day.
+    Day specs may come before or after their time ranges ("Mon-Fri 9-5", "9-1 & 5-8 Mon-Sat");
+    segments without any day names apply to every day; "closed" segments are skipped.
+    """
+    schedule = {}
+    if not text:
+        return schedule
+    if ALWAYS_OPEN_RE.search(text):
+        return {day: [(0, MINUTES_PER_DAY)] for day in range(7)}
+
+    for segment in re.split(r'[;\n|]+', text):
+        # `trailing`: the group's days came after its time ranges ("9-5 Mon-Fri")
+        days, ranges, closed, trailing = [], [], False, False
+        unparsed, position = [], 0
+
+        def flush():
+            if ranges and not closed:
+                for day in (days or range(7)):
+                    schedule.setdefault(day, []).extend(ranges)
+
+        for token in TOKEN_RE.finditer(segment):
+            unparsed.append(segment[position:token.start()])
+            position = token.end()
+            kind = token.lastgroup
+            if kind == 'time':
+                if trailing:  # Times after "9-5 Mon-Fri" start a new group
+                    flush()
+                    days, ranges, closed, trailing = [], [], False, False
+                parsed = _parse_time_range(token)
+                if parsed:
+                    ranges.append(parsed)
+                else:
+                    unparsed.append(token.group(kind))
+                continue
+            if kind != 'closed' and ranges and not closed and (trailing or not days):
+                # Days after the group's time ranges belong to them ("9-1 & 5-8 Mon-Sat")
+                trailing = True
+            elif ranges or closed:
+                # A day spec after a complete group starts a new one ("Mon-Fri 9-5, Sat 10-1")
+                flush()
+                days, ranges, closed, trailing = [], [], False, False
+            if kind == 'closed':
+                closed = True
+            elif kind == 'dayrange':
+                first, last = re.split(_RANGE_SEP, token.group(kind), maxsplit=1, flags=re.IGNORECASE)
+                days.extend(_day_range(first, last))
+            elif kind == 'group':
+                days.extend(DAY_GROUPS[token.group(kind).lower()])
+            else:
+                days.append(DAY_NAMES[token.group(kind).lower()])
+        flush()
+
+        unparsed.append(segment[position:])
+        leftover = ' '.join(FILLER_RE.sub(' ', part).strip() for part in unparsed).strip()
+        if leftover:
+            logger.warning("Skipped unparsed operating hours %r in %r", leftover, text)
+
+    return {day: sorted(set(ranges)) for day, ranges in sorted(schedule.items())}
+
+
+def schedule_to_week_intervals(schedule):
+    """
+    Flattens a parsed schedule into sorted, merged (start, end) minute-of-week
+    intervals with 0 <= start < end <= MINUTES_PER_WEEK. Overnight ranges and
+    Sunday-into-Monday spans are split so no interval wraps.
+    """
+    intervals = []
+    for day, ranges in schedule.items():
+        for start, end in ranges:
+            if end <= start:
+                end += MINUTES_PER_DAY
+            start, end = day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end
+            if end > MINUTES_PER_WEEK:
+                intervals.append((0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            intervals.append((start, end))
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def operating_hours_to_intervals(text):
+    return schedule_to_week_intervals(parse_operating_hours(text))
+
+
+def sync_opening_intervals(interval_model, owner_field, owner):
+    """ Replaces the stored opening intervals for `owner` with those parsed from its operating_hours. """
+    interval_model.objects.filter(**{owner_field: owner}).delete()
+    interval_model.objects.bulk_create([
+        interval_model(**{owner_field: owner}, start_minute=start, end_minute=end)
+        for start, end in operating_hours_to_intervals(owner.operating_hours)
+    ])
+
+
+def open_at_filter(moment=None):
+    """
+    Filter kwargs matching opening intervals that cover `moment` (default: now), e.g.
+    Exists(DoctorOpeningInterval.objects.filter(doctor=OuterRef('pk'), **open_at_filter(moment))).
+    """
+    minute = minute_of_week(moment)
+    return {'start_minute__lte': minute, 'end_minute__gt': minute}
+
+
+def clinic_time_zone():
+    return zoneinfo.ZoneInfo(getattr(settings, 'CLINIC_TIME_ZONE', settings.TIME_ZONE))
+
+
+def minute_of_week(moment=None):
+    """
+    Minute-of-week for a datetime (default: now) in clinic-local time, the time operating
+    hours are written in. Aware datetimes are converted to settings.CLINIC_TIME_ZONE;
+    naive ones are taken to be clinic-local already.
+    """
+    if moment is None or timezone.is_aware(moment):
+        moment = timezone.localtime(moment, clinic_time_zone())
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
@@ -0,0 +1,96 @@
+# doctors/search.py
+"""
+Full-text doctor search backed by an SQLite FTS5 table (doctors_doctor_fts) that mirrors
+Doctor.name, clinic_name, qualifications, bio and specialty, keyed by rowid = Doctor.id.
+The table is created and filled by migration 0005 (rebuild_search_index() refills it) and kept in sync by doctors/signals.py.
+On other database backends search falls back to icontains matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Doctor
+
+FTS_TABLE = 'doctors_doctor_fts'
+FTS_FIELDS = ('name', 'clinic_name', 'qualifications', 'bio', 'specialty')
+# bm25() column weights, in FTS_FIELDS order: a name hit outranks a passing mention in the bio
+FTS_WEIGHTS = (10.0, 4.0, 2.0, 1.0, 6.0)
+
+REBUILD_FTS_SQL = (
+    f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_FIELDS)}) "
+    "SELECT id, " + ', '.join(f"COALESCE({field}, '')" for field in FTS_FIELDS) + " FROM doctors_doctor"
+)
+
+
+def fts_enabled(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+def rebuild_search_index():
+    """ Re-indexes every doctor, e.g. after bulk writes that bypass signals. """
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(REBUILD_FTS_SQL)
+
+
+def build_match_query(text):
+    """ Turns user input into a safe FTS5 query: every word must match, as a prefix. """
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_doctor(doctor):
+    """ Replaces a doctor's row in the FTS table. """
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [doctor.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_FIELDS)}) VALUES (%s, {', '.join(['%s'] * len(FTS_FIELDS))})",
+            [doctor.pk] + [getattr(doctor, field) or '' for field in FTS_FIELDS],
+        )
+
+
+def unindex_doctor(pk):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def search_doctor_ids(text, limit=20, bbox=None, offset=0):
+    """
+    Returns ids of verified doctors matching `text`, best match first (bm25), skipping the first `offset`.
+    `bbox` = (min_lat, max_lat, min_lng, max_lng) restricts results to a bounding box.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not fts_enabled():
+        doctors = Doctor.objects.filter(is_verified=True)
+        for term in re.findall(r'\w+', text):
+            doctors = doctors.filter(
+                Q(name__icontains=term) | Q(clinic_name__icontains=term) | Q(qualifications__icontains=term) |
+                Q(bio__icontains=term) | Q(specialty__icontains=term)
+            )
+        if bbox:
+            doctors = doctors.filter(latitude__range=bbox[:2], longitude__range=bbox[2:])
+        return list(doctors.values_list('id', flat=True)[offset:offset + limit])
+
+    sql = (
+        f"SELECT d.id FROM {FTS_TABLE} f JOIN doctors_doctor d ON d.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND d.is_verified"
+    )
+    params = [match]
+    if bbox:
+        sql += " AND d.latitude BETWEEN %s AND %s AND d.longitude BETWEEN %s AND %s"
+        params.extend(bbox)
+    sql += f" ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))}) LIMIT %s OFFSET %s"
+    params.extend([limit, offset])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -140,6 +140,10 @@ class MyDoctorProfileUpdateSerializer(serializers.ModelSerializer):
     # --- End Optional Update ---
 
 class DoctorSerializer(serializers.ModelSerializer):
+    # The review aggregates are not editable on the model, but imports may seed them for new doctors
+    rating = serializers.FloatField(required=False, min_value=1, max_value=5)
+    reviews = serializers.IntegerField(required=False, min_value=0)
+
     class Meta:
         model = Doctor
         fields = [
@@ -193,6 +197,9 @@ class DoctorListSerializer(serializers.ModelSerializer):
         ]
 
 class DoctorDetailSerializer(serializers.ModelSerializer):
+    # Precomputed star counts, e.g. {"1": 0, "2": 1, "3": 4, "4": 10, "5": 23}
+    rating_histogram = serializers.SerializerMethodField()
+
     class Meta:
         model = Doctor
         fields = [
@@ -217,9 +224,13 @@ class DoctorDetailSerializer(serializers.ModelSerializer):
             'profile_image',
             'operating_hours',
             'created_at',
-            'updated_at'
+            'updated_at',
+            'rating_histogram'
         ]
 
+    def get_rating_histogram(self, obj):
+        return {str(stars): getattr(obj, f'stars_{stars}') for stars in range(1, 6)}
+
 class MyDoctorProfileUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
@@ -240,4 +251,45 @@ class MyDoctorProfileUpdateSerializer(serializers.ModelSerializer):
             'bio',
             'profile_image',
             'operating_hours'
-        ]
\ No newline at end of file
+        ]
+
+# --- Fast path for nearby search results ---
+# Doctor columns rendered by DoctorListSerializer, in output order. The nearby view
+# fetches just these as tuples instead of materializing full Doctor instances.
+DOCTOR_LIST_COLUMNS = (
+    'id',
+    'name',
+    'specialty',
+    'experience',
+    'rating',
+    'reviews',
+    'address',
+    'phone_number',
+    'latitude',
+    'longitude',
+    'is_available',
+    'is_verified',
+    'clinic_name',
+)
+
+def doctor_list_row_to_dict(row, distance, source='platform'):
+    """ Builds the same dict DoctorListSerializer would, from a DOCTOR_LIST_COLUMNS tuple. """
+    (pk, name, specialty, experience, rating, reviews, address, phone_number,
+     latitude, longitude, is_available, is_verified, clinic_name) = row
+    return {
+        'id': pk,
+        'name': name,
+        'specialty': specialty,
+        'experience': experience,
+        'rating': rating,
+        'reviews': reviews,
+        'address': address,
+        'phone_number': phone_number,
+        'latitude': latitude,
+        'longitude': longitude,
+        'is_available': is_available,
+        'is_verified': is_verified,
+        'clinic_name': clinic_name,
+        'distance': distance,
+        'source': source,
+    }
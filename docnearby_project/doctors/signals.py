@@ -0,0 +1,64 @@
+# doctors/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_profile
+from .models import Doctor, DoctorOpeningInterval, Specialty, SpecialtyAlias
+from .projection import remove_entry, sync_doctor
+from .schedule import sync_opening_intervals
+from .search import FTS_FIELDS, index_doctor, unindex_doctor
+from .specialties import clear_alias_map, resolve_specialty
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def invalidate_doctor_profile_cache(sender, instance, **kwargs):
+    """ Drops the cached profile now, and again once the write commits, so a
+    concurrent reader cannot re-cache the pre-commit row. """
+    invalidate_profile(instance.pk)
+    transaction.on_commit(lambda: invalidate_profile(instance.pk))
+
+
+@receiver(post_save, sender=Doctor)
+def sync_doctor_opening_intervals(sender, instance, update_fields=None, **kwargs):
+    """ Re-parses operating_hours into indexed opening intervals. """
+    if update_fields is None or 'operating_hours' in update_fields:
+        sync_opening_intervals(DoctorOpeningInterval, 'doctor', instance)
+
+
+@receiver(pre_save, sender=Doctor)
+def resolve_doctor_specialty(sender, instance, **kwargs):
+    """ Keeps canonical_specialty in step with the free-text specialty. """
+    instance.canonical_specialty_id = resolve_specialty(instance.specialty)
+
+
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+@receiver(post_save, sender=SpecialtyAlias)
+@receiver(post_delete, sender=SpecialtyAlias)
+def reload_specialty_aliases(sender, **kwargs):
+    clear_alias_map()
+
+
+@receiver(post_save, sender=Doctor)
+def index_doctor_for_search(sender, instance, update_fields=None, **kwargs):
+    """ Mirrors the searchable text fields into the FTS table. """
+    if update_fields is None or set(update_fields) & set(FTS_FIELDS):
+        index_doctor(instance)
+
+
+@receiver(post_delete, sender=Doctor)
+def unindex_doctor_for_search(sender, instance, **kwargs):
+    unindex_doctor(instance.pk)
+
+
+@receiver(post_save, sender=Doctor)
+def project_doctor_for_listing(sender, instance, **kwargs):
+    """ Mirrors the row into the flat ProviderSearchEntry read-model. """
+    sync_doctor(instance.pk)
+
+
+@receiver(post_delete, sender=Doctor)
+def unproject_doctor_for_listing(sender, instance, **kwargs):
+    remove_entry('doctor', instance.pk)
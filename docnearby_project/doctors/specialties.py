@@ -0,0 +1,82 @@
+# doctors/specialties.py
+"""
+Resolves free-text specialty terms ("Skin doctor", "dermatologists", "GP", "Pediatric
+Cardiologist") to canonical Specialty codes using an in-memory alias dictionary built
+from SpecialtyAlias rows.
+The dictionary is reloaded after SPECIALTY_ALIAS_TTL seconds, or immediately in this
+process when a Specialty/SpecialtyAlias is saved or deleted (doctors/signals.py).
+"""
+import re
+import threading
+import time
+
+from django.conf import settings
+
+SPECIALTY_ALIAS_TTL = getattr(settings, 'SPECIALTY_ALIAS_TTL', 300)
+
+_lock = threading.Lock()
+_alias_map = None
+_loaded_at = 0.0
+
+
+def normalize_specialty(text):
+    """ Lower-cases and strips punctuation/extra spaces: " Ob/Gyn. " -> "ob gyn". """
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+
+
+def build_alias_map(specialties, aliases):
+    """ {normalized term: code} from (code, name) and (alias, code) pairs. Also used by migrations. """
+    alias_map = {}
+    for code, name in specialties:
+        alias_map[normalize_specialty(code)] = code
+        alias_map[normalize_specialty(name)] = code
+    # Aliases are normalized on save, but rows written some other way may not be
+    alias_map.update((normalize_specialty(alias), code) for alias, code in aliases)
+    return alias_map
+
+
+def resolve_term(text, alias_map):
+    """
+    The code for `text` in `alias_map`: the whole term, then the longest known phrase inside
+    it, so compound specialties resolve too ("Pediatric Cardiologist" -> cardiology). Among
+    phrases of the same length the rightmost wins, as it usually names the specialty.
+    """
+    words = normalize_specialty(text).split()
+    for length in range(len(words), 0, -1):
+        for start in range(len(words) - length, -1, -1):
+            term = ' '.join(words[start:start + length])
+            code = alias_map.get(term)
+            if code is None and term.endswith('s'):
+                code = alias_map.get(term[:-1])  # "dermatologists" -> "dermatologist"
+            if code is not None:
+                return code
+    return None
+
+
+def _load_alias_map():
+    from .models import Specialty, SpecialtyAlias
+    return build_alias_map(
+        Specialty.objects.values_list('code', 'name'), SpecialtyAlias.objects.values_list('alias', 'specialty_id'),
+    )
+
+
+def get_alias_map():
+    global _alias_map, _loaded_at
+    with _lock:
+        if _alias_map is None or time.monotonic() - _loaded_at > SPECIALTY_ALIAS_TTL:
+            _alias_map = _load_alias_map()
+            _loaded_at = time.monotonic()
+        return _alias_map
+
+
+def clear_alias_map():
+    global _alias_map
+    with _lock:
+        _alias_map = None
+
+
+def resolve_specialty(text):
+    """ Returns the canonical Specialty code for a free-text term, or None if it isn't known. """
+    if not normalize_specialty(text):
+        return None
+    return resolve_term(text, get_alias_map())
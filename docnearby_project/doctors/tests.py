@@ -1,3 +1,822 @@
-from django.test import TestCase
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from docnearby_project.log import BackgroundHandler, JsonFormatter, SamplingFilter
+from docnearby_project.metrics import NEARBY_RESULTS, REGISTRY
+from docnearby_project.parsers import FastJSONParser
+from docnearby_project.renderers import FastJSONRenderer
+from docnearby_project.throttling import TokenBucket
+from users.models import ProviderProfile, UserProfile
+
+from .cache import load_profile, profile_cache_stats
+from .geocoding import GeocodingError, GoogleGeocoder, LocalGeocoder, geocode_missing, normalize_address
+from .importer import save_checkpoint
+from .models import Doctor, GeocodedAddress, ProviderSearchEntry, SpecialtyAlias
+from .projection import rebuild_search_projection
+from .search import search_doctor_ids
+from .specialties import clear_alias_map, get_alias_map, resolve_specialty
+from .schedule import MINUTES_PER_WEEK, operating_hours_to_intervals, parse_operating_hours
+from .serializers import DoctorSerializer, DoctorListSerializer, DOCTOR_LIST_COLUMNS, doctor_list_row_to_dict
+
+
+def make_doctor(**overrides):
+    fields = {
+        'name': 'Dr. Asha Rao',
+        'specialty': 'Dermatologist',
+        'experience': 12,
+        'rating': 4.5,
+        'reviews': 38,
+        'address': '12 MG Road, Pune',
+        'phone_number': '+91 98220 00000',
+        'email': 'asha@example.com',
+        'latitude': 18.5204,
+        'longitude': 73.8567,
+        'consultation_fee': Decimal('500.00'),
+        'is_verified': True,
+        'clinic_name': 'Skin First Clinic',
+        'qualifications': 'MBBS, MD',
+        'bio': 'Long bio ' * 50,
+        'operating_hours': 'Mon-Fri 9am-5pm',
+    }
+    fields.update(overrides)
+    return Doctor.objects.create(**fields)
+
+
+class NearbyFastPathTests(TestCase):
+    def test_row_dict_matches_list_serializer(self):
+        doctors = [
+            make_doctor(),
+            make_doctor(name='Dr. Null Clinic', clinic_name=None, rating=0, experience=0, is_available=False),
+        ]
+        for doctor in doctors:
+            row = Doctor.objects.values_list(*DOCTOR_LIST_COLUMNS).get(pk=doctor.pk)
+            doctor.distance = 3.25
+            doctor.source = 'platform'
+            self.assertEqual(
+                doctor_list_row_to_dict(row, 3.25),
+                dict(DoctorListSerializer(doctor).data),
+            )
+
+    def test_nearby_returns_platform_results_sorted_by_distance(self):
+        far = make_doctor(name='Far', latitude=18.60, longitude=73.90)
+        near = make_doctor(name='Near', latitude=18.521, longitude=73.857)
+        make_doctor(name='Unverified', is_verified=False)
+        make_doctor(name='No Coordinates', latitude=None, longitude=None)
+
+        response = APIClient().get('/api/doctors/nearby/', {
+            'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['id'] for d in response.data['results']], [near.id, far.id])
+        self.assertEqual(response.data['verified_count'], 2)
+
+
+def make_provider(username='provider', **overrides):
+    user = User.objects.create_user(username=username, password='pass12345', first_name='Vikram', last_name='Shah')
+    profile = UserProfile.objects.create(user=user, user_type='provider', phone_number='+91 90000 11111')
+    fields = {
+        'specialization': 'Cardiologist', 'clinic_name': 'Heart Care', 'address': '4 FC Road, Pune',
+        'latitude': 18.5210, 'longitude': 73.8570, 'is_verified': True, 'operating_hours': 'Mon-Fri 9am-5pm',
+    }
+    fields.update(overrides)
+    return ProviderProfile.objects.create(profile=profile, **fields)
+
+
+class SearchProjectionTests(TestCase):
+    def entry(self, kind, source_id):
+        return ProviderSearchEntry.objects.get(kind=kind, source_id=source_id)
+
+    def test_signals_keep_projection_in_step(self):
+        doctor = make_doctor()
+        provider = make_provider()
+        self.assertEqual(self.entry('doctor', doctor.pk).canonical_specialty, 'dermatology')
+        self.assertEqual(self.entry('provider', provider.pk).name, 'Vikram Shah')
+
+        doctor.experience = 15
+        doctor.save()
+        self.assertEqual(self.entry('doctor', doctor.pk).experience, 15)
+
+        user = provider.profile.user
+        user.last_name = 'Mehta'
+        user.save()
+        provider.profile.phone_number = '+91 90000 22222'
+        provider.profile.save()
+        entry = self.entry('provider', provider.pk)
+        self.assertEqual((entry.name, entry.phone_number), ('Vikram Mehta', '+91 90000 22222'))
+
+        user.delete()
+        doctor.delete()
+        self.assertFalse(ProviderSearchEntry.objects.exists())
+
+    def test_rebuild_matches_signal_maintained_rows(self):
+        make_doctor()
+        make_provider(specialization='Skin doctor')
+        columns = [f.name for f in ProviderSearchEntry._meta.concrete_fields if f.name != 'id']
+        before = sorted(ProviderSearchEntry.objects.values_list(*columns))
+        ProviderSearchEntry.objects.all().delete()
+        self.assertEqual(rebuild_search_projection(batch_size=1), 2)
+        self.assertEqual(sorted(ProviderSearchEntry.objects.values_list(*columns)), before)
+
+    def test_nearby_lists_doctors_and_providers_without_joins(self):
+        doctor = make_doctor(specialty='Cardiologist')
+        provider = make_provider()
+        make_provider('hidden', is_verified=False)
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false', 'specialty': 'heart doctor'}
+
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/doctors/nearby/', params)
+        self.assertEqual(
+            [(d['kind'], d['id']) for d in response.data['results']],
+            [('doctor', doctor.pk), ('provider', provider.pk)],
+        )
+
+        response = APIClient().get('/api/doctors/nearby/', {**params, 'open_at': '2025-04-20T12:00'})
+        self.assertEqual(response.data['results'], [])
+
+
+class ImportDoctorsCommandTests(TestCase):
+    CSV_HEADER = 'name,specialty,address,phone_number,email,latitude,longitude,is_verified,operating_hours\n'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_doctors', path, '--batch-size', '2', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_validates_and_does_signal_work(self):
+        path = self.write('doctors.csv', self.CSV_HEADER + (
+            'Dr. Meera Iyer,Skin doctor,1 Law College Rd,+91 1,meera@example.com,18.52,73.85,true,Mon-Fri 9am-5pm\n'
+            'Dr. Bad Email,Dentist,2 FC Rd,+91 2,not-an-email,,,true,\n'
+            'Dr. Kiran Patil,Cardiologist,3 JM Rd,+91 3,kiran@example.com,,,false,\n'
+        ))
+        out, err = self.run_import(path)
+        self.assertIn('2 created, 0 updated, 1 invalid', out)
+        self.assertIn('Row 2', err)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+        meera = Doctor.objects.get(email='meera@example.com')
+        self.assertEqual(meera.canonical_specialty_id, 'dermatology')
+        self.assertTrue(meera.opening_intervals.exists())
+        self.assertEqual(ProviderSearchEntry.objects.get(kind='doctor', source_id=meera.pk).name, 'Dr. Meera Iyer')
+        self.assertEqual(search_doctor_ids('meera'), [meera.pk])
+
+    def test_jsonl_upserts_on_match_field(self):
+        doctor = make_doctor(email='asha@example.com', rating=4.0, reviews=10)
+        path = self.write('doctors.jsonl', '\n'.join(json.dumps(row) for row in [
+            {'name': 'Dr. Asha Rao-Kulkarni', 'specialty': 'Dermatologist', 'address': '12 MG Road, Pune',
+             'phone_number': '+91 98220 00000', 'email': 'asha@example.com', 'rating': 4.5, 'reviews': 20},
+            {'name': 'Dr. New', 'specialty': 'Dentist', 'address': '5 Camp', 'phone_number': '+91 5',
+             'email': 'new@example.com', 'rating': 4.5, 'reviews': 20},
+            {'name': 'Dr. Bad', 'specialty': 'Dentist', 'address': '6 Camp', 'phone_number': '+91 6',
+             'email': 'bad@example.com', 'rating': 7},
+        ]) + '\n{not json\n')
+        out, _ = self.run_import(path)
+        self.assertIn('1 created, 1 updated, 2 invalid', out)  # A rating of 7 and the broken line
+        doctor.refresh_from_db()
+        # Existing doctors keep their feedback-maintained aggregates; new ones are seeded
+        self.assertEqual((doctor.name, doctor.rating, doctor.reviews), ('Dr. Asha Rao-Kulkarni', 4.0, 10))
+        self.assertEqual(Doctor.objects.count(), 2)
+        new = Doctor.objects.get(email='new@example.com')
+        self.assertEqual((new.rating, new.reviews, new.rating_sum), (4.5, 20, 90))
+
+    def test_resumes_after_checkpoint(self):
+        rows = ''.join(
+            f'Dr. {n},Dentist,{n} Main St,+91 {n},doc{n}@example.com,,,true,\n' for n in range(5)
+        )
+        path = self.write('doctors.csv', self.CSV_HEADER + rows)
+        # As if a previous run committed the first two rows and then died
+        for n in range(2):
+            make_doctor(name=f'Dr. {n}', email=f'doc{n}@example.com')
+        save_checkpoint(f'{path}.checkpoint', path, 2, {'created': 2, 'updated': 0, 'invalid': 0})
+
+        out, _ = self.run_import(path)
+        self.assertIn('Resuming from checkpoint: skipping 2 rows', out)
+        self.assertIn('5 created, 0 updated, 0 invalid', out)
+        self.assertEqual(Doctor.objects.count(), 5)
+
+
+class GeocodingTests(TestCase):
+    def test_fills_missing_coordinates_once_per_address(self):
+        geocoder = LocalGeocoder({'12 MG Road, Pune': (18.52, 73.86)})
+        first = make_doctor(latitude=None, longitude=None, address='12 MG Road, Pune')
+        second = make_doctor(latitude=None, longitude=None, address='12, MG Road,  pune')
+        provider = make_provider(latitude=None, longitude=None, address='12 mg road pune')
+        lost = make_doctor(latitude=None, longitude=None, address='Nowhere Lane')
+
+        stats = geocode_missing(geocoder=geocoder, batch_size=1)
+        self.assertEqual(stats['rows_updated'], 3)
+        self.assertEqual(stats['not_found'], 1)
+        self.assertEqual(geocoder.calls, 2)  # '12 mg road pune' and 'nowhere lane'
+        for obj in (first, second, provider):
+            obj.refresh_from_db()
+            self.assertEqual((obj.latitude, obj.longitude), (18.52, 73.86))
+        self.assertEqual(ProviderSearchEntry.objects.get(kind='doctor', source_id=first.pk).latitude, 18.52)
+        self.assertTrue(GeocodedAddress.objects.filter(normalized_address='nowhere lane', latitude__isnull=True).exists())
+
+        # Nothing is sent to the geocoder again, including the known miss
+        geocode_missing(geocoder=geocoder)
+        self.assertEqual(geocoder.calls, 2)
+        lost.refresh_from_db()
+        self.assertIsNone(lost.latitude)
+
+    def test_geocoder_gets_address_as_written(self):
+        queries = []
+
+        class RecordingGeocoder(LocalGeocoder):
+            def geocode(self, address):
+                queries.append(address)
+                return super().geocode(address)
+
+        make_doctor(latitude=None, longitude=None, address='12, M.G. Road,\n Pune')
+        geocode_missing(geocoder=RecordingGeocoder({'12 M.G. Road, Pune': (18.52, 73.86)}))
+        self.assertEqual(queries, ['12, M.G. Road, Pune'])
+        self.assertEqual(GeocodedAddress.objects.get(normalized_address='12 m g road pune').latitude, 18.52)
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address(' 12, M.G. Road,\nPune '), '12 m g road pune')
+
+
+def replay_settings(**overrides):
+    return override_settings(UPSTREAM_MODE='replay', UPSTREAM_REPLAY={
+        **settings.UPSTREAM_REPLAY, 'latency_scale': 0, 'error_rate': 0, 'rate_limit_rate': 0, **overrides,
+    })
+
+
+class UpstreamReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.params = {'latitude': 18.5204, 'longitude': 73.8567}
+
+    @replay_settings()
+    def test_nearby_includes_replayed_google_places(self):
+        make_doctor()
+        results = self.client.get('/api/doctors/nearby/', self.params).json()['results']
+        self.assertEqual(results[0]['source'], 'platform')
+        web = [r for r in results if r['source'] == 'google_places']
+        self.assertEqual(len(web), 5)
+        self.assertEqual(web[0]['phone'], '020 2553 1000')  # From the details replay
+
+    @replay_settings(rate_limit_rate=1.0)
+    def test_rate_limited_places_still_returns_platform_results(self):
+        make_doctor()
+        results = self.client.get('/api/doctors/nearby/', self.params).json()['results']
+        self.assertEqual([r['source'] for r in results], ['platform'])
+
+    @replay_settings()
+    def test_google_geocoder(self):
+        self.assertEqual(GoogleGeocoder(api_key='replay').geocode('MG Road, Pune'), (18.5158, 73.879))
+
+    @replay_settings(upstreams={'geocoding': {'error_rate': 1.0}})
+    def test_google_geocoder_error(self):
+        with self.assertRaises(GeocodingError):
+            GoogleGeocoder(api_key='replay').geocode('MG Road, Pune')
+
+
+def places_budget(client_burst=100, global_burst=1000):
+    return override_settings(UPSTREAM_BUDGETS={'places': {
+        'client': {'rate': '1/hour', 'burst': client_burst}, 'global': {'rate': '1/hour', 'burst': global_burst},
+    }})
+
+
+class UpstreamBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_doctor()
+        self.client = APIClient()
+
+    def nearby(self, latitude=18.5204, client=None):
+        response = (client or self.client).get('/api/doctors/nearby/', {'latitude': latitude, 'longitude': 73.8567})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_token_bucket(self):
+        bucket = TokenBucket('test-bucket', rate='100/s', burst=2)
+        self.assertEqual((bucket.take(), bucket.take()), (0, 0))
+        self.assertAlmostEqual(bucket.take(), 0.01, delta=0.005)
+        self.assertEqual(bucket.take(3), float('inf'))  # More than the bucket holds
+        time.sleep(0.02)
+        self.assertEqual(bucket.take(), 0)
+
+    @replay_settings()
+    @places_budget(client_burst=6)
+    def test_exhausted_client_gets_cached_then_platform_results(self):
+        first = self.nearby()
+        self.assertEqual((first['web_results'], first['google_count']), ('live', 5))  # Search + 5 details = 6 tokens
+
+        cached = self.nearby(latitude=18.5205)  # Same ~1 km area
+        self.assertEqual((cached['web_results'], cached['google_count']), ('cached', 5))
+
+        elsewhere = self.nearby(latitude=18.9)
+        self.assertEqual((elsewhere['web_results'], elsewhere['google_count'], elsewhere['count']), ('throttled', 0, 1))
+
+        # Other clients have their own bucket
+        self.client.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(self.nearby(latitude=18.9)['web_results'], 'live')
+
+    @replay_settings()
+    @places_budget(client_burst=3)
+    def test_skips_details_calls_beyond_the_budget(self):
+        response = self.nearby()
+        self.assertEqual((response['web_results'], response['google_count']), ('partial', 5))
+        self.assertEqual({r['phone'] for r in response['results'] if r['source'] == 'google_places'}, {''})
+        self.assertEqual(self.nearby()['web_results'], 'partial')  # Searched again: partial results aren't cached
+
+    @replay_settings()
+    @places_budget(global_burst=6)
+    def test_global_budget(self):
+        before = scrape()
+        self.assertEqual(self.nearby()['web_results'], 'live')
+        self.client.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(self.nearby(latitude=18.9)['web_results'], 'throttled')
+        sample = 'docnearby_upstream_budget_total{upstream="places",result="global_exhausted"}'
+        self.assertEqual(scrape().get(sample, 0) - before.get(sample, 0), 1)
+
+
+@override_settings(SERVER_TIMING_HEADER=True, REQUEST_TIMING_SAMPLE_RATE=0)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def server_timing(self, response):
+        return {part.split(';')[0]: part for part in response['Server-Timing'].split(', ')}
+
+    @replay_settings()
+    def test_nearby_breakdown(self):
+        make_doctor()
+        timing = self.server_timing(APIClient().get('/api/doctors/nearby/', {'latitude': 18.5204, 'longitude': 73.8567}))
+        self.assertEqual(set(timing), {'db', 'http.maps.googleapis.com', 'render', 'total'})
+        self.assertIn('desc="6 calls"', timing['http.maps.googleapis.com'])  # nearbysearch + 5 details
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_disabled(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/doctors/search/', {'q': 'x'}))
+
+    def test_slow_requests_are_logged(self):
+        with override_settings(REQUEST_TIMING_SLOW_MS=0), self.assertLogs('docnearby_project.timing') as logs:
+            APIClient().get('/api/doctors/search/', {'q': 'x'})
+        record = logs.records[-1]
+        self.assertEqual(record.getMessage(), 'request_timing')
+        self.assertTrue(record.slow)
+        self.assertIn('db', record.spans)
+
+
+class BlockingStream(StringIO):
+    """ Blocks the log writer thread on its first write until `release` is set. """
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+class LoggingPipelineTests(TestCase):
+    def make_logger(self, handler):
+        logger = logging.getLogger(f'tests.pipeline.{self._testMethodName}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def test_background_handler_never_blocks(self):
+        stream = BlockingStream()
+        handler = BackgroundHandler(queue_size=1, stream=stream)
+        handler.setFormatter(JsonFormatter())
+        logger = self.make_logger(handler)
+        dropped = scrape().get('docnearby_log_records_dropped_total{reason="queue_full"}', 0)
+
+        logger.info('first %s', 1, extra={'doctor_id': 7})
+        self.assertTrue(stream.entered.wait(5))  # The writer holds 'first'; the queue is empty
+        logger.info('second')
+        logger.info('third')  # Queue full: dropped instead of waiting
+        stream.release.set()
+        handler.close()
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([r['message'] for r in records], ['first 1', 'second'])
+        self.assertEqual(records[0]['doctor_id'], 7)
+        self.assertEqual(records[0]['logger'], logger.name)
+        self.assertEqual(scrape()['docnearby_log_records_dropped_total{reason="queue_full"}'], dropped + 1)
+
+    def test_sampling_and_rate_limits(self):
+        sampling = SamplingFilter({'tests.pipeline': {'sample_rate': 0, 'max_per_second': 2}})
+        with self.assertLogs('tests.pipeline', level='DEBUG') as logs:
+            logger = logging.getLogger('tests.pipeline.sampled')
+            logger.addFilter(sampling)
+            self.addCleanup(logger.removeFilter, sampling)
+            logger.debug('sampled away')
+            for i in range(5):
+                logger.warning('warning %s', i)
+        self.assertEqual(logs.output, ['WARNING:tests.pipeline.sampled:warning 0', 'WARNING:tests.pipeline.sampled:warning 1'])
+
+
+def scrape(client=None):
+    """ {'name{labels}': value} from /metrics. """
+    text = (client or APIClient()).get('/metrics').content.decode()
+    return {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in text.splitlines() if line and not line.startswith('#')
+    }
+
+
+def count_platform_results(n):
+    NEARBY_RESULTS.inc(n, source='platform')
+    REGISTRY.flush()
+
+
+class MetricsTests(TestCase):
+    @replay_settings()
+    def test_nearby_metrics(self):
+        cache.clear()
+        make_doctor()
+        before = scrape()
+        APIClient().get('/api/doctors/nearby/', {'latitude': 18.5204, 'longitude': 73.8567})
+        after = scrape()
+
+        def delta(sample):
+            return after.get(sample, 0) - before.get(sample, 0)
+        self.assertEqual(delta('docnearby_nearby_results_total{source="google_places"}'), 5)
+        self.assertEqual(delta('docnearby_nearby_results_total{source="platform"}'), 1)
+        self.assertEqual(delta('docnearby_upstream_requests_total{upstream="places_nearbysearch",outcome="ok"}'), 1)
+        self.assertEqual(delta('docnearby_upstream_requests_total{upstream="places_details",outcome="ok"}'), 5)
+        self.assertEqual(delta(
+            'docnearby_http_request_duration_seconds_count'
+            '{view="doctors_api:nearby_doctors",method="GET",status="200"}'
+        ), 1)
+        self.assertEqual(delta(
+            'docnearby_http_request_duration_seconds_bucket'
+            '{view="doctors_api:nearby_doctors",method="GET",status="200",le="+Inf"}'
+        ), 1)
+
+    def test_profile_cache_metrics(self):
+        doctor = make_doctor()
+        before = scrape()
+        APIClient().get(f'/api/doctors/{doctor.pk}/')
+        APIClient().get(f'/api/doctors/{doctor.pk}/')
+        after = scrape()
+        for result in ('hit', 'miss'):
+            sample = f'docnearby_cache_requests_total{{cache="doctor_profile",result="{result}"}}'
+            self.assertEqual(after.get(sample, 0) - before.get(sample, 0), 1)
+
+    def test_sums_worker_processes(self):
+        sample = 'docnearby_nearby_results_total{source="platform"}'
+        with tempfile.TemporaryDirectory() as tmpdir, self.settings(METRICS_DIR=tmpdir):
+            own = scrape().get(sample, 0)
+            workers = [multiprocessing.get_context('fork').Process(target=count_platform_results, args=(n,))
+                       for n in (3, 4)]
+            for worker in workers: worker.start()
+            for worker in workers: worker.join()
+            self.assertEqual(scrape()[sample], own + 7)
+            self.assertEqual(len(os.listdir(tmpdir)), 3)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+
+class OperatingHoursScheduleTests(TestCase):
+    def test_parse_common_formats(self):
+        weekday_9_to_5 = {day: [(540, 1020)] for day in range(5)}
+        self.assertEqual(parse_operating_hours('Mon-Fri 9am-5pm'), weekday_9_to_5)
+        self.assertEqual(parse_operating_hours('Monday to Friday 09:00 - 17:00'), weekday_9_to_5)
+        self.assertEqual(parse_operating_hours('weekdays 9-5, Sunday closed'), weekday_9_to_5)
+        self.assertEqual(
+            parse_operating_hours('Mon, Wed 10am-1pm, 5pm-8pm; Sat 9.30am-12pm'),
+            {0: [(600, 780), (1020, 1200)], 2: [(600, 780), (1020, 1200)], 5: [(570, 720)]},
+        )
+        self.assertEqual(operating_hours_to_intervals('24/7'), [(0, MINUTES_PER_WEEK)])
+        with self.assertLogs('doctors.schedule', 'WARNING'):
+            self.assertEqual(parse_operating_hours('By appointment'), {})
+
+    def test_days_after_time_ranges(self):
+        split_shift = [(540, 780), (1020, 1200)]
+        self.assertEqual(parse_operating_hours('9am-1pm & 5pm-8pm Mon-Sat'), {day: split_shift for day in range(6)})
+        self.assertEqual(
+            parse_operating_hours('9-5 Mon-Fri, 10-1 Sat'),
+            {**{day: [(540, 1020)] for day in range(5)}, 5: [(600, 780)]},
+        )
+
+    def test_unparsed_text_is_logged(self):
+        with self.assertLogs('doctors.schedule', 'WARNING') as logs:
+            self.assertEqual(parse_operating_hours('Mon-Fri 9-5 by appointment'), {day: [(540, 1020)] for day in range(5)})
+        self.assertIn("'by appointment'", logs.output[0])
+        with self.assertNoLogs('doctors.schedule', 'WARNING'):
+            parse_operating_hours('Mon, Wed, Fri: 9:00-17:00 and Sat 10am to 1pm')
+
+    def test_open_at_filter_seeks_owner_index(self):
+        make_doctor(operating_hours='Mon-Fri 9am-5pm')
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false', 'open_at': '2025-04-15T10:30'}
+        with CaptureQueriesContext(connection) as captured:
+            APIClient().get('/api/doctors/nearby/', params)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {captured.captured_queries[-1]['sql']}")
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('INDEX doctor_open_interval_idx (doctor_id=?', plan)
+        self.assertIn('INDEX provider_open_interval_idx (provider_id=?', plan)
+
+    def test_overnight_ranges_split_at_week_end(self):
+        self.assertEqual(operating_hours_to_intervals('Sun 10pm-6am'), [(0, 360), (9960, MINUTES_PER_WEEK)])
+
+    def test_open_now_filter_uses_intervals(self):
+        weekdays = make_doctor(name='Weekdays', operating_hours='Mon-Fri 9am-5pm')
+        nights = make_doctor(name='Nights', operating_hours='Daily 8pm-2am')
+        make_doctor(name='Unknown', operating_hours=None)
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false'}
+
+        def open_ids(moment):
+            response = APIClient().get('/api/doctors/nearby/', {**params, 'open_at': moment})
+            return {d['id'] for d in response.data['results']}
+
+        self.assertEqual(open_ids('2025-04-15T10:30'), {weekdays.id})  # Tuesday morning
+        self.assertEqual(open_ids('2025-04-16T01:00'), {nights.id})  # Wednesday, past midnight
+        self.assertEqual(open_ids('2025-04-20T12:00'), set())  # Sunday noon
+
+        nights.operating_hours = 'Sun 11am-1pm'
+        nights.save()
+        self.assertEqual(open_ids('2025-04-20T12:00'), {nights.id})
+        response = APIClient().get('/api/doctors/nearby/', {**params, 'open_at': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_aware_times_are_converted_to_clinic_time(self):
+        weekdays = make_doctor(name='Weekdays', operating_hours='Mon-Fri 9am-5pm')
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false'}
+
+        def open_ids(**query):
+            return {d['id'] for d in APIClient().get('/api/doctors/nearby/', {**params, **query}).data['results']}
+
+        with self.settings(CLINIC_TIME_ZONE='Asia/Kolkata'):
+            self.assertEqual(open_ids(open_at='2025-04-15T10:30+05:30'), {weekdays.id})
+            self.assertEqual(open_ids(open_at='2025-04-15T05:00Z'), {weekdays.id})  # 10:30 in Pune
+            self.assertEqual(open_ids(open_at='2025-04-15T12:00Z'), set())  # 17:30 in Pune
+            with mock.patch('django.utils.timezone.now', return_value=datetime(2025, 4, 15, 4, 0, tzinfo=dt_timezone.utc)):
+                self.assertEqual(open_ids(open_now='true'), {weekdays.id})  # 09:30 in Pune
+            with mock.patch('django.utils.timezone.now', return_value=datetime(2025, 4, 15, 2, 0, tzinfo=dt_timezone.utc)):
+                self.assertEqual(open_ids(open_now='true'), set())  # 07:30 in Pune
+
+
+class SpecialtyTaxonomyTests(TestCase):
+    def setUp(self):
+        clear_alias_map()
+
+    def test_resolve_aliases(self):
+        self.assertEqual(resolve_specialty('Skin Doctor'), 'dermatology')
+        self.assertEqual(resolve_specialty('  dermatologists '), 'dermatology')
+        self.assertEqual(resolve_specialty('Ob/Gyn'), 'gynecology')
+        self.assertEqual(resolve_specialty('Primary Care Doctor'), 'general_physician')
+        self.assertIsNone(resolve_specialty('Aerospace engineer'))
+
+    def test_resolve_compound_specialties(self):
+        self.assertEqual(resolve_specialty('Pediatric Cardiologist'), 'cardiology')
+        self.assertEqual(resolve_specialty('Consultant Skin Doctors'), 'dermatology')
+        self.assertEqual(resolve_specialty('Pediatric Dentist'), 'dentistry')  # Rightmost phrase wins
+        self.assertIsNone(resolve_specialty('Sports Medicine'))
+
+    def test_doctor_save_sets_canonical_specialty(self):
+        doctor = make_doctor(specialty='Dermatologist')
+        self.assertEqual(doctor.canonical_specialty_id, 'dermatology')
+        doctor.specialty = 'Heart Specialist'
+        doctor.save()
+        doctor.refresh_from_db()
+        self.assertEqual(doctor.canonical_specialty_id, 'cardiology')
+
+    def test_nearby_filters_by_synonym(self):
+        derm = make_doctor(specialty='Dermatologist')
+        make_doctor(specialty='Cardiologist')
+        make_doctor(specialty='Sports Medicine')
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false'}
+        response = APIClient().get('/api/doctors/nearby/', {**params, 'specialty': 'skin doctor'})
+        self.assertEqual([d['id'] for d in response.data['results']], [derm.id])
+        # Outside the taxonomy: no platform entries, rather than a text scan
+        response = APIClient().get('/api/doctors/nearby/', {**params, 'specialty': 'sports'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_new_alias_is_picked_up(self):
+        get_alias_map()
+        SpecialtyAlias.objects.create(alias='mole doctor', specialty_id='dermatology')
+        self.assertEqual(resolve_specialty('Mole doctor'), 'dermatology')
+
+    def test_aliases_are_normalized(self):
+        alias = SpecialtyAlias.objects.create(alias=' Tummy-Doctor! ', specialty_id='gastroenterology')
+        self.assertEqual(alias.alias, 'tummy doctor')
+        self.assertEqual(resolve_specialty('tummy doctor'), 'gastroenterology')
+        SpecialtyAlias.objects.filter(pk=alias.pk).update(alias='Belly Doctor')  # Bypasses save()
+        clear_alias_map()
+        self.assertEqual(resolve_specialty('belly doctor'), 'gastroenterology')
+
+    def test_ambiguous_aliases_are_not_seeded(self):
+        self.assertIsNone(resolve_specialty('Doctor'))
+        self.assertIsNone(resolve_specialty('physician'))
+        self.assertIsNone(resolve_specialty('therapist'))
+        self.assertEqual(resolve_specialty('Psychologist'), 'psychology')
+        self.assertEqual(resolve_specialty('orthodontist'), 'orthodontics')
+
+    def test_nearby_matches_compound_specialties_by_code(self):
+        cardio = make_doctor(specialty='Cardiologist')
+        pediatric = make_doctor(specialty='Pediatric Cardiologist')
+        make_doctor(specialty='Dermatologist')
+        params = {'latitude': 18.5204, 'longitude': 73.8567, 'include_web_results': 'false', 'specialty': 'cardiologist'}
+        with CaptureQueriesContext(connection) as captured:
+            response = APIClient().get('/api/doctors/nearby/', params)
+        self.assertEqual({d['id'] for d in response.data['results']}, {cardio.id, pediatric.id})
+
+        # One indexed equality lookup, no LIKE scan over the specialty text
+        sql = captured.captured_queries[-1]['sql']
+        self.assertNotIn('LIKE', sql.upper())
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('USING INDEX search_entry_specialty_idx', plan)
+
+
+class DoctorSearchTests(TestCase):
+    def search(self, **params):
+        return APIClient().get('/api/doctors/search/', params)
+
+    def test_ranks_name_matches_above_bio_mentions(self):
+        by_bio = make_doctor(name='Dr. Kulkarni', bio='Trained under Dr. Mehta in Mumbai.')
+        by_name = make_doctor(name='Dr. Mehta', bio='Consultant physician.')
+        make_doctor(name='Dr. Iyer', bio='No mention here.')
+        response = self.search(q='mehta')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['id'] for d in response.data['results']], [by_name.id, by_bio.id])
+
+    def test_prefix_and_multi_field_terms(self):
+        doctor = make_doctor(clinic_name='Sunrise Skin Clinic', qualifications='MBBS, MD Dermatology')
+        self.assertEqual([d['id'] for d in self.search(q='sunri derm').data['results']], [doctor.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        doctor = make_doctor(name='Dr. Old Name')
+        doctor.name = 'Dr. Newname'
+        doctor.save()
+        self.assertEqual(self.search(q='old').data['count'], 0)
+        self.assertEqual(self.search(q='newname').data['count'], 1)
+        doctor.delete()
+        self.assertEqual(self.search(q='newname').data['count'], 0)
+
+    def test_location_filter(self):
+        near = make_doctor(name='Dr. Near Ortho', latitude=18.521, longitude=73.857)
+        make_doctor(name='Dr. Far Ortho', latitude=19.07, longitude=72.87)  # Mumbai
+        response = self.search(q='ortho', latitude=18.5204, longitude=73.8567, radius_km=20)
+        self.assertEqual([d['id'] for d in response.data['results']], [near.id])
+        self.assertLess(response.data['results'][0]['distance'], 1)
+
+    def test_limit_counts_only_matches_within_radius(self):
+        # Better-ranked matches in the bounding box's corner, about 12.5 km away
+        for i in range(3):
+            make_doctor(name=f'Dr. Ortho {i}', latitude=18.60, longitude=73.94)
+        inside = make_doctor(name='Dr. Rao', bio='Ortho consultant', latitude=18.521, longitude=73.857)
+        response = self.search(q='ortho', latitude=18.5204, longitude=73.8567, radius_km=10, limit=1)
+        self.assertEqual([d['id'] for d in response.data['results']], [inside.id])
+
+    def test_requires_query(self):
+        self.assertEqual(self.search(q='  ').status_code, 400)
+        self.assertEqual(self.search(q='"*').status_code, 400)
+
+
+class DoctorProfileConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.url = f'/api/doctors/{self.doctor.pk}/'
+        self.client = APIClient()
+
+    def test_unchanged_profile_returns_304_without_loading_row(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_updated_profile_gets_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.doctor.bio = 'Updated bio'
+        self.doctor.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['bio'], 'Updated bio')
+
+    def test_missing_profile_returns_404(self):
+        self.assertEqual(self.client.get('/api/doctors/999999/').status_code, 404)
+
+
+class DoctorProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.url = f'/api/doctors/{self.doctor.pk}/'
+        self.client = APIClient()
+
+    def test_cached_profile_served_without_queries(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_save_and_delete_invalidate(self):
+        self.client.get(self.url)
+        self.doctor.name = 'Dr. Renamed'
+        self.doctor.save()
+        self.assertEqual(self.client.get(self.url).data['name'], 'Dr. Renamed')
+        self.doctor.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_stats_endpoint_reports_hit_rate(self):
+        before = profile_cache_stats()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/doctors/profile-cache/stats/').data
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/doctors/profile-cache/stats/').status_code, 401)
+
+
+class DoctorProfileStampedeTests(TransactionTestCase):
+    serialized_rollback = True  # Keep the seeded specialty taxonomy across flushes
+
+    def test_concurrent_misses_load_once(self):
+        cache.clear()
+        doctor = make_doctor()
+        before = profile_cache_stats()['loads']
+        barrier = threading.Barrier(6)
+        results = []
+
+        def fetch():
+            try:
+                barrier.wait()
+                results.append(load_profile(doctor.pk)[1]['name'])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=fetch) for _ in range(6)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(results, [doctor.name] * 6)
+        self.assertEqual(profile_cache_stats()['loads'] - before, 1)
+
+
+class FastJSONRendererTests(TestCase):
+    def test_matches_stock_renderer(self):
+        doctor = make_doctor()
+        payload = {
+            'doctor': DoctorSerializer(doctor).data,
+            'fee': Decimal('450.50'),
+            'seen_at': datetime(2025, 4, 15, 3, 49, 12, 345678, tzinfo=dt_timezone.utc),
+            'label': gettext_lazy('Doctor not found'),
+            'names': ['Dr. \u00c9lise', 'line\u2028break'],
+        }
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_indented_output_falls_back(self):
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n    "a": 1\n}')
+
+    def test_parser_round_trip(self):
+        body = json.dumps({'symptoms': ['fever', 't\u00eate']}).encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'symptoms': ['fever', 't\u00eate']})
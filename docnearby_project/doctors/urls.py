@@ -2,9 +2,7 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 # Ensure the views are imported correctly from the SAME app's views.py
-from .views import NearbyDoctorsView, DoctorProfileDetailView, MyDoctorProfileView
-# If you have feedback URLs defined elsewhere, remove the import below
-# from feedback.views import DoctorFeedbackListView
+from .views import NearbyDoctorsView, DoctorProfileDetailView, MyDoctorProfileView, DoctorProfileCacheStatsView, DoctorSearchView
 
 app_name = 'doctors' # Define app namespace
 
@@ -14,15 +12,19 @@ urlpatterns = [
     # GET /api/doctors/nearby/?latitude=...&longitude=...&keywords=...
     path('doctors/nearby/', NearbyDoctorsView.as_view(), name='nearby_doctors'),
 
+    # GET /api/doctors/search/?q=...&latitude=...&longitude=...&radius_km=...
+    path('doctors/search/', DoctorSearchView.as_view(), name='doctor_search'),
+
     # GET/PUT /api/doctors/profile/me/ (For logged-in doctor's own profile)
     path('doctors/profile/me/', MyDoctorProfileView.as_view(), name='my_doctor_profile'),
 
+    # GET /api/doctors/profile-cache/stats/ (Staff: profile cache hit/miss rates)
+    path('doctors/profile-cache/stats/', DoctorProfileCacheStatsView.as_view(), name='doctor_profile_cache_stats'),
+
     # GET /api/doctors/{id}/ (For viewing any doctor's public profile)
     path('doctors/<int:pk>/', DoctorProfileDetailView.as_view(), name='doctor_detail'),
 
-    # Optional: GET /api/doctors/{provider_pk}/feedback/ (If feedback list is handled here)
-    # Make sure DoctorFeedbackListView is imported if this line is uncommented
-    # path('doctors/<int:provider_pk>/feedback/', DoctorFeedbackListView.as_view(), name='doctor_feedback_list'),
+    # GET/POST /api/doctors/{id}/feedback/ lives in feedback/urls.py
 
     path('nearby/', NearbyDoctorsView.as_view(), name='nearby-doctors'),
 ]
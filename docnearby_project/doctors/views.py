@@ -2,16 +2,34 @@
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from users.models import ProviderProfile, UserProfile
-from .serializers import DoctorListSerializer, DoctorDetailSerializer, MyDoctorProfileUpdateSerializer
-from django.db.models import F, ExpressionWrapper, FloatField, Q, Value
+from users.models import ProviderOpeningInterval, ProviderProfile, UserProfile
+from .serializers import (
+    DoctorListSerializer, DoctorDetailSerializer, MyDoctorProfileUpdateSerializer,
+    DOCTOR_LIST_COLUMNS, doctor_list_row_to_dict,
+)
+from django.db.models import F, ExpressionWrapper, Exists, FloatField, OuterRef, Q, Value
 from django.db.models.functions import Cos, Sin, Radians, Power, Sqrt, ACos
 from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+import calendar
+import contextvars
+import logging
 import math
 import time
 from rest_framework.views import APIView
-from .models import Doctor
-import requests
+from docnearby_project.metrics import NEARBY_RESULTS
+from docnearby_project.replica import ReplicaReadMixin
+from docnearby_project.throttling import UpstreamBudget
+from docnearby_project.upstreams import GeminiModel, http as upstream_http
+from .models import Doctor, DoctorOpeningInterval, ProviderSearchEntry
+from .projection import SEARCH_ENTRY_COLUMNS
+from .schedule import open_at_filter
+from .specialties import resolve_specialty
+from .search import build_match_query, search_doctor_ids
+from .cache import cache_places, get_cached_places, get_cached_profile, load_profile, profile_cache_stats
 import os
 import google.generativeai as genai
 from bs4 import BeautifulSoup
@@ -19,13 +37,14 @@ import json
 from concurrent.futures import ThreadPoolExecutor
 import re
 
+logger = logging.getLogger(__name__)
+
 # Initialize Gemini API
 if hasattr(settings, 'GOOGLE_API_KEY'):
     genai.configure(api_key=settings.GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-pro')
 else:
-    print("Warning: GOOGLE_API_KEY not found in settings. Gemini API features will be disabled.")
-    model = None
+    logger.warning("GOOGLE_API_KEY not found in settings. Gemini API features will be disabled.")
+model = GeminiModel('gemini-pro')  # Falsy without an API key, unless UPSTREAM_MODE is 'replay'
 
 # Haversine distance calculation function
 def calculate_haversine(lat1, lon1, lat2, lon2):
@@ -43,7 +62,7 @@ def calculate_haversine(lat1, lon1, lat2, lon2):
         distance = R * c
         return distance
     except (ValueError, TypeError) as e: # Catch potential math errors
-        print(f"Error calculating Haversine for ({lat1},{lon1}) to ({lat2},{lon2}): {e}")
+        logger.debug("Error calculating Haversine for (%s,%s) to (%s,%s): %s", lat1, lon1, lat2, lon2, e)
         return float('inf') # Return infinity on math error
 
 def fetch_web_results(latitude, longitude, radius, specialty=''):
@@ -67,18 +86,21 @@ def fetch_web_results(latitude, longitude, radius, specialty=''):
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = []
             for source in sources:
-                futures.append(executor.submit(fetch_from_source, source, latitude, longitude, radius, specialty))
+                # Each thread runs in a copy of the request context so its HTTP time is still recorded
+                futures.append(executor.submit(
+                    contextvars.copy_context().run, fetch_from_source, source, latitude, longitude, radius, specialty
+                ))
             
             for future in futures:
                 try:
                     source_results = future.result()
                     results.extend(source_results)
                 except Exception as e:
-                    print(f"Error fetching from source: {str(e)}")
+                    logger.warning("Error fetching from source: %s", e)
 
         return results
     except Exception as e:
-        print(f"Error in web scraping: {str(e)}")
+        logger.warning("Error in web scraping: %s", e)
         return []
 
 def fetch_from_source(source, latitude, longitude, radius, specialty):
@@ -87,11 +109,11 @@ def fetch_from_source(source, latitude, longitude, radius, specialty):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(source['url'], headers=headers, timeout=10)
+        response = upstream_http.get(source['url'], headers=headers, timeout=10)
         response.raise_for_status()
         return source['parser'](response.text, latitude, longitude)
     except Exception as e:
-        print(f"Error fetching from {source['name']}: {str(e)}")
+        logger.warning("Error fetching from %s: %s", source['name'], e)
         return []
 
 def parse_practo_results(html, latitude, longitude):
@@ -122,12 +144,12 @@ def parse_practo_results(html, latitude, longitude):
                     'is_verified': False
                 })
             except Exception as e:
-                print(f"Error parsing Practo doctor card: {str(e)}")
+                logger.debug("Error parsing Practo doctor card: %s", e)
                 continue
                 
         return doctors
     except Exception as e:
-        print(f"Error parsing Practo results: {str(e)}")
+        logger.warning("Error parsing Practo results: %s", e)
         return []
 
 def parse_lybrate_results(html, latitude, longitude):
@@ -158,15 +180,15 @@ def parse_lybrate_results(html, latitude, longitude):
                     'is_verified': False
                 })
             except Exception as e:
-                print(f"Error parsing Lybrate doctor card: {str(e)}")
+                logger.debug("Error parsing Lybrate doctor card: %s", e)
                 continue
                 
         return doctors
     except Exception as e:
-        print(f"Error parsing Lybrate results: {str(e)}")
+        logger.warning("Error parsing Lybrate results: %s", e)
         return []
 
-class NearbyDoctorsView(APIView):
+class NearbyDoctorsView(ReplicaReadMixin, APIView):
     def get(self, request):
         try:
             latitude = float(request.query_params.get('latitude'))
@@ -175,61 +197,86 @@ class NearbyDoctorsView(APIView):
             symptoms = request.query_params.get('symptoms', '')
             include_web_results = request.query_params.get('include_web_results', 'true').lower() == 'true'
 
-            # Query verified doctors from database
-            doctors = Doctor.objects.filter(is_verified=True)
+            # Optional opening-hours filter: open_now=true, or open_at=<ISO datetime>
+            open_at = None
+            if request.query_params.get('open_at'):
+                open_at = parse_datetime(request.query_params['open_at'])
+                if open_at is None:
+                    return Response({
+                        'error': 'Invalid open_at provided',
+                        'details': 'Expected an ISO 8601 datetime, e.g. 2025-04-15T10:30'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            elif request.query_params.get('open_now', '').lower() == 'true':
+                open_at = timezone.now()
+
+            # Query verified doctors and providers from the flat search projection: one
+            # single-table scan carrying exactly the columns the list response needs
+            doctors = ProviderSearchEntry.objects.filter(
+                is_verified=True, latitude__isnull=False, longitude__isnull=False
+            )
 
-            # Filter by specialty if provided
+            # Filter by specialty if provided: terms, synonyms ("skin doctor") and compound
+            # specialties ("Pediatric Cardiologist") resolve to a canonical code, matched by an
+            # indexed equality; terms outside the taxonomy match no platform entries
             if specialty:
-                doctors = doctors.filter(specialty__icontains=specialty)
+                specialty_code = resolve_specialty(specialty)
+                doctors = doctors.filter(canonical_specialty=specialty_code) if specialty_code else doctors.none()
+
+            # Filter to entries open at the requested time via their source's indexed opening intervals
+            if open_at is not None:
+                open_filter = open_at_filter(open_at)
+                doctors = doctors.filter(
+                    Q(Exists(DoctorOpeningInterval.objects.filter(doctor=OuterRef('source_id'), **open_filter)), kind='doctor')
+                    | Q(Exists(ProviderOpeningInterval.objects.filter(provider=OuterRef('source_id'), **open_filter)), kind='provider')
+                )
 
-            # Calculate distance for each doctor
+            # Calculate distance for each entry and build response rows directly
+            lat_idx = SEARCH_ENTRY_COLUMNS.index('latitude')
+            lng_idx = SEARCH_ENTRY_COLUMNS.index('longitude')
             nearby_doctors = []
-            for doctor in doctors:
-                if doctor.latitude is not None and doctor.longitude is not None:
-                    try:
-                        distance = calculate_haversine(
-                            latitude, longitude,
-                            float(doctor.latitude),
-                            float(doctor.longitude)
-                        )
-                        doctor.distance = distance
-                        doctor.source = 'platform'
-                        doctor.is_verified = True
-                        nearby_doctors.append(doctor)
-                    except (ValueError, TypeError) as e:
-                        print(f"Error calculating distance for doctor {doctor.id}: {str(e)}")
-                        continue
+            for row in doctors.values_list(*SEARCH_ENTRY_COLUMNS, 'kind'):
+                distance = calculate_haversine(latitude, longitude, row[lat_idx], row[lng_idx])
+                entry = doctor_list_row_to_dict(row[:-1], distance)
+                # Doctor and provider ids overlap: clients tell them apart by (kind, id), and
+                # only 'doctor' ids resolve under /api/doctors/<id>/
+                entry['kind'] = row[-1]
+                nearby_doctors.append(entry)
 
             # Sort by distance
-            nearby_doctors.sort(key=lambda x: x.distance)
+            nearby_doctors.sort(key=lambda d: d['distance'])
 
-            # Fetch Google Places results if requested
-            google_places_doctors = []
+            # Fetch Google Places results if requested, within the client's and the global Places budget
+            google_places_doctors, web_results = [], None
             if include_web_results:
                 try:
-                    google_places_doctors = self.fetch_google_places(latitude, longitude, specialty)
+                    google_places_doctors, web_results = self.fetch_google_places(
+                        latitude, longitude, specialty, budget=UpstreamBudget('places', request)
+                    )
                 except Exception as e:
-                    print(f"Error fetching Google Places results: {str(e)}")
+                    logger.warning("Error fetching Google Places results: %s", e)
 
-            # Combine and sort all results
+            # Platform results first (by distance), then Google Places results, which
+            # are already plain response dicts
             all_doctors = nearby_doctors + google_places_doctors
-            all_doctors.sort(key=lambda x: x.distance if hasattr(x, 'distance') else float('inf'))
+            if nearby_doctors:
+                NEARBY_RESULTS.inc(len(nearby_doctors), source='platform')
+            if google_places_doctors:
+                NEARBY_RESULTS.inc(len(google_places_doctors), source='google_places')
 
-            # Serialize the results
-            serializer = DoctorListSerializer(all_doctors, many=True)
-            
             # If no doctors found, return a helpful message
             if not all_doctors:
                 return Response({
                     'message': 'No doctors found in your area. Try adjusting your search criteria or expanding your search radius.',
-                    'results': []
+                    'results': [],
+                    'web_results': web_results,
                 }, status=status.HTTP_200_OK)
 
             return Response({
-                'results': serializer.data,
+                'results': all_doctors,
                 'count': len(all_doctors),
                 'verified_count': len(nearby_doctors),
                 'google_count': len(google_places_doctors),
+                'web_results': web_results,
                 'message': f'Found {len(all_doctors)} healthcare providers near you'
             }, status=status.HTTP_200_OK)
 
@@ -239,14 +286,27 @@ class NearbyDoctorsView(APIView):
                 'details': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            print(f"Error in NearbyDoctorsView: {str(e)}")
+            logger.exception("Error in NearbyDoctorsView")
             return Response({
                 'error': 'An error occurred while fetching doctors',
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def fetch_google_places(self, latitude, longitude, specialty=''):
-        """Fetch healthcare providers from Google Places API"""
+    def fetch_google_places(self, latitude, longitude, specialty='', budget=None):
+        """
+        Fetch healthcare providers from Google Places API. Returns (places, how): 'cached',
+        'live', 'partial' (the budget ran out before the details calls, so phone numbers
+        and websites are missing), 'throttled' (budget exhausted) or 'unavailable'.
+        """
+        keyword = specialty if specialty else 'healthcare'
+        cached = get_cached_places(latitude, longitude, keyword)
+        if cached is not None:
+            return [
+                {**place, 'distance': calculate_haversine(latitude, longitude, place['latitude'], place['longitude'])}
+                for place in cached
+            ], 'cached'
+        if budget is not None and not budget.take():
+            return [], 'throttled'
         try:
             # Use Google Places API to find healthcare providers
             url = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
@@ -254,32 +314,36 @@ class NearbyDoctorsView(APIView):
                 'location': f'{latitude},{longitude}',
                 'radius': 10000,  # 10km radius
                 'type': 'doctor|hospital|health',
-                'keyword': specialty if specialty else 'healthcare',
+                'keyword': keyword,
                 'key': settings.GOOGLE_MAPS_API_KEY
             }
 
-            response = requests.get(url, params=params)
+            response = upstream_http.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
             if data['status'] != 'OK':
-                print(f"Google Places API error: {data['status']}")
-                return []
+                logger.warning("Google Places API error: %s", data['status'])
+                return [], 'unavailable'
 
+            # One details call per place, paid for up front or skipped altogether
+            fetch_details = budget is None or budget.take(len(data['results']))
             places = []
             for place in data['results']:
                 try:
-                    # Get place details for more information
-                    details_url = 'https://maps.googleapis.com/maps/api/place/details/json'
-                    details_params = {
-                        'place_id': place['place_id'],
-                        'fields': 'name,formatted_address,formatted_phone_number,rating,types,website',
-                        'key': settings.GOOGLE_MAPS_API_KEY
-                    }
-                    
-                    details_response = requests.get(details_url, params=details_params)
-                    details_response.raise_for_status()
-                    details = details_response.json()['result']
+                    details = {}
+                    if fetch_details:
+                        # Get place details for more information
+                        details_url = 'https://maps.googleapis.com/maps/api/place/details/json'
+                        details_params = {
+                            'place_id': place['place_id'],
+                            'fields': 'name,formatted_address,formatted_phone_number,rating,types,website',
+                            'key': settings.GOOGLE_MAPS_API_KEY
+                        }
+
+                        details_response = upstream_http.get(details_url, params=details_params, timeout=10)
+                        details_response.raise_for_status()
+                        details = details_response.json()['result']
 
                     # Create a doctor-like object
                     doctor = {
@@ -301,13 +365,16 @@ class NearbyDoctorsView(APIView):
                     }
                     places.append(doctor)
                 except Exception as e:
-                    print(f"Error processing Google Place: {str(e)}")
+                    logger.debug("Error processing Google Place: %s", e)
                     continue
 
-            return places
+            if not fetch_details:
+                return places, 'partial'
+            cache_places(latitude, longitude, keyword, places)
+            return places, 'live'
         except Exception as e:
-            print(f"Error fetching Google Places: {str(e)}")
-            return []
+            logger.warning("Error fetching Google Places: %s", e)
+            return [], 'unavailable'
 
     def rank_doctors_by_symptoms(self, doctors, symptoms):
         try:
@@ -338,29 +405,116 @@ class NearbyDoctorsView(APIView):
 
             return ranked_doctors
         except Exception as e:
-            print(f"Error in Gemini ranking: {str(e)}")
+            logger.warning("Error in Gemini ranking: %s", e)
             return doctors  # Return original order if ranking fails
 
-class DoctorProfileDetailView(APIView):
+def doctor_profile_response(request, doctors, not_found_error, pk=None):
+    """
+    Returns the DoctorDetailSerializer response for the single doctor in `doctors`,
+    with ETag/Last-Modified validators derived from Doctor.updated_at.
+    When `pk` is known the profile cache is checked first, so a hit costs no queries.
+    Otherwise only (id, updated_at) is read before deciding on a 304; the profile
+    is loaded (through the cache) only when the client's copy is stale.
+    """
+    entry = get_cached_profile(pk) if pk is not None else None
+    cache_checked = pk is not None
+    if entry is not None:
+        updated_at = entry[0]
+    else:
+        validators = doctors.values_list('pk', 'updated_at').first()
+        if validators is None:
+            return Response({'error': not_found_error}, status=status.HTTP_404_NOT_FOUND)
+        pk, updated_at = validators
+
+    etag = quote_etag(f"doctor-{pk}-{int(updated_at.timestamp() * 1_000_000)}")
+    last_modified = calendar.timegm(updated_at.utctimetuple())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if entry is None and not cache_checked:
+            entry = get_cached_profile(pk)
+        if entry is None:
+            try:
+                entry = load_profile(pk)
+            except Doctor.DoesNotExist:  # Deleted between the two queries
+                return Response({'error': not_found_error}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(entry[1])
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+class DoctorProfileDetailView(ReplicaReadMixin, APIView):
     def get(self, request, pk):
-        try:
-            doctor = Doctor.objects.get(pk=pk)
-            serializer = DoctorDetailSerializer(doctor)
-            return Response(serializer.data)
-        except Doctor.DoesNotExist:
-            return Response(
-                {'error': 'Doctor not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        return doctor_profile_response(request, Doctor.objects.filter(pk=pk), 'Doctor not found', pk=pk)
 
 class MyDoctorProfileView(APIView):
     def get(self, request):
+        return doctor_profile_response(request, Doctor.objects.filter(user=request.user), 'Doctor profile not found')
+
+class DoctorSearchView(ReplicaReadMixin, APIView):
+    """
+    Full-text search over verified doctors' name, clinic, qualifications, bio and specialty.
+    GET /api/doctors/search/?q=...[&latitude=..&longitude=..&radius_km=10][&limit=20]
+    Results are ranked by relevance (bm25); with a location they are limited to radius_km.
+    """
+    MAX_LIMIT = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not build_match_query(query):
+            return Response({'error': 'A search query (q) is required'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            doctor = Doctor.objects.get(user=request.user)
-            serializer = DoctorDetailSerializer(doctor)
-            return Response(serializer.data)
-        except Doctor.DoesNotExist:
-            return Response(
-                {'error': 'Doctor profile not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.MAX_LIMIT)
+            latitude = request.query_params.get('latitude')
+            longitude = request.query_params.get('longitude')
+            origin = None
+            if latitude is not None or longitude is not None:
+                origin = (float(latitude), float(longitude))
+                radius_km = float(request.query_params.get('radius_km', 10))
+        except (TypeError, ValueError) as e:
+            return Response({
+                'error': 'Invalid limit, latitude, longitude or radius_km provided',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        bbox = None
+        if origin:
+            # Coarse bounding box in SQL, exact haversine radius check below
+            lat_delta = radius_km / 111.0
+            lng_delta = radius_km / (111.0 * max(math.cos(math.radians(origin[0])), 0.01))
+            bbox = (origin[0] - lat_delta, origin[0] + lat_delta, origin[1] - lng_delta, origin[1] + lng_delta)
+
+        # The bounding box's corners lie outside the radius, so fetch matches in pages
+        # (over-fetching when a radius applies) until `limit` of them pass the exact check
+        page_size = limit * 2 if origin else limit
+        lat_idx = DOCTOR_LIST_COLUMNS.index('latitude')
+        lng_idx = DOCTOR_LIST_COLUMNS.index('longitude')
+        results, offset = [], 0
+        while len(results) < limit:
+            ids = search_doctor_ids(query, limit=page_size, bbox=bbox, offset=offset)
+            rows = {row[0]: row for row in Doctor.objects.filter(id__in=ids).values_list(*DOCTOR_LIST_COLUMNS)}
+            for pk in ids:
+                row = rows.get(pk)
+                if row is None:
+                    continue
+                distance = None
+                if origin:
+                    distance = calculate_haversine(origin[0], origin[1], row[lat_idx], row[lng_idx])
+                    if distance > radius_km:
+                        continue
+                results.append(doctor_list_row_to_dict(row, distance))
+                if len(results) == limit:
+                    break
+            if len(ids) < page_size:
+                break
+            offset += page_size
+
+        return Response({'results': results, 'count': len(results), 'query': query}, status=status.HTTP_200_OK)
+
+class DoctorProfileCacheStatsView(APIView):
+    """ Exposes this worker's doctor-profile cache hit/miss counters (staff only). """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(profile_cache_stats())
@@ -0,0 +1,55 @@
+# feedback/aggregates.py
+"""
+Keeps Doctor.reviews, rating_sum, stars_1..stars_5 and rating (the average) in step
+with Feedback rows. Each change is a single UPDATE built from F() expressions, so
+concurrent submissions can't lose increments, and readers never need AVG() over reviews.
+Call these inside the same transaction as the Feedback write.
+"""
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from doctors.cache import invalidate_profile
+from doctors.models import Doctor
+from doctors.projection import sync_doctor_ratings
+
+
+def _apply(doctor_id, count_delta, sum_delta, star_deltas):
+    new_count = F('reviews') + count_delta
+    new_sum = F('rating_sum') + sum_delta
+    updates = {
+        'reviews': new_count,
+        'rating_sum': new_sum,
+        # SET expressions read the pre-update column values, so the average uses the new totals
+        'rating': Case(
+            When(**{'reviews__gt': -count_delta}, then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField())),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        # Changes the profile's ETag/Last-Modified like a regular save would
+        'updated_at': timezone.now(),
+    }
+    for stars, delta in star_deltas.items():
+        if delta:
+            updates[f'stars_{stars}'] = F(f'stars_{stars}') + delta
+    Doctor.objects.filter(pk=doctor_id).update(**updates)
+
+    # update() skips the post_save receivers, so refresh the search projection and
+    # drop the cached profile here
+    sync_doctor_ratings(doctor_id)
+    invalidate_profile(doctor_id)
+    transaction.on_commit(lambda: invalidate_profile(doctor_id))
+
+
+def rating_added(doctor_id, rating):
+    _apply(doctor_id, 1, rating, {rating: 1})
+
+
+def rating_changed(doctor_id, old_rating, new_rating):
+    if old_rating != new_rating:
+        _apply(doctor_id, 0, new_rating - old_rating, {old_rating: -1, new_rating: 1})
+
+
+def rating_removed(doctor_id, rating):
+    _apply(doctor_id, -1, -rating, {rating: -1})
@@ -1,3 +1,22 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from doctors.models import Doctor
+from users.models import UserProfile
 
-# Create your models here.
+class Feedback(models.Model):
+    """ A patient's star rating and review of a doctor (one per patient per doctor). """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='feedback')
+    patient = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='feedback_given')
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'patient'], name='unique_feedback_per_patient'),
+        ]
+
+    def __str__(self):
+        return f"{self.rating}* for {self.doctor.name} by {self.patient.user.username}"
@@ -0,0 +1,16 @@
+# feedback/serializers.py
+from rest_framework import serializers
+from .models import Feedback
+
+class FeedbackSerializer(serializers.ModelSerializer):
+    """ Patient review of a doctor; doctor and patient come from the URL / request user. """
+    patient_name = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = Feedback
+        fields = ['id', 'doctor', 'patient', 'patient_name', 'rating', 'comment', 'created_at', 'updated_at']
+        read_only_fields = ['doctor', 'patient', 'created_at', 'updated_at']
+
+    def get_patient_name(self, obj):
+        user = obj.patient.user
+        return f"{user.first_name} {user.last_name}".strip() or user.username
@@ -1,3 +1,137 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient
+
+from doctors.models import Doctor
+from users.models import UserProfile
+from .models import Feedback
+from .views import FeedbackDetailView, is_duplicate_review
+
+
+def make_patient(username):
+    user = User.objects.create_user(username=username, password='pass12345')
+    return UserProfile.objects.create(user=user, user_type='patient')
+
+def make_doctor():
+    return Doctor.objects.create(
+        name='Dr. Asha Rao', specialty='Dermatologist', address='12 MG Road, Pune',
+        phone_number='+91 98220 00000', email='asha@example.com', is_verified=True,
+    )
+
+
+class FeedbackAggregateTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        self.url = f'/api/doctors/{self.doctor.pk}/feedback/'
+
+    def post(self, patient, rating):
+        client = APIClient()
+        client.force_authenticate(patient.user)
+        return client.post(self.url, {'rating': rating, 'comment': 'Helpful'}, format='json')
+
+    def assertAggregates(self, reviews, rating, histogram):
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.reviews, reviews)
+        self.assertAlmostEqual(self.doctor.rating, rating)
+        self.assertEqual([getattr(self.doctor, f'stars_{n}') for n in range(1, 6)], histogram)
+
+    def test_submit_edit_delete_keep_aggregates_in_step(self):
+        alice, bob = make_patient('alice'), make_patient('bob')
+        self.assertEqual(self.post(alice, 5).status_code, 201)
+        feedback_id = self.post(bob, 2).data['id']
+        self.assertAggregates(2, 3.5, [0, 1, 0, 0, 1])
+
+        client = APIClient()
+        client.force_authenticate(bob.user)
+        self.assertEqual(client.patch(f'/api/feedback/{feedback_id}/', {'rating': 4}, format='json').status_code, 200)
+        self.assertAggregates(2, 4.5, [0, 0, 0, 1, 1])
+
+        self.assertEqual(client.delete(f'/api/feedback/{feedback_id}/').status_code, 204)
+        self.assertAggregates(1, 5.0, [0, 0, 0, 0, 1])
+
+        alice_feedback = Feedback.objects.get(patient=alice)
+        client.force_authenticate(alice.user)
+        client.delete(f'/api/feedback/{alice_feedback.pk}/')
+        self.assertAggregates(0, 0.0, [0, 0, 0, 0, 0])
+
+    def test_profile_reads_precomputed_histogram(self):
+        self.post(make_patient('alice'), 4)
+        response = APIClient().get(f'/api/doctors/{self.doctor.pk}/')
+        self.assertEqual(response.data['reviews'], 1)
+        self.assertEqual(response.data['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+
+    def test_second_review_conflicts_and_others_cannot_edit(self):
+        alice, bob = make_patient('alice'), make_patient('bob')
+        feedback_id = self.post(alice, 3).data['id']
+        self.assertEqual(self.post(alice, 5).status_code, 409)
+        self.assertAggregates(1, 3.0, [0, 0, 1, 0, 0])
+
+        client = APIClient()
+        client.force_authenticate(bob.user)
+        self.assertEqual(client.patch(f'/api/feedback/{feedback_id}/', {'rating': 1}, format='json').status_code, 403)
+        self.assertEqual(self.post(alice, 6).status_code, 400)
+
+    def test_only_duplicate_reviews_become_conflicts(self):
+        alice = make_patient('alice')
+        Feedback.objects.create(doctor=self.doctor, patient=alice, rating=4)
+        with self.assertRaises(IntegrityError) as duplicate:
+            with transaction.atomic():
+                Feedback.objects.create(doctor=self.doctor, patient=alice, rating=2)
+        self.assertTrue(is_duplicate_review(duplicate.exception))
+        self.assertFalse(is_duplicate_review(IntegrityError('NOT NULL constraint failed: feedback_feedback.rating')))
+
+        with mock.patch('feedback.views.rating_added', side_effect=IntegrityError('FOREIGN KEY constraint failed')):
+            with self.assertRaises(IntegrityError):
+                self.post(make_patient('bob'), 5)
+
+    def test_racing_delete_decrements_once(self):
+        feedback_id = self.post(make_patient('alice'), 4).data['id']
+        stale = Feedback.objects.get(pk=feedback_id)
+        view = FeedbackDetailView()
+        view.perform_destroy(stale)
+        with self.assertRaises(NotFound):
+            view.perform_destroy(stale)  # The losing request of two concurrent deletes
+        self.assertAggregates(0, 0.0, [0, 0, 0, 0, 0])
+
+    def test_stale_doctor_save_keeps_aggregates(self):
+        stale = Doctor.objects.get(pk=self.doctor.pk)
+        self.post(make_patient('alice'), 5)
+        stale.experience = 12
+        stale.save()
+        self.assertAggregates(1, 5.0, [0, 0, 0, 0, 1])
+        self.assertEqual(self.doctor.experience, 12)
+
+
+class ConcurrentFeedbackTests(TransactionTestCase):
+    serialized_rollback = True  # Keep the seeded specialty taxonomy across flushes
+    WORKERS = 6
+
+    def test_parallel_submissions_are_all_counted(self):
+        doctor = make_doctor()
+        patients = [make_patient(f'patient{i}') for i in range(self.WORKERS)]
+        barrier = threading.Barrier(self.WORKERS)
+        statuses = []
+
+        def submit(patient, rating):
+            client = APIClient()
+            client.force_authenticate(patient.user)
+            try:
+                barrier.wait()
+                response = client.post(f'/api/doctors/{doctor.pk}/feedback/', {'rating': rating}, format='json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(p, i % 5 + 1)) for i, p in enumerate(patients)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+        doctor.refresh_from_db()
+        self.assertEqual(statuses, [201] * self.WORKERS)
+        self.assertEqual(doctor.reviews, self.WORKERS)
+        self.assertEqual(doctor.rating_sum, sum(i % 5 + 1 for i in range(self.WORKERS)))
@@ -0,0 +1,13 @@
+# feedback/urls.py
+from django.urls import path
+from .views import DoctorFeedbackListView, FeedbackDetailView
+
+app_name = 'feedback'
+
+urlpatterns = [
+    # GET/POST /api/doctors/{doctor_id}/feedback/
+    path('doctors/<int:doctor_pk>/feedback/', DoctorFeedbackListView.as_view(), name='doctor_feedback_list'),
+
+    # GET/PUT/PATCH/DELETE /api/feedback/{id}/ (author only for writes)
+    path('feedback/<int:pk>/', FeedbackDetailView.as_view(), name='feedback_detail'),
+]
@@ -1,3 +1,77 @@
-from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied
+from doctors.models import Doctor
+from users.authentication import role_claims
+from .aggregates import rating_added, rating_changed, rating_removed
+from .models import Feedback
+from .serializers import FeedbackSerializer
 
-# Create your views here.
+class AlreadyReviewed(APIException):
+    """ Raised when a patient submits a second review for the same doctor (HTTP 409). """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'You have already reviewed this doctor; edit your existing feedback instead'
+    default_code = 'already_reviewed'
+
+REVIEW_CONSTRAINT = 'unique_feedback_per_patient'
+
+def is_duplicate_review(error):
+    """ Whether an IntegrityError comes from the one-review-per-patient constraint. """
+    message = str(error)
+    # PostgreSQL names the constraint; SQLite lists the columns of the violated index
+    table = Feedback._meta.db_table
+    columns = ', '.join(f"{table}.{Feedback._meta.get_field(name).column}" for name in ('doctor', 'patient'))
+    return REVIEW_CONSTRAINT in message or columns in message
+
+class IsFeedbackAuthorOrReadOnly(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return request.method in permissions.SAFE_METHODS or obj.patient.user_id == request.user.id
+
+class DoctorFeedbackListView(generics.ListCreateAPIView):
+    """ Lists a doctor's feedback (public) and lets patients submit a review. """
+    serializer_class = FeedbackSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        return Feedback.objects.filter(doctor_id=self.kwargs['doctor_pk']).select_related('patient__user')
+
+    def perform_create(self, serializer):
+        doctor = get_object_or_404(Doctor, pk=self.kwargs['doctor_pk'])
+        role, _, _ = role_claims(self.request.user)
+        if role != 'patient':
+            raise PermissionDenied("Only patients can leave feedback")
+        user_profile = self.request.user.profile
+        try:
+            with transaction.atomic():
+                feedback = serializer.save(doctor=doctor, patient=user_profile)
+                rating_added(doctor.pk, feedback.rating)
+        except IntegrityError as e:
+            if not is_duplicate_review(e):
+                raise
+            raise AlreadyReviewed()
+
+class FeedbackDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """ Lets a patient view, edit or delete their own feedback; the doctor's aggregates follow. """
+    serializer_class = FeedbackSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsFeedbackAuthorOrReadOnly]
+    queryset = Feedback.objects.select_related('patient__user')
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Re-read the stored rating under lock so concurrent edits adjust the right bucket
+            old_rating = Feedback.objects.select_for_update().values_list('rating', flat=True).filter(pk=serializer.instance.pk).first()
+            if old_rating is None:  # Deleted since it was fetched; saving would re-insert it
+                raise NotFound()
+            feedback = serializer.save()
+            rating_changed(feedback.doctor_id, old_rating, feedback.rating)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            rating = Feedback.objects.select_for_update().values_list('rating', flat=True).filter(pk=instance.pk).first()
+            # Only the request whose DELETE removed the row (with the rating read above) adjusts
+            # the aggregates, so racing deletes cannot both decrement
+            deleted, _ = Feedback.objects.filter(pk=instance.pk, rating=rating).delete()
+            if not deleted:
+                raise NotFound()
+            rating_removed(instance.doctor_id, rating)
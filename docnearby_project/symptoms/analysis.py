@@ -0,0 +1,176 @@
+# symptoms/analysis.py
+"""
+Gemini symptom analysis, shared by the synchronous analyze endpoint and the
+asynchronous jobs in symptoms/jobs.py.
+"""
+import json # To parse potential JSON output from Gemini
+import logging
+import re # For cleaning potential markdown fences
+
+import google.generativeai as genai
+from django.conf import settings
+
+from docnearby_project.upstreams import GeminiModel
+from .cache import cache_analysis
+
+logger = logging.getLogger(__name__)
+
+# --- Gemini Configuration ---
+# Using flash for potentially faster/cheaper responses in hackathon. The model is falsy
+# (and the view answers 503) without an API key, unless UPSTREAM_MODE is 'replay'.
+gemini_model = GeminiModel('gemini-1.5-flash-latest')
+if settings.GOOGLE_API_KEY:
+    try:
+        genai.configure(api_key=settings.GOOGLE_API_KEY)
+        logger.info("Gemini API client configured successfully (symptoms app).")
+    except Exception as e:
+        logger.error("Error configuring Gemini API client: %s", e)
+else:
+    # This case is handled by the check within the view now
+    logger.warning("Gemini API Key missing, AI features disabled.")
+
+# Define safety settings (adjust thresholds if needed, BLOCK_NONE can be risky)
+safety_settings = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    # Be cautious with DANGEROUS_CONTENT for medical topics, may need BLOCK_NONE
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+# --- Prompt for Gemini ---
+# This prompt guides the LLM to output the specific JSON structure needed.
+GEMINI_PROMPT_TEMPLATE = """
+Analyze the following patient symptoms and provide potential related medical conditions
+and relevant medical specialties or keywords to search for nearby healthcare providers.
+
+Symptoms List:
+{symptom_list}
+
+Instructions:
+1. List 2-3 potential medical conditions or issues these symptoms might indicate. 
+   - Use clear, non-alarming language
+   - Avoid medical jargon
+   - Focus on common conditions first
+   - Example: "Common Cold or Flu", "Muscle Strain", "Mild Allergic Reaction"
+
+2. Generate a list of 3-5 relevant healthcare providers to consult, ordered by priority:
+   - Start with most appropriate specialist
+   - Include general practitioners when appropriate
+   - Add urgent care/emergency if symptoms are severe
+   - Example: ["Primary Care Doctor", "Allergist", "Urgent Care"]
+
+3. Provide a brief, reassuring summary that:
+   - Acknowledges the symptoms
+   - Suggests next steps
+   - Emphasizes the importance of professional consultation
+   - Uses a calm, supportive tone
+
+Output the result ONLY as a valid JSON object with the following exact keys:
+- "potential_conditions": ["Condition 1", "Condition 2", ...] (list of strings)
+- "recommended_providers": ["Provider 1", "Provider 2", ...] (list of strings)
+- "summary": "Brief, reassuring summary." (string)
+- "urgency_level": "low" | "medium" | "high" (string)
+
+Example Output for "skin rash, itching":
+{{
+  "potential_conditions": ["Mild Allergic Reaction", "Contact Dermatitis"],
+  "recommended_providers": ["Primary Care Doctor", "Allergist", "Dermatologist"],
+  "summary": "These symptoms suggest a mild skin reaction. While not urgent, seeing a doctor can help identify the cause and provide relief.",
+  "urgency_level": "low"
+}}
+
+Now analyze the provided symptoms.
+
+JSON Output:
+"""
+# --- End Prompt ---
+
+
+DISCLAIMER = "AI analysis is informational only. Always consult a qualified healthcare professional for diagnosis and treatment."
+
+
+class AnalysisError(Exception):
+    """ An analysis that could not be completed; `body` and `status_code` are what the API answers. """
+    def __init__(self, message, status_code, **extra):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = {"error": message, **extra}
+
+
+def analyze_symptoms(symptoms):
+    """
+    Asks Gemini about `symptoms` and returns the validated analysis (with the standard
+    disclaimer), which is also cached for the symptom set. Raises AnalysisError.
+    """
+    # Prepare prompt input
+    symptom_list_str = "- " + "\n- ".join(symptoms) # Format list for prompt
+    prompt = GEMINI_PROMPT_TEMPLATE.format(symptom_list=symptom_list_str)
+    logger.debug("[Gemini Analysis] Analyzing symptoms: %s", symptoms)
+
+    try:
+        # --- Call Gemini API ---
+        generation_config = genai.types.GenerationConfig(
+            # candidate_count=1, # Default
+            # max_output_tokens=250, # Limit token usage
+            temperature=0.4 # Lower temperature for more focused, less creative output
+        )
+        response = gemini_model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            safety_settings=safety_settings
+        )
+        # --- End Gemini API Call ---
+
+        # --- Process Gemini Response ---
+        try:
+             # Check for safety blocks first
+            if not response.candidates:
+                block_reason = "Unknown"
+                try: block_reason = response.prompt_feedback.block_reason
+                except Exception: pass
+                logger.info("[Gemini Analysis] Blocked by safety settings: %s", block_reason)
+                # It's better to return a structured error than the block reason directly
+                raise AnalysisError("Analysis could not be completed due to content restrictions.", 400)
+
+            raw_text = response.text.strip()
+            logger.debug("[Gemini Analysis] Raw response text:\n%s", raw_text)
+
+            # Clean potential markdown JSON fences (```json ... ```)
+            json_string = re.sub(r"```json\s*(.*?)\s*```", r"\1", raw_text, flags=re.DOTALL | re.IGNORECASE)
+            json_string = json_string.strip() # Remove leading/trailing whitespace
+
+            # Attempt to parse the JSON
+            parsed_data = json.loads(json_string)
+
+            # Validate expected structure
+            if not all(k in parsed_data for k in ["potential_conditions", "recommended_providers", "summary", "urgency_level"]) or \
+               not isinstance(parsed_data.get("potential_conditions"), list) or \
+               not isinstance(parsed_data.get("recommended_providers"), list) or \
+               not isinstance(parsed_data.get("summary"), str) or \
+               not isinstance(parsed_data.get("urgency_level"), str):
+                 raise ValueError("Gemini response missing required JSON keys or has incorrect types.")
+
+        except (json.JSONDecodeError, ValueError) as json_e:
+             logger.warning("Error parsing Gemini JSON response: %s", json_e, extra={'raw_text': raw_text})
+             # Error indicating format issue from AI: Bad Gateway indicates issue with upstream service (Gemini)
+             raise AnalysisError(
+                 "AI analysis result could not be processed.", 502,
+                 raw_ai_response=raw_text, # Optional: Send raw response for debugging on frontend
+             )
+        # --- End Process Response ---
+
+    except AnalysisError:
+        raise
+    except Exception as e:
+        # Catch potential API errors during the call itself
+        logger.warning("[Gemini Analysis] Error calling Gemini API: %s - %s", type(e).__name__, e)
+        error_detail = getattr(e, 'message', str(e))
+        raise AnalysisError(f"AI analysis service failed: {error_detail}", 503)
+
+    # Add standard disclaimer
+    parsed_data["disclaimer"] = DISCLAIMER
+
+    logger.debug("[Gemini Analysis] Parsed Data: %s", parsed_data)
+    cache_analysis(symptoms, parsed_data)
+    return parsed_data
@@ -0,0 +1,39 @@
+# symptoms/cache.py
+"""
+Cache of validated Gemini symptom analyses, keyed by the normalized set of symptoms,
+so repeated questions cost no AI quota and can still be answered when the budget for
+Gemini calls is used up.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from docnearby_project.metrics import CACHE_REQUESTS
+
+ANALYSIS_CACHE_TIMEOUT = getattr(settings, 'SYMPTOM_ANALYSIS_CACHE_TIMEOUT', 86400)
+
+
+def normalize_symptoms(symptoms):
+    """ Lowercased, whitespace-collapsed, de-duplicated and sorted symptoms. """
+    return sorted({' '.join(symptom.lower().split()) for symptom in symptoms} - {''})
+
+
+def symptoms_key(symptoms):
+    """ Hex digest identifying the normalized symptom set. """
+    return hashlib.sha256(json.dumps(normalize_symptoms(symptoms)).encode()).hexdigest()
+
+
+def analysis_cache_key(symptoms):
+    return f'symptom-analysis:{symptoms_key(symptoms)}'
+
+
+def get_cached_analysis(symptoms):
+    analysis = cache.get(analysis_cache_key(symptoms))
+    CACHE_REQUESTS.inc(cache='symptom_analysis', result='hit' if analysis is not None else 'miss')
+    return analysis
+
+
+def cache_analysis(symptoms, analysis):
+    cache.set(analysis_cache_key(symptoms), analysis, ANALYSIS_CACHE_TIMEOUT)
@@ -0,0 +1,143 @@
+# symptoms/jobs.py
+"""
+Asynchronous symptom analysis. A job row in SymptomAnalysisJob records each request;
+it runs on a small thread pool in the web process, so the request returns the job id
+straight away instead of holding a worker through the Gemini call. Clients then poll
+/api/symptoms/jobs/<id>/.
+
+Requests for the same symptom set (see symptoms.cache.normalize_symptoms) share one
+job while it is unfinished or its result is still valid. Jobs expire SYMPTOM_JOB_TTL
+seconds after they are created. A job that stays unfinished for SYMPTOM_JOB_TIMEOUT
+seconds (for example because its process was restarted) is marked failed when it is
+next looked at. `manage.py purge_symptom_jobs` deletes expired rows.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .analysis import AnalysisError, analyze_symptoms
+from .cache import get_cached_analysis, symptoms_key
+from .models import SymptomAnalysisJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    """ One pool per web process, started on first use. Threads suit jobs that mostly wait on Gemini. """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='symptom-job')
+        return _executor
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'SYMPTOM_JOB_TTL', 3600))
+
+
+def fail_if_stale(job):
+    """ Marks an unfinished job failed once it has gone SYMPTOM_JOB_TIMEOUT seconds without finishing. """
+    timeout = timedelta(seconds=getattr(settings, 'SYMPTOM_JOB_TIMEOUT', 120))
+    if job.status in SymptomAnalysisJob.ACTIVE_STATUSES and job.updated_at < timezone.now() - timeout:
+        job.status, job.error, job.error_status = 'failed', {"error": "AI analysis timed out."}, 504
+        SymptomAnalysisJob.objects.filter(pk=job.pk, status__in=SymptomAnalysisJob.ACTIVE_STATUSES).update(
+            status=job.status, error=job.error, error_status=job.error_status, updated_at=timezone.now(),
+        )
+    return job
+
+
+def find_job(symptoms):
+    """ The unexpired, unfinished or successful job for this symptom set, if any. """
+    job = (
+        SymptomAnalysisJob.objects.filter(
+            symptoms_key=symptoms_key(symptoms), status__in=[*SymptomAnalysisJob.ACTIVE_STATUSES, 'done'],
+            expires_at__gt=timezone.now(),
+        ).order_by('-created_at').first()
+    )
+    if job is not None and fail_if_stale(job).status == 'failed':
+        return None
+    return job
+
+
+def submit_job(symptoms, budget=None):
+    """
+    Returns (job, created) for `symptoms`: an existing job for the same symptom set, a
+    finished one built from the analysis cache, or a new pending job queued to run
+    after the current transaction commits. Only a new pending job spends `budget`;
+    returns (None, False) when the budget refuses it.
+    """
+    job = find_job(symptoms)
+    if job is not None:
+        return job, False
+    key = symptoms_key(symptoms)
+    cached = get_cached_analysis(symptoms)
+    if cached is not None:
+        job = SymptomAnalysisJob.objects.create(
+            symptoms=symptoms, symptoms_key=key, status='done', result=cached, expires_at=_expiry(),
+        )
+        return job, True
+    if budget is not None and not budget.take():
+        return None, False
+    try:
+        with transaction.atomic():
+            job = SymptomAnalysisJob.objects.create(symptoms=symptoms, symptoms_key=key, expires_at=_expiry())
+    except IntegrityError:
+        # A concurrent request started a job for the same symptoms first; this one calls no upstream
+        if budget is not None:
+            budget.refund()
+        job = SymptomAnalysisJob.objects.filter(
+            symptoms_key=key, status__in=SymptomAnalysisJob.ACTIVE_STATUSES,
+        ).order_by('-created_at').first()
+        return job or find_job(symptoms), False  # find_job covers a winner that already finished
+
+    workers = getattr(settings, 'SYMPTOM_JOB_WORKERS', 4)
+    if workers <= 0:
+        transaction.on_commit(lambda: run_job(job.pk))
+    else:
+        transaction.on_commit(lambda: _get_executor(workers).submit(_run_in_worker, job.pk))
+    return job, True
+
+
+def _run_in_worker(job_id):
+    # Close the thread's connections after each job instead of holding them while the thread idles
+    try:
+        run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def run_job(job_id):
+    """ Claims a pending job and stores its analysis or error. """
+    try:
+        claimed = SymptomAnalysisJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', updated_at=timezone.now(),
+        )
+        if not claimed:
+            return
+        job = SymptomAnalysisJob.objects.get(pk=job_id)
+        try:
+            result = analyze_symptoms(job.symptoms)
+        except AnalysisError as e:
+            update = {'status': 'failed', 'error': e.body, 'error_status': e.status_code}
+        else:
+            update = {'status': 'done', 'result': result}
+        SymptomAnalysisJob.objects.filter(pk=job_id, status='running').update(**update, updated_at=timezone.now())
+    except Exception:
+        logger.exception("Symptom analysis job %s failed", job_id)
+        SymptomAnalysisJob.objects.filter(pk=job_id, status__in=SymptomAnalysisJob.ACTIVE_STATUSES).update(
+            status='failed', error={"error": "AI analysis failed."}, error_status=500, updated_at=timezone.now(),
+        )
+
+
+def purge_expired_jobs():
+    """ Deletes expired jobs; returns how many. """
+    deleted, _ = SymptomAnalysisJob.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from symptoms.jobs import purge_expired_jobs
+
+
+class Command(BaseCommand):
+    help = "Deletes expired asynchronous symptom analysis jobs (run periodically, e.g. from cron)."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired symptom analysis jobs."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 16:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymptomAnalysisJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('symptoms', models.JSONField(help_text='Symptoms as first submitted')),
+                ('symptoms_key', models.CharField(help_text='Hash of the normalized symptom set', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('result', models.JSONField(blank=True, help_text='Validated analysis, once done', null=True)),
+                ('error', models.JSONField(blank=True, help_text='Error response body, if failed', null=True)),
+                ('error_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['symptoms_key', 'status'], name='symptom_job_key_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('symptoms_key',), name='unique_active_symptom_job')],
+            },
+        ),
+    ]
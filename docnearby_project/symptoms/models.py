@@ -1,5 +1,8 @@
 # symptoms/models.py
+import uuid
+
 from django.db import models
+from django.db.models import Q
 # If UserProfile is in 'users' app:
 # from users.models import UserProfile
 
@@ -23,4 +26,42 @@ from django.db import models
 #     def __str__(self):
 #         # Use patient_profile relation if defined
 #         # return f"Log for {self.patient_profile.user.username} at {self.timestamp}"
-#         return f"Symptom log at {self.timestamp}"
\ No newline at end of file
+#         return f"Symptom log at {self.timestamp}"
+
+
+# --- Asynchronous analysis jobs (symptoms/jobs.py) ---
+class SymptomAnalysisJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    # Unfinished jobs; requests for the same symptoms join them rather than starting another
+    ACTIVE_STATUSES = ['pending', 'running']
+
+    # Random ids: jobs are polled by id and shared between users asking about the same symptoms
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    symptoms = models.JSONField(help_text="Symptoms as first submitted")
+    symptoms_key = models.CharField(max_length=64, help_text="Hash of the normalized symptom set")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(blank=True, null=True, help_text="Validated analysis, once done")
+    error = models.JSONField(blank=True, null=True, help_text="Error response body, if failed")
+    error_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['symptoms_key', 'status'], name='symptom_job_key_status_idx')]
+        constraints = [
+            # At most one unfinished job per symptom set, even when two requests race to start one
+            models.UniqueConstraint(
+                fields=['symptoms_key'], condition=Q(status__in=['pending', 'running']),
+                name='unique_active_symptom_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Symptom analysis {self.id} ({self.status})"
@@ -1,5 +1,6 @@
 # symptoms/serializers.py
 from rest_framework import serializers
+from .models import SymptomAnalysisJob
 
 class SymptomInputSerializer(serializers.Serializer):
     """ Serializer to validate the list of symptoms coming from the frontend. """
@@ -16,4 +17,10 @@ class SymptomAnalysisResultSerializer(serializers.Serializer):
     # Example: confidence might be a float or string depending on output format
     confidence = serializers.CharField(read_only=True, allow_null=True, required=False)
     # Add any other fields the AI might return
-    # additional_info = serializers.CharField(read_only=True, required=False)
\ No newline at end of file
+    # additional_info = serializers.CharField(read_only=True, required=False)
+class SymptomAnalysisJobSerializer(serializers.ModelSerializer):
+    """ Status of an asynchronous analysis; `result` is the same analysis the synchronous endpoint returns. """
+    class Meta:
+        model = SymptomAnalysisJob
+        fields = ['id', 'status', 'symptoms', 'result', 'error', 'created_at', 'expires_at']
+        read_only_fields = fields
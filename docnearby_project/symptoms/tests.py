@@ -1,3 +1,177 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cache import symptoms_key
+from .jobs import run_job, submit_job
+from .models import SymptomAnalysisJob
+
+
+def replay_settings(**overrides):
+    return override_settings(UPSTREAM_MODE='replay', UPSTREAM_REPLAY={
+        **settings.UPSTREAM_REPLAY, 'latency_scale': 0, 'error_rate': 0, 'rate_limit_rate': 0, **overrides,
+    })
+
+
+class SymptomAnalysisReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('patient', password='pw'))
+
+    def analyze(self, *symptoms):
+        return self.client.post('/api/symptoms/analyze/', {'symptoms': list(symptoms)}, format='json')
+
+    @replay_settings()
+    def test_replayed_response_is_parsed(self):
+        response = self.analyze('skin rash', 'itching')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Dermatologist', response.json()['recommended_providers'])
+        self.assertIn('disclaimer', response.json())
+
+        response = self.analyze('sneezing')
+        self.assertEqual(response.json()['potential_conditions'][0], 'Common Cold or Flu')
+
+    @replay_settings(upstreams={'gemini': {'latency_ms': 20, 'latency_sigma': 0}}, latency_scale=1)
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_ai_time_in_server_timing(self):
+        timing = self.analyze('sneezing')['Server-Timing']
+        ai = next(part for part in timing.split(', ') if part.startswith('ai;'))
+        self.assertGreaterEqual(float(ai.split('dur=')[1].split(';')[0]), 20)
+
+    @replay_settings(error_rate=1.0)
+    def test_upstream_error(self):
+        self.assertEqual(self.analyze('sneezing').status_code, 503)
+
+    @replay_settings(rate_limit_rate=1.0)
+    def test_rate_limited(self):
+        response = self.analyze('sneezing')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('exhausted', response.json()['error'])
+
+    @replay_settings()
+    def test_repeated_symptoms_are_served_from_cache(self):
+        first = self.analyze('Skin rash', 'itching')
+        with replay_settings(error_rate=1.0):
+            again = self.analyze('itching', ' skin  RASH', 'itching')  # Same set of symptoms
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json(), first.json())
+
+    @replay_settings()
+    @override_settings(UPSTREAM_BUDGETS={'gemini': {
+        'client': {'rate': '1/hour', 'burst': 1}, 'global': {'rate': '1/hour', 'burst': 100},
+    }})
+    def test_budget_exhausted(self):
+        self.assertEqual(self.analyze('sneezing').status_code, 200)
+        response = self.analyze('skin rash')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 3000)
+        self.assertEqual(self.analyze('sneezing').status_code, 200)  # Cached answers are still served
+
+
+@replay_settings()
+@override_settings(SYMPTOM_JOB_WORKERS=0)
+class SymptomAnalysisJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('patient', password='pw'))
+
+    def submit(self, *symptoms, run=True):
+        with self.captureOnCommitCallbacks(execute=run):
+            response = self.client.post('/api/symptoms/analyze/?async=true', {'symptoms': list(symptoms)}, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response
+
+    def poll(self, job_id):
+        return self.client.get(f'/api/symptoms/jobs/{job_id}/')
+
+    def test_job_result_is_polled(self):
+        response = self.submit('skin rash', 'itching')
+        self.assertEqual(response.json()['status'], 'pending')
+        job = self.client.get(response['Location']).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertIn('Dermatologist', job['result']['recommended_providers'])
+        self.assertIn('disclaimer', job['result'])
+
+    def test_same_symptom_set_shares_a_job(self):
+        first = self.submit('Sneezing', run=False).json()
+        self.assertEqual(self.submit(' sneezing', 'SNEEZING').json()['id'], first['id'])  # Still pending
+        self.assertEqual(self.poll(first['id']).json()['status'], 'pending')
+
+        run_job(first['id'])
+        again = self.submit('sneezing').json()  # The finished job's result is reused until it expires
+        self.assertEqual((again['id'], again['status']), (first['id'], 'done'))
+        self.assertEqual(SymptomAnalysisJob.objects.count(), 1)
+
+    def test_cached_analysis_needs_no_gemini_call(self):
+        self.assertEqual(self.client.post('/api/symptoms/analyze/', {'symptoms': ['sneezing']}, format='json').status_code, 200)
+        with replay_settings(error_rate=1.0):
+            job = self.submit('sneezing', run=False).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['potential_conditions'][0], 'Common Cold or Flu')
+
+    @replay_settings(error_rate=1.0)
+    def test_failed_jobs_are_retried_by_new_requests(self):
+        failed = self.poll(self.submit('sneezing').json()['id']).json()
+        self.assertEqual(failed['status'], 'failed')
+        self.assertIn('AI analysis service failed', failed['error']['error'])
+        self.assertNotEqual(self.submit('sneezing').json()['id'], failed['id'])
+
+    def test_unfinished_jobs_time_out(self):
+        job_id = self.submit('sneezing', run=False).json()['id']
+        SymptomAnalysisJob.objects.filter(pk=job_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.poll(job_id).json()['status'], 'failed')
+        self.assertNotEqual(self.submit('sneezing').json()['id'], job_id)
+
+    def test_jobs_expire(self):
+        job_id = self.submit('sneezing').json()['id']
+        SymptomAnalysisJob.objects.filter(pk=job_id).update(expires_at=timezone.now())
+        self.assertEqual(self.poll(job_id).status_code, 404)
+        self.assertNotEqual(self.submit('sneezing').json()['id'], job_id)
+        call_command('purge_symptom_jobs', stdout=StringIO())
+        self.assertEqual(SymptomAnalysisJob.objects.count(), 1)
+
+    @override_settings(UPSTREAM_BUDGETS={'gemini': {
+        'client': {'rate': '1/hour', 'burst': 1}, 'global': {'rate': '1/hour', 'burst': 100},
+    }})
+    def test_budget(self):
+        self.submit('sneezing', run=False)
+        self.submit('sneezing', run=False)  # Joining a job is free
+        response = self.client.post('/api/symptoms/analyze/?async=true', {'symptoms': ['skin rash']}, format='json')
+        self.assertEqual(response.status_code, 429)
+
+    def test_losing_a_submit_race_refunds_and_joins_the_active_job(self):
+        key, expires_at = symptoms_key(['sneezing']), timezone.now() + timedelta(hours=1)
+        active = SymptomAnalysisJob.objects.create(symptoms=['sneezing'], symptoms_key=key, expires_at=expires_at)
+        SymptomAnalysisJob.objects.create(symptoms=['sneezing'], symptoms_key=key, status='failed', expires_at=expires_at)
+        budget = mock.Mock(**{'take.return_value': True})
+        # The winner's job was not there yet when this request looked for one
+        with mock.patch('symptoms.jobs.find_job', return_value=None):
+            job, created = submit_job(['sneezing'], budget=budget)
+        self.assertEqual((job, created), (active, False))
+        budget.refund.assert_called_once_with()
+
+
+@replay_settings()
+@override_settings(SYMPTOM_JOB_WORKERS=2)
+class SymptomAnalysisJobWorkerTests(TransactionTestCase):
+    def test_job_runs_in_worker_thread(self):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('patient', password='pw'))
+        response = client.post('/api/symptoms/analyze/?async=true', {'symptoms': ['sneezing']}, format='json')
+        self.assertEqual(response.status_code, 202)
+        deadline = time.monotonic() + 10
+        while (job := client.get(response['Location']).json())['status'] != 'done' and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(job['result']['potential_conditions'][0], 'Common Cold or Flu')
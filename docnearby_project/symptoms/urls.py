@@ -1,9 +1,10 @@
 # symptoms/urls.py
 from django.urls import path
-from .views import SymptomAnalysisView
+from .views import SymptomAnalysisJobView, SymptomAnalysisView
 
 app_name = 'symptoms'
 urlpatterns = [
     # Path relative to the include() in the main urls.py (e.g., /api/symptoms/analyze/)
     path('symptoms/analyze/', SymptomAnalysisView.as_view(), name='symptom_analysis'),
-]
\ No newline at end of file
+    path('symptoms/jobs/<uuid:job_id>/', SymptomAnalysisJobView.as_view(), name='symptom_analysis_job'), # Poll async analyses
+]
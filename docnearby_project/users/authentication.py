@@ -0,0 +1,62 @@
+# docnearby_project/users/authentication.py
+"""
+Role claims in JWTs. Access tokens carry the user's role ('patient'/'provider'),
+UserProfile id and ProviderProfile id. RoleClaimsJWTAuthentication copies them onto
+request.user (user.role, user.profile_id, user.provider_id), so views can branch on the
+role and filter by profile ids without loading the profiles.
+
+The claims are read from the database every time an access token is issued, at login
+and on refresh. A role change therefore applies from the next refresh; access tokens
+that were already issued keep the old claims until they expire (ACCESS_TOKEN_LIFETIME).
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile
+
+ROLE_CLAIMS = ('role', 'profile_id', 'provider_id')
+
+
+def load_role(user_id):
+    """ (role, profile id, provider profile id) from the database; Nones for users without a profile. """
+    row = (
+        UserProfile.objects.filter(user_id=user_id)
+        .values_list('user_type', 'id', 'provider_details__id')
+        .first()
+    )
+    return row or (None, None, None)
+
+
+def role_claims(user):
+    """
+    (role, profile id, provider profile id) for an authenticated user: from the token
+    claims when RoleClaimsJWTAuthentication set them, otherwise loaded once per request
+    (session/forced authentication, tokens issued before the claims existed).
+    """
+    if not hasattr(user, 'role'):
+        user.role, user.profile_id, user.provider_id = load_role(user.pk)
+    return user.role, user.profile_id, user.provider_id
+
+
+class RoleClaimsRefreshToken(RefreshToken):
+    """ Refresh token whose access tokens get the user's current role claims. """
+    @property
+    def access_token(self):
+        access = super().access_token
+        for claim, value in zip(ROLE_CLAIMS, load_role(self.payload.get(api_settings.USER_ID_CLAIM))):
+            access[claim] = value
+        return access
+
+
+class RoleClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleClaimsRefreshToken
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if all(claim in validated_token for claim in ROLE_CLAIMS):
+            user.role, user.profile_id, user.provider_id = (validated_token[claim] for claim in ROLE_CLAIMS)
+        return user
@@ -0,0 +1,27 @@
+# users/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .uniqueness import get_user_case_insensitive
+
+
+class CaseInsensitiveModelBackend(ModelBackend):
+    """
+    ModelBackend that accepts any capitalisation of the username, matching how
+    registration treats usernames. The lookup uses the LOWER(username) unique index.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = get_user_case_insensitive(UserModel, username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords (as ModelBackend does)
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,16 @@
+# users/hashing.py
+"""
+Password-hashing jobs for the process pool in users/onboarding.py. Kept apart because
+pool workers import this module before (and without) setting up Django's app registry.
+"""
+import os
+
+from django.contrib.auth.hashers import make_password
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+
+def hash_password(password, hasher):
+    return make_password(password, hasher=hasher)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from doctors.schedule import operating_hours_to_intervals
+
+
+def build_opening_intervals(apps, schema_editor):
+    """ Parses operating_hours of existing rows into opening intervals. """
+    db = schema_editor.connection.alias
+    ProviderProfile = apps.get_model('users', 'ProviderProfile')
+    ProviderOpeningInterval = apps.get_model('users', 'ProviderOpeningInterval')
+    batch = []
+    for pk, text in ProviderProfile.objects.using(db).exclude(operating_hours__isnull=True).values_list('pk', 'operating_hours').iterator():
+        batch.extend(
+            ProviderOpeningInterval(provider_id=pk, start_minute=start, end_minute=end)
+            for start, end in operating_hours_to_intervals(text)
+        )
+        if len(batch) >= 1000:
+            ProviderOpeningInterval.objects.using(db).bulk_create(batch)
+            batch = []
+    ProviderOpeningInterval.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderOpeningInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.PositiveIntegerField()),
+                ('end_minute', models.PositiveIntegerField()),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_intervals', to='users.providerprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['provider', 'start_minute', 'end_minute'], name='provider_open_interval_idx')],
+            },
+        ),
+        migrations.RunPython(build_opening_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_specialty_taxonomy'),
+        ('users', '0002_opening_intervals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='canonical_specialty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='providers', to='doctors.specialty', to_field='code'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from doctors.specialties import build_alias_map, resolve_term
+
+
+def backfill_canonical_specialty(apps, schema_editor):
+    """ Resolves existing ProviderProfile.specialization text against the seeded taxonomy. """
+    db = schema_editor.connection.alias
+    Specialty = apps.get_model('doctors', 'Specialty')
+    SpecialtyAlias = apps.get_model('doctors', 'SpecialtyAlias')
+    ProviderProfile = apps.get_model('users', 'ProviderProfile')
+
+    alias_map = build_alias_map(
+        Specialty.objects.using(db).values_list('code', 'name'),
+        SpecialtyAlias.objects.using(db).values_list('alias', 'specialty_id'),
+    )
+
+    for pk, text in ProviderProfile.objects.using(db).values_list('pk', 'specialization').iterator():
+        code = resolve_term(text, alias_map)
+        if code:
+            ProviderProfile.objects.using(db).filter(pk=pk).update(canonical_specialty_id=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_specialty_taxonomy'),
+        ('doctors', '0004_seed_specialties'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_canonical_specialty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations
+
+from users.uniqueness import LOWER_UNIQUE_INDEXES, find_case_duplicates
+
+
+def create_lower_unique_indexes(apps, schema_editor):
+    """
+    Refuses to continue while users differ only by case, listing them so they can be
+    renamed first; then adds unique indexes on LOWER(username) and LOWER(email).
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    duplicates = find_case_duplicates(User, using=schema_editor.connection.alias)
+    if any(duplicates.values()):
+        details = '; '.join(f"{field}: {', '.join(values)}" for field, values in duplicates.items() if values)
+        raise RuntimeError(
+            f"Cannot add case-insensitive unique indexes: these values are used by more than one user "
+            f"(ignoring case): {details}. Rename or merge those accounts and run the migration again."
+        )
+    quote = schema_editor.quote_name
+    table = quote(User._meta.db_table)
+    for name, column, skip_blank in LOWER_UNIQUE_INDEXES:
+        # Written the way Django compiles exclude(column=''), so lookups can match the partial index
+        where = f" WHERE NOT ({quote(column)} = '')" if skip_blank else ''
+        schema_editor.execute(f'CREATE UNIQUE INDEX {quote(name)} ON {table} (LOWER({quote(column)})){where}')
+
+
+def drop_lower_unique_indexes(apps, schema_editor):
+    for name, _, _ in LOWER_UNIQUE_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_backfill_canonical_specialty'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_lower_unique_indexes, drop_lower_unique_indexes),
+    ]
@@ -29,6 +29,10 @@ class ProviderProfile(models.Model):
     )
     # Provider specific fields
     specialization = models.CharField(max_length=100, blank=True, null=True)
+    # Resolved from `specialization` on save (see doctors/specialties.py)
+    canonical_specialty = models.ForeignKey(
+        'doctors.Specialty', to_field='code', on_delete=models.SET_NULL, null=True, blank=True, related_name='providers'
+    )
     clinic_name = models.CharField(max_length=150, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     latitude = models.FloatField(null=True, blank=True)
@@ -43,3 +47,16 @@ class ProviderProfile(models.Model):
     def __str__(self):
         return f"Provider: {self.profile.user.username} ({self.specialization or 'N/A'})"
 
+class ProviderOpeningInterval(models.Model):
+    """ One open period of a provider's week, in minutes since Monday 00:00 (see doctors/schedule.py).
+    Rebuilt from ProviderProfile.operating_hours whenever the profile is saved. """
+    provider = models.ForeignKey(ProviderProfile, on_delete=models.CASCADE, related_name='opening_intervals')
+    start_minute = models.PositiveIntegerField()
+    end_minute = models.PositiveIntegerField()
+
+    class Meta:
+        # Led by the owner, which the per-owner EXISTS in open_at filters correlates on
+        indexes = [models.Index(fields=['provider', 'start_minute', 'end_minute'], name='provider_open_interval_idx')]
+
+    def __str__(self):
+        return f"{self.provider_id}: {self.start_minute}-{self.end_minute}"
@@ -0,0 +1,91 @@
+# users/onboarding.py
+"""
+Bulk provider registration. Passwords are hashed in parallel in a process pool, since
+each hash is deliberately CPU-heavy. The User, UserProfile and ProviderProfile rows are
+then written with bulk inserts in one transaction. Bulk inserts skip the model signals,
+so this module also does their work: canonical specialty, opening intervals and the
+search projection.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from doctors.projection import sync_providers
+from doctors.schedule import operating_hours_to_intervals
+from doctors.specialties import resolve_specialty
+from . import hashing
+from .models import ProviderOpeningInterval, ProviderProfile, UserProfile
+
+PROVIDER_FIELDS = ['specialization', 'clinic_name', 'address', 'operating_hours', 'qualifications', 'bio', 'latitude', 'longitude']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """ One pool per web process, started on first use and reused by later requests. """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' rather than fork: the web process has threads (log writer, DB pools)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=hashing.init_worker, initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+            )
+        return _pool
+
+
+def hash_passwords(passwords):
+    """
+    Hashes with the default hasher, across PASSWORD_HASH_WORKERS processes (0 hashes in
+    this thread). The hasher object travels with each job, so workers use the same
+    algorithm and work factor as this process.
+    """
+    hasher = get_hasher('default')
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 0)
+    if workers <= 0 or len(passwords) < 2:
+        return [make_password(password, hasher=hasher) for password in passwords]
+    pool = _get_pool(workers)
+    return list(pool.map(hashing.hash_password, passwords, [hasher] * len(passwords)))
+
+
+def register_providers(entries):
+    """
+    Creates a provider account for each validated entry (RegisterSerializer fields).
+    Returns the created ProviderProfiles (with .profile.user set), in input order.
+    """
+    hashed = hash_passwords([entry['password'] for entry in entries])
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(
+                username=User.normalize_username(entry['username']),
+                email=User.objects.normalize_email(entry['email']),
+                first_name=entry.get('first_name', ''), last_name=entry.get('last_name', ''),
+                password=password,
+            )
+            for entry, password in zip(entries, hashed)
+        ])
+        profiles = UserProfile.objects.bulk_create([
+            UserProfile(user=user, user_type='provider', phone_number=entry.get('phone_number'))
+            for user, entry in zip(users, entries)
+        ])
+        providers = ProviderProfile.objects.bulk_create([
+            ProviderProfile(
+                profile=profile, canonical_specialty_id=resolve_specialty(entry.get('specialization')),
+                **{field: entry.get(field) for field in PROVIDER_FIELDS},
+            )
+            for profile, entry in zip(profiles, entries)
+        ])
+        ProviderOpeningInterval.objects.bulk_create([
+            ProviderOpeningInterval(provider=provider, start_minute=start, end_minute=end)
+            for provider in providers
+            for start, end in operating_hours_to_intervals(provider.operating_hours)
+        ])
+        sync_providers([provider.pk for provider in providers])
+    return providers
@@ -1,8 +1,16 @@
 # docnearby_project/users/serializers.py
+import logging
+
 from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from .models import UserProfile, ProviderProfile
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import RoleClaimsRefreshToken
+from .uniqueness import email_taken, filter_lower, lower_values, username_taken
+
+logger = logging.getLogger(__name__)
 
 # --- Nested Display Serializers ---
 class ProviderProfileSerializer(serializers.ModelSerializer):
@@ -56,12 +64,12 @@ class RegisterSerializer(serializers.Serializer):
     longitude = serializers.FloatField(required=False, allow_null=True)
 
     def validate_email(self, value):
-        if User.objects.filter(email__iexact=value).exists():
+        if email_taken(User, value):
             raise serializers.ValidationError({"email": "Email already exists."})
         return value
 
     def validate_username(self, value):
-        if User.objects.filter(username__iexact=value).exists():
+        if username_taken(User, value):
             raise serializers.ValidationError({"username": "Username already exists."})
         return value
 
@@ -87,8 +95,13 @@ class RegisterSerializer(serializers.Serializer):
             user_profile = UserProfile.objects.create(user=user, user_type=user_type, phone_number=phone_number) # Create profile
             if user_type == 'provider':
                 ProviderProfile.objects.create(profile=user_profile, **provider_data) # Create provider details
+        except IntegrityError:
+            # Lost a race with a concurrent registration (case-insensitive unique indexes)
+            if 'user' in locals() and user.pk:
+                 user.delete()
+            raise serializers.ValidationError("Username or email already exists.")
         except Exception as e:
-            print(f"Error during user creation process: {e}")
+            logger.exception("Error during user creation process: %s", e)
             # Attempt cleanup if user was created but profiles failed
             if 'user' in locals() and user.pk:
                  user.delete()
@@ -96,12 +109,59 @@ class RegisterSerializer(serializers.Serializer):
 
         return user
 
+# --- Bulk Provider Registration ---
+class ProviderRegistrationSerializer(RegisterSerializer):
+    """ One entry of a bulk registration; uniqueness is checked for the whole batch at once. """
+    user_type = serializers.HiddenField(default='provider')
+
+    def validate_email(self, value):
+        return value
+
+    def validate_username(self, value):
+        return value
+
+
+class BulkProviderRegisterSerializer(serializers.Serializer):
+    """ Validates up to MAX_PROVIDERS provider registrations with two uniqueness queries. """
+    MAX_PROVIDERS = 200
+    providers = ProviderRegistrationSerializer(many=True, min_length=1, max_length=MAX_PROVIDERS)
+
+    def validate_providers(self, entries):
+        # Everything is lowered by the database, as the LOWER() unique indexes are, so the
+        # in-batch checks agree with what the indexes would reject
+        lowered = lower_values([entry['username'] for entry in entries] + [entry['email'] for entry in entries])
+        usernames, emails = lowered[:len(entries)], lowered[len(entries):]
+        # Two index lookups (LOWER(username), LOWER(email)) combined into one query
+        taken = (
+            filter_lower(User.objects, 'username', usernames).values_list(Lower('username'), Lower('email'))
+            .union(filter_lower(User.objects, 'email', emails).values_list(Lower('username'), Lower('email')))
+        )
+        taken_usernames, taken_emails = set(), set()
+        for username, email in taken:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+        errors, seen_usernames, seen_emails, invalid = [], set(), set(), False
+        for username, email in zip(usernames, emails):
+            entry_errors = {}
+            if username in taken_usernames or username in seen_usernames:
+                entry_errors['username'] = ["Username already exists."]
+            if email in taken_emails or email in seen_emails:
+                entry_errors['email'] = ["Email already exists."]
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            invalid = invalid or bool(entry_errors)
+            errors.append(entry_errors)
+        if invalid:
+            raise serializers.ValidationError(errors)  # One error dict per entry, like other list errors
+        return entries
+
+
 # --- Custom Token Serializer ---
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """ Customizes JWT claim and includes user details in login response. """
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user); return token
+    """ Adds role claims to the access token (see users/authentication.py) and includes user details in login response. """
+    token_class = RoleClaimsRefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
         serializer = UserSerializer(self.user, context={'request': self.context.get('request')})
@@ -0,0 +1,52 @@
+# users/signals.py
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from doctors.projection import remove_entry, sync_provider
+from doctors.schedule import sync_opening_intervals
+from doctors.specialties import resolve_specialty
+from .models import ProviderProfile, ProviderOpeningInterval, UserProfile
+
+# User fields that feed the provider's listed name in the search projection
+PROJECTED_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_save, sender=ProviderProfile)
+def sync_provider_opening_intervals(sender, instance, update_fields=None, **kwargs):
+    """ Re-parses operating_hours into indexed opening intervals. """
+    if update_fields is None or 'operating_hours' in update_fields:
+        sync_opening_intervals(ProviderOpeningInterval, 'provider', instance)
+
+
+@receiver(pre_save, sender=ProviderProfile)
+def resolve_provider_specialty(sender, instance, **kwargs):
+    """ Keeps canonical_specialty in step with the free-text specialization. """
+    instance.canonical_specialty_id = resolve_specialty(instance.specialization)
+
+
+@receiver(post_save, sender=ProviderProfile)
+def project_provider_for_listing(sender, instance, **kwargs):
+    """ Mirrors the provider into the flat ProviderSearchEntry read-model. """
+    sync_provider(instance.pk)
+
+
+@receiver(post_delete, sender=ProviderProfile)
+def unproject_provider_for_listing(sender, instance, **kwargs):
+    remove_entry('provider', instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def reproject_provider_phone(sender, instance, **kwargs):
+    """ The listed phone number lives on UserProfile. """
+    for provider_id in ProviderProfile.objects.filter(profile=instance).values_list('pk', flat=True):
+        sync_provider(provider_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reproject_provider_name(sender, instance, created, update_fields=None, **kwargs):
+    """ The listed name lives on User; skips new users and saves like last_login updates. """
+    if created or (update_fields is not None and not set(update_fields) & PROJECTED_USER_FIELDS):
+        return
+    for provider_id in ProviderProfile.objects.filter(profile__user=instance).values_list('pk', flat=True):
+        sync_provider(provider_id)
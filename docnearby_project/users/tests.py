@@ -1,3 +1,158 @@
-from django.test import TestCase
+from datetime import date, time
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from appointments.models import Appointment
+from doctors.models import ProviderSearchEntry
+from doctors.specialties import resolve_specialty
+from .models import ProviderProfile, UserProfile
+from .uniqueness import filter_lower, find_case_duplicates, lower_values
+
+
+class RoleClaimsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asha', password='pass12345')
+        self.profile = UserProfile.objects.create(user=self.user, user_type='patient')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/users/login/', {'username': 'asha', 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_login_embeds_role_claims(self):
+        access = AccessToken(self.login()['access'])
+        self.assertEqual((access['role'], access['profile_id'], access['provider_id']), ('patient', self.profile.id, None))
+
+    def test_appointment_list_needs_no_profile_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login()['access']}")
+        with self.assertNumQueries(2):  # The user, then the (empty) appointment list
+            response = self.client.get('/api/appointments/')
+        self.assertEqual(response.status_code, 200)
+
+        # Tokens issued without the claims still work, with one extra profile query
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        with self.assertNumQueries(3):
+            self.client.get('/api/appointments/')
+
+    def test_refresh_picks_up_role_change(self):
+        refresh = self.login()['refresh']
+        self.profile.user_type = 'provider'
+        self.profile.save()
+        provider = ProviderProfile.objects.create(profile=self.profile, specialization='Dermatologist')
+
+        response = self.client.post('/api/users/token/refresh/', {'refresh': refresh}, format='json')
+        access = AccessToken(response.json()['access'])
+        self.assertEqual((access['role'], access['provider_id']), ('provider', provider.id))
+
+        patient = UserProfile.objects.create(user=User.objects.create_user('ravi'), user_type='patient')
+        Appointment.objects.create(patient=patient, doctor=provider, date=date(2030, 1, 1), time=time(9, 0))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(len(self.client.get('/api/appointments/').json()), 1)  # Now sees the practice's bookings
+
+
+class BulkProviderRegisterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def entry(self, n, **overrides):
+        return {
+            'username': f'dr{n}', 'email': f'dr{n}@example.com', 'password': 'pass12345', 'first_name': f'Doc{n}',
+            'specialization': 'Skin doctor', 'address': f'{n} MG Road, Pune', 'operating_hours': 'Mon-Fri 9am-5pm',
+            **overrides,
+        }
+
+    def post(self, entries):
+        return self.client.post('/api/users/register/providers/bulk/', {'providers': entries}, format='json')
+
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_registers_providers(self):
+        response = self.post([self.entry(1), self.entry(2), self.entry(3, phone_number='020 1234')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 3)
+
+        provider = ProviderProfile.objects.select_related('profile__user').get(id=response.json()['providers'][2]['provider_id'])
+        self.assertTrue(provider.profile.user.check_password('pass12345'))  # Hashed in a worker process
+        self.assertEqual((provider.profile.user_type, provider.profile.phone_number), ('provider', '020 1234'))
+        self.assertEqual(provider.canonical_specialty_id, resolve_specialty('Skin doctor'))
+        self.assertEqual(provider.opening_intervals.count(), 5)
+        self.assertEqual(ProviderSearchEntry.objects.filter(kind='provider').count(), 3)
+
+        login = self.client.post('/api/users/login/', {'username': 'dr1', 'password': 'pass12345'}, format='json')
+        self.assertEqual(login.status_code, 200)
+
+    def test_duplicates_reject_the_whole_batch(self):
+        User.objects.create_user('Existing', email='taken@example.com')
+        response = self.post([
+            self.entry(1), self.entry(2, username='EXISTING'), self.entry(3, email='TAKEN@example.com'),
+            self.entry(4, username='DR1'),
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['providers']
+        self.assertEqual(errors[0], {})
+        self.assertIn('username', errors[1])
+        self.assertIn('email', errors[2])
+        self.assertIn('username', errors[3])  # Clashes with entry 1 in the same batch
+        self.assertEqual(ProviderProfile.objects.count(), 0)
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite's LOWER() folds ASCII letters only")
+    def test_batch_duplicates_follow_database_lowering(self):
+        # Equal under str.lower(), but different usernames to the LOWER(username) index
+        self.assertEqual(lower_values(['Élan', 'élan']), ['Élan', 'élan'])
+        response = self.post([self.entry(1, username='Élan'), self.entry(2, username='élan')])
+        self.assertEqual(response.status_code, 201)
+
+        # Same LOWER() as an existing user ('Élan'), so taken
+        response = self.post([self.entry(3, username='ÉLAN')])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json()['providers'][0])
+
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('clinic'))
+        self.assertEqual(self.post([self.entry(1)]).status_code, 403)
+
+
+class CaseInsensitiveUniquenessTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('Asha', email='Asha@Example.com', password='pass12345')
+        self.client = APIClient()
+
+    def register(self, **overrides):
+        data = {'username': 'ravi', 'email': 'ravi@example.com', 'password': 'pass12345', 'user_type': 'patient', **overrides}
+        return self.client.post('/api/users/register/', data, format='json')
+
+    def test_registration_rejects_case_variants(self):
+        self.assertEqual(self.register(username='ASHA').status_code, 400)
+        self.assertEqual(self.register(email='asha@EXAMPLE.com').status_code, 400)
+        self.assertEqual(self.register().status_code, 201)
+
+    def test_database_rejects_case_variants(self):
+        for fields in ({'username': 'asha'}, {'username': 'other', 'email': 'ASHA@example.com'}):
+            with self.subTest(**fields), self.assertRaises(IntegrityError), transaction.atomic():
+                User.objects.create(**fields)
+        # Blank emails are left out of the email index
+        User.objects.create(username='no-email-1')
+        User.objects.create(username='no-email-2')
+
+    def test_lookups_use_the_indexes(self):
+        for field, index in (('username', 'auth_user_username_lower_uniq'), ('email', 'auth_user_email_lower_uniq')):
+            with self.subTest(field=field):
+                self.assertIn(index, filter_lower(User.objects, field, ['ASHA', 'Ravi']).explain())
+
+    def test_login_ignores_case(self):
+        response = self.client.post('/api/users/login/', {'username': 'ASHA', 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        wrong = self.client.post('/api/users/login/', {'username': 'asha', 'password': 'wrong'}, format='json')
+        self.assertEqual(wrong.status_code, 401)
+
+    def test_migration_reports_existing_duplicates(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX auth_user_username_lower_uniq')
+        User.objects.create(username='ASHA')
+        self.assertEqual(find_case_duplicates(User), {'username': ['asha'], 'email': []})
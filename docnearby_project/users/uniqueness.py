@@ -0,0 +1,62 @@
+# users/uniqueness.py
+"""
+Case-insensitive uniqueness of usernames and emails. Migration users 0005 adds unique
+indexes on LOWER(username) and LOWER(email) of auth_user; the email index skips blank
+emails. Lookups here compare LOWER(column) = LOWER(value), and repeat the partial
+index's NOT (email = '') condition word for word, so they use those indexes.
+An `__iexact` filter would compile to LIKE (SQLite) or UPPER() (PostgreSQL) and scan
+the table instead. Lowering both sides in SQL also keeps each check consistent with
+its index.
+"""
+from django.db import connections
+from django.db.models import Count, Value
+from django.db.models.functions import Lower
+
+# (index name, column, whether blank values are left out of the index)
+LOWER_UNIQUE_INDEXES = [
+    ('auth_user_username_lower_uniq', 'username', False),
+    ('auth_user_email_lower_uniq', 'email', True),
+]
+SKIPS_BLANK = {column: skip_blank for _, column, skip_blank in LOWER_UNIQUE_INDEXES}
+
+
+def filter_lower(queryset, field, values):
+    """ Rows whose `field` matches any of `values`, ignoring case. """
+    if SKIPS_BLANK.get(field):
+        queryset = queryset.exclude(**{field: ''})  # NOT (field = ''), the partial index's condition
+    return queryset.alias(**{f'{field}_lower': Lower(field)}).filter(
+        **{f'{field}_lower__in': [Lower(Value(value)) for value in values]}
+    )
+
+
+def lower_values(values, using='default'):
+    """ `values` lowered by the database's LOWER(), which may differ from str.lower() (SQLite folds ASCII only). """
+    if not values:
+        return []
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(['LOWER(%s)'] * len(values)), list(values))
+        return list(cursor.fetchone())
+
+
+def get_user_case_insensitive(user_model, username):
+    return filter_lower(user_model._default_manager, 'username', [username]).get()
+
+
+def username_taken(user_model, username):
+    return filter_lower(user_model._default_manager, 'username', [username]).exists()
+
+
+def email_taken(user_model, email):
+    return filter_lower(user_model._default_manager, 'email', [email]).exists()
+
+
+def find_case_duplicates(user_model, using='default'):
+    """ {'username': [lowered values shared by several users], 'email': [...]} """
+    duplicates = {}
+    for _, field, _ in LOWER_UNIQUE_INDEXES:
+        duplicates[field] = list(
+            user_model._default_manager.using(using).exclude(**{field: ''})
+            .values(lowered=Lower(field)).annotate(n=Count('pk')).filter(n__gt=1)
+            .order_by('lowered').values_list('lowered', flat=True)
+        )
+    return duplicates
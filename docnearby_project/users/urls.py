@@ -1,6 +1,6 @@
 # docnearby_project/users/urls.py
 from django.urls import path
-from .views import RegisterView, MyTokenObtainPairView, UserProfileView
+from .views import RegisterView, BulkProviderRegisterView, MyTokenObtainPairView, UserProfileView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 app_name = 'users' # Define app namespace
@@ -9,5 +9,6 @@ urlpatterns = [
     path('login/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'), # Custom login view
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), # Standard refresh view
     path('register/', RegisterView.as_view(), name='auth_register'),         # Registration view
+    path('register/providers/bulk/', BulkProviderRegisterView.as_view(), name='bulk_provider_register'), # Staff bulk onboarding
     path('user/me/', UserProfileView.as_view(), name='user_profile'),        # Get current user view
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
 # docnearby_project/users/views.py
+import logging
+
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 from rest_framework import generics, permissions, status, serializers # Import serializers for exception handling
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .serializers import RegisterSerializer, UserSerializer, MyTokenObtainPairSerializer
+from .onboarding import register_providers
+from .serializers import BulkProviderRegisterSerializer, RegisterSerializer, UserSerializer, MyTokenObtainPairSerializer
 from .models import UserProfile
 
+logger = logging.getLogger(__name__)
+
 # Registration View
 class RegisterView(generics.CreateAPIView):
     """ Registers a new user (Patient or Provider). """
@@ -28,12 +35,36 @@ class RegisterView(generics.CreateAPIView):
             headers = self.get_success_headers({}) # Get headers for 201 response
             return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
         except serializers.ValidationError as e:
-             print(f"Registration Validation Error: {e.detail}")
+             logger.info("Registration Validation Error: %s", e.detail)
              return Response(e.detail, status=status.HTTP_400_BAD_REQUEST) # Return validation errors
         except Exception as e:
-             print(f"Registration Creation Error: {type(e).__name__} - {e}")
+             logger.exception("Registration Creation Error: %s - %s", type(e).__name__, e)
              return Response({"error": "Registration failed due to an internal error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Bulk Provider Registration View
+class BulkProviderRegisterView(APIView):
+    """
+    Registers many providers at once (staff only), e.g. when onboarding a clinic chain.
+    POST {"providers": [{<RegisterSerializer fields>}, ...]}: all or nothing.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = BulkProviderRegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            providers = register_providers(serializer.validated_data['providers'])
+        except IntegrityError:
+            # A concurrent registration took one of the usernames after validation
+            return Response({"error": "One or more usernames are already taken; no providers were registered."}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            "created": len(providers),
+            "providers": [
+                {"user_id": p.profile.user.id, "username": p.profile.user.username, "profile_id": p.profile.id, "provider_id": p.id}
+                for p in providers
+            ],
+        }, status=status.HTTP_201_CREATED)
+
 # Login View
 class MyTokenObtainPairView(TokenObtainPairView):
     """ Handles login, returns tokens + user details via custom serializer. """